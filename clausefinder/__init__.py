@@ -2,6 +2,7 @@
 from clause import Clause
 from clause import ClauseFinder
 from common import DELAY_SPACY_IMPORT
+from common import CLAUSEFINDER_VERSION as __version__
 import googlenlp
 if not DELAY_SPACY_IMPORT:
     import spacynlp
@@ -17,7 +18,7 @@ if __name__ == '__main__':
     usage = '%prog [options] [text]'
     parser = OptionParser(usage)
     parser.add_option('-j', '--json-in', type='string', dest='jsoninfile', help='Process a Google NLP response.')
-    parser.add_option('-o', '--json-out', type='string', dest='jsonoutfile', help='Save Google NLP response.')
+    parser.add_option('-o', '--json-out', type='string', dest='jsonoutfile', help='Save Google NLP response, the spacy parser saves a converted response.')
     parser.add_option('-f', '--file', type='string', dest='infile', help='Process a text file.')
     parser.add_option('-a', '--appos', action='store_true', dest='compact', help='handle appositional modifiers.')
     parser.add_option('-c', '--compact', action='store_true', dest='compact', help='compact json output.')
@@ -30,8 +31,6 @@ if __name__ == '__main__':
         sys.exit(1)
     if parser != 'google' and options.jsoninfile is not None:
         print('Warning --json-in only available for google parser')
-    if parser != 'google' and options.jsonoutfile is not None:
-        print('Warning --json-out only available for google parser')
 
     if parser == 'google':
         i = 1
@@ -91,6 +90,15 @@ if __name__ == '__main__':
                 lines = fd.readlines()
             cleanlines = filter(lambda x: len(x) != 0 and x[0] != '#', [x.strip() for x in lines])
             doc = spacynlp.parse(' '.join(cleanlines).decode('utf-8'))
+            if options.jsonoutfile is not None:
+                # Save in Google NLP format so the google parser can reload it
+                from spacynlp import convert
+                result = convert.to_google(doc)
+                with open(options.jsonoutfile, 'w') as fd:
+                    if options.compact:
+                        json.dump(result, fp=fd)
+                    else:
+                        json.dump(result, fp=fd, indent=2)
             cf = ClauseFinder(doc)
             for s in doc.sents:
                 clauses = cf.find_clauses(s)
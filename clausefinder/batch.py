@@ -0,0 +1,341 @@
+# Batch clause finding over annotated corpora
+#
+# Reads word problems with an 'nlp' field (see google_nlp_annotate.py) from a
+# JSON or JSONL file, runs the clause finder over each problem in a process
+# pool and writes one JSON line per problem keyed by iIndex. With --cache
+# clauses are read from and written to a ClauseCache. With --index the
+# clauses are added to a ClauseIndex as results arrive. With --profile each
+# line has a 'profile' field with the clause finder phase times and
+# counters, see clausefinder.instrument.
+#
+# Usage: python -m clausefinder.batch [options] corpus.json
+
+import json
+import sys
+import time
+from multiprocessing import Pool
+from multiprocessing import cpu_count
+from optparse import OptionParser
+from clausefinder import googlenlp
+from clausefinder.cache import ClauseCache
+from clausefinder.clause import ClauseFinder
+from clausefinder.common import IndexSpan
+from clausefinder.index import ClauseIndex
+from clausefinder.index import clause_terms
+from clausefinder.instrument import PhaseProfile
+
+# Per process read only cache, profiling and index term flags, see
+# init_worker()
+_cache = None
+_profile = False
+_terms = False
+# Per process clause finder, reset for each document
+_finder = None
+
+
+def init_worker(cachefile=None, profile=False, terms=False):
+    '''Initialize a worker process.
+
+    Args:
+        cachefile: The path to a clause cache or None. A cache opened by an
+            earlier call is closed.
+        profile: If True profile the clause finder for each problem.
+        terms: If True add the clause index terms to each result.
+    '''
+    global _cache, _profile, _terms
+    close_worker()
+    if cachefile is not None:
+        _cache = ClauseCache(cachefile, readonly=True)
+    _profile = profile
+    _terms = terms
+
+
+def close_worker():
+    '''Close the cache opened by init_worker(), if any.'''
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+
+
+def read_problems(filename):
+    '''Stream word problems from a JSON or JSONL file. A JSON file must hold a
+    list of problems and is loaded in one go, a JSONL file is read one line
+    at a time.
+
+    Args:
+        filename: The path to the corpus, '-' reads from stdin.
+
+    Yields:
+        A word problem dictionary.
+    '''
+    if filename == '-':
+        fd = sys.stdin
+    else:
+        fd = open(filename, 'rt')
+    try:
+        first = ''
+        while len(first) == 0:
+            first = fd.readline()
+            if len(first) == 0:
+                return
+            first = first.strip()
+        prob = None
+        if not first.startswith('['):
+            try:
+                prob = json.loads(first)
+            except ValueError:
+                pass
+        if prob is not None:
+            # JSONL
+            yield prob
+            for line in fd:
+                line = line.strip()
+                if len(line) != 0:
+                    yield json.loads(line)
+        else:
+            # JSON list or a single problem, may span many lines
+            problems = json.loads(first + fd.read())
+            if isinstance(problems, dict):
+                problems = [problems]
+            for prob in problems:
+                yield prob
+    finally:
+        if fd is not sys.stdin:
+            fd.close()
+
+
+def clause_to_dict(clause, sentenceId):
+    '''Convert a clause to a dictionary suitable for JSON serialization.
+
+    Args:
+        clause: A Clause instance.
+        sentenceId: The index of the sentence containing the clause.
+
+    Returns:
+        A dictionary with the clause type and text, and the subject, verb and
+        object token indexes. The verb is None for synthetic verbs.
+    '''
+    verb = clause.root
+    return {
+        'sentence': sentenceId,
+        'type': clause.type,
+        'text': clause.text,
+        'subject': list(clause.subject._indexes),
+        'verb': list(verb._indexes) if isinstance(verb, IndexSpan) else None,
+        'objects': [list(o._indexes) for o in clause.objects]
+    }
+
+
+def find_doc_clauses(doc, profile=None):
+    '''Find the clauses of a document.
+
+    Args:
+        doc: A googlenlp.Doc instance.
+        profile: An optional instrument.PhaseProfile.
+
+    Returns:
+        A list of dictionaries created by clause_to_dict().
+    '''
+    global _finder
+    if _finder is None:
+        _finder = ClauseFinder(doc, profile)
+    else:
+        _finder.reset(doc, profile)
+    cf = _finder
+    clauses = []
+    for g, sent in enumerate(doc.sents):
+        for clause in cf.find_clauses(sent):
+            clauses.append(clause_to_dict(clause, g))
+    return clauses
+
+
+def find_problem_clauses(nlpResult, profile=None):
+    '''Find the clauses of an annotated problem, using the process cache if
+    one was opened by init_worker().
+
+    Args:
+        nlpResult: A Google NLP result or compact annotation, or a
+            googlenlp.Doc instance.
+        profile: An optional instrument.PhaseProfile, it is not updated if
+            the clauses are found in the cache.
+
+    Returns:
+        A tuple (clauses, ntokens, fingerprint) where clauses is a list of
+        dictionaries created by clause_to_dict(). The fingerprint is set if
+        the clauses should be added to the cache, else it is None.
+    '''
+    if isinstance(nlpResult, googlenlp.Doc):
+        doc = nlpResult
+    else:
+        doc = googlenlp.Doc(nlpResult)
+    if _cache is None:
+        return find_doc_clauses(doc, profile), len(doc), None
+    clauses = _cache.get(doc)
+    if clauses is not None:
+        return clauses, len(doc), None
+    return find_doc_clauses(doc, profile), len(doc), doc.fingerprint
+
+
+def process_problem(prob):
+    '''Find the clauses of a word problem. Errors are reported in the result
+    so one bad problem does not stop a batch.
+
+    Args:
+        prob: A word problem dictionary with an 'nlp' field.
+
+    Returns:
+        A tuple (result, ntokens, fingerprint) where result is a dictionary
+        with the keys 'iIndex' and either 'clauses' or 'error', 'profile'
+        if profiling is enabled and 'terms', the index.clause_terms() of
+        each clause, if index terms are enabled. See find_problem_clauses()
+        for fingerprint.
+    '''
+    result = {'iIndex': prob.get('iIndex')}
+    if 'nlp' not in prob:
+        result['error'] = 'no nlp annotation'
+        return result, 0, None
+    profile = PhaseProfile() if _profile else None
+    try:
+        doc = googlenlp.Doc(prob['nlp'])
+        result['clauses'], ntokens, fingerprint = find_problem_clauses(doc, profile)
+        if _terms:
+            result['terms'] = [clause_terms(doc, c) for c in result['clauses']]
+    except Exception as e:
+        result['error'] = '%s: %s' % (type(e).__name__, e)
+        return result, 0, None
+    finally:
+        if profile is not None:
+            result['profile'] = profile.to_dict()
+    return result, ntokens, fingerprint
+
+
+def run_batch(problems, processes=None, chunksize=16, cachefile=None, profile=False, indexfile=None):
+    '''Find clauses for a stream of word problems using a process pool.
+    Results are yielded in input order.
+
+    Args:
+        problems: An iterable of word problem dictionaries.
+        processes: The number of worker processes, default is the number of
+            cores. If 1 the problems are processed in this process.
+        chunksize: The number of problems sent to a worker at a time.
+        cachefile: The path to a clause cache or None. New results are
+            written to the cache by this process.
+        profile: If True profile the clause finder for each problem.
+        indexfile: The path to a clause index or None. Clauses are added to
+            the index by this process, keyed by iIndex or else the position
+            of the problem in the input.
+
+    Yields:
+        A tuple (result, ntokens) for each problem, see process_problem().
+        The result has no 'terms' field.
+    '''
+    if processes is None:
+        processes = cpu_count()
+    cache = None
+    if cachefile is not None:
+        # Create the cache before workers open it read only
+        cache = ClauseCache(cachefile)
+    index = None
+    if indexfile is not None:
+        index = ClauseIndex(indexfile)
+    try:
+        n = 0
+        for result, ntokens, fingerprint in _run_batch(problems, processes, chunksize, cachefile, profile,
+                                                       index is not None):
+            if cache is not None and fingerprint is not None:
+                cache.put(fingerprint, result['clauses'])
+            terms = result.pop('terms', None)
+            if index is not None and terms is not None:
+                problem = result['iIndex']
+                index.add(n if problem is None else problem, result['clauses'], terms)
+            n += 1
+            yield result, ntokens
+    finally:
+        if cache is not None:
+            cache.close()
+        if index is not None:
+            index.close()
+
+
+def _run_batch(problems, processes, chunksize, cachefile, profile, terms):
+    if processes <= 1:
+        init_worker(cachefile, profile, terms)
+        try:
+            for prob in problems:
+                yield process_problem(prob)
+        finally:
+            close_worker()
+        return
+    pool = Pool(processes, init_worker, (cachefile, profile, terms))
+    try:
+        for r in pool.imap(process_problem, problems, chunksize):
+            yield r
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def main(args=None):
+    usage = '%prog [options] /path/to/corpus.json|jsonl'
+    parser = OptionParser(usage)
+    parser.add_option('-o', '--output', type='string', dest='outfile', help='Set JSONL output file. Default is stdout.')
+    parser.add_option('-j', '--jobs', type='int', dest='jobs', help='Number of worker processes. Default is the number of cores.')
+    parser.add_option('-k', '--chunk-size', type='int', dest='chunksize', default=16, help='Problems per worker task, default is 16.')
+    parser.add_option('-c', '--cache', type='string', dest='cachefile', help='Read and update a clause cache file.')
+    parser.add_option('-x', '--index', type='string', dest='indexfile', help='Add clauses to a clause index file.')
+    parser.add_option('-p', '--profile', action='store_true', dest='profile', help='Add clause finder phase times and counters to each result.')
+    parser.add_option('-r', '--report', type='int', dest='report', default=1000, help='Report throughput every N problems, default is 1000.')
+    options, args = parser.parse_args(args)
+    if len(args) == 0:
+        parser.error('no corpus to process')
+
+    if options.outfile is None:
+        out = sys.stdout
+    else:
+        out = open(options.outfile, 'w')
+
+    nprobs = 0
+    ntoks = 0
+    nclauses = 0
+    nerrors = 0
+    total = PhaseProfile()
+    start = time.time()
+    try:
+        for result, ntokens in run_batch(read_problems(args[0]), options.jobs, options.chunksize,
+                                           options.cachefile, options.profile, options.indexfile):
+            out.write(json.dumps(result))
+            out.write('\n')
+            nprobs += 1
+            ntoks += ntokens
+            if 'profile' in result:
+                total.merge(result['profile'])
+            if 'error' in result:
+                nerrors += 1
+            else:
+                nclauses += len(result['clauses'])
+            if options.report > 0 and nprobs % options.report == 0:
+                elapsed = max(time.time() - start, 1e-9)
+                sys.stderr.write('%i problems, %.1f problems/sec, %.1f tokens/sec\n' %
+                                 (nprobs, nprobs / elapsed, ntoks / elapsed))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = max(time.time() - start, 1e-9)
+    sys.stderr.write('Processed %i problems (%i tokens, %i clauses, %i errors) in %.2f sec\n' %
+                     (nprobs, ntoks, nclauses, nerrors, elapsed))
+    sys.stderr.write('Throughput: %.1f problems/sec, %.1f tokens/sec\n' % (nprobs / elapsed, ntoks / elapsed))
+    if options.profile:
+        for name, seconds in sorted(total.phases.items()):
+            sys.stderr.write('Phase %-10s %8.3f sec\n' % (name, seconds))
+        for name, count in sorted(total.counters.items()):
+            sys.stderr.write('Count %-13s %i\n' % (name, count))
+    return 0 if nerrors == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
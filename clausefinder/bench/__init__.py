@@ -0,0 +1,9 @@
+# package clausefinder.bench
+#
+# Benchmarks for the clause finder. Each module can be run as a script,
+# for example: python -m clausefinder.bench.tokens
+import os
+
+# Annotated test document shipped with the repository
+DEFAULT_JSON = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                            'clausefinder_test.json')
@@ -0,0 +1,136 @@
+# spaCy parsing throughput benchmark
+#
+# Parses the sQuestion text of a word problem corpus one text at a time with
+# spacynlp.parse(), then in batches with spacynlp.parse_batch() and, with
+# --jobs, in worker processes with convert.annotate(). The model is loaded
+# and warmed up before timing starts.
+
+import sys
+import time
+from optparse import OptionParser
+from clausefinder import ClauseFinder
+from clausefinder import spacynlp
+from clausefinder.batch import read_problems
+from clausefinder.spacynlp import convert
+from clausefinder.spacynlp import model
+
+
+def read_texts(filename, limit=None):
+    '''Read the question texts of a word problem corpus.
+
+    Args:
+        filename: The path to a JSON or JSONL corpus.
+        limit: The maximum number of texts or None.
+
+    Returns:
+        A list of unicode strings.
+    '''
+    texts = []
+    for prob in read_problems(filename):
+        text = prob['sQuestion']
+        if isinstance(text, str):
+            text = text.decode('utf-8')
+        texts.append(text)
+        if limit is not None and len(texts) >= limit:
+            break
+    return texts
+
+
+def time_parse(texts, clauses=False):
+    '''Parse each text with a separate call.
+
+    Args:
+        texts: A list of unicode strings.
+        clauses: If True also run the clause finder on each document.
+
+    Returns:
+        A tuple (seconds, ntokens).
+    '''
+    start = time.time()
+    ntokens = 0
+    for text in texts:
+        doc = spacynlp.parse(text, entity=False)
+        ntokens += len(doc)
+        if clauses:
+            find_clauses(doc)
+    return time.time() - start, ntokens
+
+
+def time_parse_batch(texts, batch_size, n_threads, clauses=False):
+    '''Parse the texts with spacynlp.parse_batch().
+
+    Args:
+        texts: A list of unicode strings.
+        batch_size: The number of texts spaCy buffers per batch.
+        n_threads: The number of threads spaCy uses per batch.
+        clauses: If True also run the clause finder on each document.
+
+    Returns:
+        A tuple (seconds, ntokens).
+    '''
+    start = time.time()
+    ntokens = 0
+    for doc in spacynlp.parse_batch(texts, batch_size=batch_size, n_threads=n_threads):
+        ntokens += len(doc)
+        if clauses:
+            find_clauses(doc)
+    return time.time() - start, ntokens
+
+
+def time_annotate(texts, batch_size, processes):
+    '''Parse the texts in worker processes with convert.annotate().
+
+    Args:
+        texts: A list of unicode strings.
+        batch_size: The number of texts per worker task.
+        processes: The number of worker processes.
+
+    Returns:
+        A tuple (seconds, ntokens).
+    '''
+    start = time.time()
+    ntokens = 0
+    for result in convert.annotate(texts, batch_size=batch_size, processes=processes):
+        ntokens += len(result['tokens'])
+    return time.time() - start, ntokens
+
+
+def find_clauses(doc):
+    cf = ClauseFinder(doc)
+    for sent in doc.sents:
+        cf.find_clauses(sent)
+
+
+def report(name, ntexts, seconds, ntokens):
+    seconds = max(seconds, 1e-9)
+    print('%-28s %8.2f sec %10.1f texts/sec %10.1f tokens/sec' % (name, seconds, ntexts / seconds, ntokens / seconds))
+
+
+if __name__ == '__main__':
+    usage = '%prog [options] /path/to/corpus.json|jsonl'
+    parser = OptionParser(usage)
+    parser.add_option('-n', '--limit', type='int', dest='limit', default=2000, help='Number of texts, default is 2000.')
+    parser.add_option('-b', '--batch-size', type='string', dest='batchsizes', default='50,200,1000',
+                      help='Comma separated batch sizes, default is 50,200,1000.')
+    parser.add_option('-t', '--threads', type='int', dest='threads', default=2, help='spaCy threads per batch, default is 2.')
+    parser.add_option('-j', '--jobs', type='int', dest='jobs', default=0, help='Also time N worker processes.')
+    parser.add_option('-c', '--clauses', action='store_true', dest='clauses', help='Also run the clause finder.')
+    options, args = parser.parse_args()
+    if len(args) == 0:
+        parser.error('no corpus to read')
+
+    texts = read_texts(args[0], options.limit)
+    start = time.time()
+    model.warm_up()
+    sys.stderr.write('Model loaded in %.2f sec\n' % (time.time() - start))
+
+    print('Texts: %i' % len(texts))
+    seconds, ntokens = time_parse(texts, options.clauses)
+    report('parse()', len(texts), seconds, ntokens)
+    for batchSize in [int(x) for x in options.batchsizes.split(',')]:
+        seconds, ntokens = time_parse_batch(texts, batchSize, options.threads, options.clauses)
+        report('parse_batch(batch_size=%i)' % batchSize, len(texts), seconds, ntokens)
+    if options.jobs > 1:
+        batchSize = max(1, len(texts) // (4 * options.jobs))
+        seconds, ntokens = time_annotate(texts, batchSize, options.jobs)
+        report('annotate(processes=%i)' % options.jobs, len(texts), seconds, ntokens)
@@ -0,0 +1,308 @@
+# Synthetic dependency trees and a scaling benchmark for ClauseFinder
+#
+# TreeGenerator builds random but well-formed Google NLP results from a small
+# clause grammar: subject, verb and object noun phrases with optional
+# determiners, adjectives and numbers, prepositional chains, appositions,
+# open clausal complements and conjunctions of verbs and objects. The
+# benchmark runs the clause finder over generated documents of increasing
+# size and reports time and allocations per token. Time per token should stay
+# flat as sentences get longer, growth points at a quadratic step.
+#
+# Usage: python -m clausefinder.bench.synthetic [options]
+
+import random
+import time
+from optparse import OptionParser
+from clausefinder import googlenlp
+from clausefinder.clause import ClauseFinder
+from clausefinder.common import IndexSpan
+
+_NOUNS = ['apples', 'boxes', 'marbles', 'pencils', 'books', 'friends', 'cookies', 'stamps', 'John', 'Mary',
+          'Sam', 'Bob', 'dollars', 'tickets', 'cards']
+_VERBS = ['has', 'buys', 'gives', 'sells', 'finds', 'eats', 'collects', 'loses', 'wants', 'needs', 'keeps']
+_ADJECTIVES = ['red', 'green', 'small', 'large', 'new', 'old', 'blue', 'empty']
+_DETERMINERS = ['the', 'some', 'each', 'a', 'his', 'her']
+_PREPOSITIONS = ['in', 'on', 'from', 'with', 'for', 'of']
+_NUMBERS = ['2', '3', '5', '7', '12', '20', 'four', 'six']
+
+
+class TreeGenerator(object):
+    '''Generate random well-formed Google NLP results.'''
+
+    def __init__(self, seed=None, conj=0.2, appos=0.1, xcomp=0.1, depth=2):
+        '''Constructor.
+
+        Args:
+            seed: The random seed, the same seed gives the same documents.
+            conj: The probability of a conjunction at each chance, clauses
+                and objects are conjoined.
+            appos: The probability that a subject has an apposition.
+            xcomp: The probability that a verb has an open clausal complement.
+            depth: The maximum length of a chain of prepositional phrases.
+        '''
+        self._rand = random.Random(seed)
+        self._conj = conj
+        self._appos = appos
+        self._xcomp = xcomp
+        self._depth = depth
+        self._tokens = None
+
+    def _add(self, text, tag, label, head=None):
+        # Add a token, head is a token index or None to set it later
+        self._tokens.append([text, tag, label, head])
+        return len(self._tokens) - 1
+
+    def _noun_phrase(self, label, head):
+        # [DET] [NUM|ADJ] NOUN, returns the index of the noun
+        mods = []
+        r = self._rand.random()
+        if r < 0.4:
+            mods.append(self._add(self._rand.choice(_DETERMINERS), 'DET', 'DET'))
+        if r < 0.3:
+            mods.append(self._add(self._rand.choice(_ADJECTIVES), 'ADJ', 'AMOD'))
+        elif r > 0.7:
+            mods.append(self._add(self._rand.choice(_NUMBERS), 'NUM', 'NUM'))
+        noun = self._add(self._rand.choice(_NOUNS), 'NOUN', label, head)
+        for m in mods:
+            self._tokens[m][3] = noun
+        return noun
+
+    def _prep_chain(self, head):
+        # PREP NP [PREP NP ...] up to the maximum depth
+        for _ in range(self._rand.randint(0, self._depth)):
+            prep = self._add(self._rand.choice(_PREPOSITIONS), 'ADP', 'PREP', head)
+            head = self._noun_phrase('POBJ', prep)
+
+    def _clause(self, label, head):
+        # Subject verb object with optional apposition, complement, object
+        # conjunctions and prepositional phrases. Returns the verb index.
+        subj = self._noun_phrase('NSUBJ', None)
+        if self._rand.random() < self._appos:
+            comma = self._add(',', 'PUNCT', 'P', subj)
+            self._noun_phrase('APPOS', subj)
+            self._tokens[comma][3] = subj
+            self._add(',', 'PUNCT', 'P', subj)
+        verb = self._add(self._rand.choice(_VERBS), 'VERB', label, head)
+        if head is None:
+            self._tokens[verb][3] = verb
+        self._tokens[subj][3] = verb
+        obj = self._noun_phrase('DOBJ', verb)
+        # ClauseFinder asserts on object conjunctions in a conjoined clause
+        # with its own subject, the objects are mapped to the first verb
+        while label != 'CONJ' and self._rand.random() < self._conj:
+            self._add('and', 'CONJ', 'CC', obj)
+            self._noun_phrase('CONJ', obj)
+        self._prep_chain(obj)
+        if self._rand.random() < self._xcomp:
+            to = self._add('to', 'PRT', 'AUX')
+            comp = self._add(self._rand.choice(_VERBS), 'VERB', 'XCOMP', verb)
+            self._tokens[to][3] = comp
+            self._noun_phrase('DOBJ', comp)
+        return verb
+
+    def sentence(self, length):
+        '''Generate the tokens of a sentence.
+
+        Args:
+            length: The minimum number of tokens, the sentence ends after the
+                first clause that reaches it.
+
+        Returns:
+            A list of (text, tag, label, head) tuples, head is an index into
+            the list.
+        '''
+        self._tokens = []
+        root = self._clause('ROOT', None)
+        while len(self._tokens) + 1 < length:
+            if self._rand.random() < self._conj:
+                self._add('and', 'CONJ', 'CC', root)
+                self._clause('CONJ', root)
+            else:
+                self._add(',', 'PUNCT', 'P', root)
+                self._clause('CCOMP', root)
+        self._add('.', 'PUNCT', 'P', root)
+        tokens = [tuple(t) for t in self._tokens]
+        self._tokens = None
+        return tokens
+
+    def document(self, nsentences, length):
+        '''Generate a Google NLP result.
+
+        Args:
+            nsentences: The number of sentences.
+            length: The minimum number of tokens per sentence.
+
+        Returns:
+            A Google NLP result with sentences and tokens.
+        '''
+        return make_result([self.sentence(length) for _ in range(nsentences)])
+
+
+def make_result(sentences):
+    '''Build a Google NLP result from generated sentences.
+
+    Args:
+        sentences: A list of sentences returned by TreeGenerator.sentence().
+
+    Returns:
+        A Google NLP result with sentences and tokens.
+    '''
+    results = []
+    tokens = []
+    offset = 0
+    for sentence in sentences:
+        base = len(tokens)
+        begin = offset
+        parts = []
+        for text, tag, label, head in sentence:
+            if len(parts) != 0 and tag != 'PUNCT':
+                parts.append(' ')
+                offset += 1
+            tokens.append({
+                'text': {'content': text, 'beginOffset': offset},
+                'lemma': text.lower(),
+                'partOfSpeech': {'tag': tag},
+                'dependencyEdge': {'headTokenIndex': base + head, 'label': label}
+            })
+            parts.append(text)
+            offset += len(text)
+        results.append({'text': {'content': ''.join(parts), 'beginOffset': begin}})
+        offset += 1
+    return {'sentences': results, 'tokens': tokens, 'language': 'en'}
+
+
+def find_clauses(doc, vectorize=False):
+    '''Run the clause finder over every sentence of a document. Sentences
+    that fail a ClauseFinder sanity assertion are counted, the generator
+    avoids the structures known to fail so the count should be 0. Other
+    exceptions are raised.
+
+    Args:
+        doc: A googlenlp.Doc instance.
+        vectorize: If True build clause spans with NumPy masks.
+
+    Returns:
+        A tuple (clauses, errors) with the number of clauses found and the
+        number of sentences that failed an assertion.
+    '''
+    cf = ClauseFinder(doc, vectorize=vectorize)
+    nclauses = 0
+    nerrors = 0
+    for sent in doc.sents:
+        try:
+            nclauses += len(cf.find_clauses(sent))
+        except AssertionError:
+            nerrors += 1
+    return nclauses, nerrors
+
+
+def count_allocations(docs, vectorize=False):
+    '''Count the Token and span instances created while finding clauses.
+
+    Args:
+        docs: A list of googlenlp.Doc instances.
+        vectorize: If True build clause spans with NumPy masks.
+
+    Returns:
+        A tuple (tokens, spans).
+    '''
+    counts = [0, 0]
+    tokenInit = googlenlp.Token.__init__
+    spanInit = IndexSpan.__init__
+
+    def counting_token_init(self, *args, **kwargs):
+        counts[0] += 1
+        tokenInit(self, *args, **kwargs)
+
+    def counting_span_init(self, *args, **kwargs):
+        counts[1] += 1
+        spanInit(self, *args, **kwargs)
+
+    googlenlp.Token.__init__ = counting_token_init
+    IndexSpan.__init__ = counting_span_init
+    try:
+        for doc in docs:
+            find_clauses(doc, vectorize)
+    finally:
+        googlenlp.Token.__init__ = tokenInit
+        IndexSpan.__init__ = spanInit
+    return counts[0], counts[1]
+
+
+def run_benchmark(generator, ndocs, nsentences, length, repeat=3, vectorize=False):
+    '''Time the clause finder on generated documents.
+
+    Args:
+        generator: A TreeGenerator instance.
+        ndocs: The number of documents.
+        nsentences: The number of sentences per document.
+        length: The minimum number of tokens per sentence.
+        repeat: The number of timed runs, the fastest is reported.
+        vectorize: If True build clause spans with NumPy masks.
+
+    Returns:
+        A dictionary with the keys tokens, clauses, errors, seconds,
+        usPerToken, tokenAllocs and spanAllocs. Allocations are per token.
+    '''
+    results = [generator.document(nsentences, length) for _ in range(ndocs)]
+    ntokens = sum([len(r['tokens']) for r in results])
+    best = None
+    nclauses = 0
+    nerrors = 0
+    for _ in range(repeat):
+        start = time.time()
+        # Fresh documents so each run pays for building its tokens
+        docs = [googlenlp.Doc(r) for r in results]
+        counts = [find_clauses(doc, vectorize) for doc in docs]
+        nclauses = sum([c[0] for c in counts])
+        nerrors = sum([c[1] for c in counts])
+        seconds = time.time() - start
+        if best is None or seconds < best:
+            best = seconds
+    tokenAllocs, spanAllocs = count_allocations([googlenlp.Doc(r) for r in results], vectorize)
+    return {
+        'tokens': ntokens,
+        'clauses': nclauses,
+        'errors': nerrors,
+        'seconds': best,
+        'usPerToken': 1e6 * best / max(ntokens, 1),
+        'tokenAllocs': float(tokenAllocs) / max(ntokens, 1),
+        'spanAllocs': float(spanAllocs) / max(ntokens, 1)
+    }
+
+
+def _int_list(s):
+    return [int(x) for x in s.split(',')]
+
+
+if __name__ == '__main__':
+    usage = '%prog [options]'
+    parser = OptionParser(usage)
+    parser.add_option('-l', '--lengths', type='string', dest='lengths', default='10,20,40,80,160',
+                      help='Comma separated sentence lengths, default is 10,20,40,80,160.')
+    parser.add_option('-s', '--sentences', type='string', dest='sentences', default='1',
+                      help='Comma separated sentences per document, default is 1.')
+    parser.add_option('-n', '--tokens', type='int', dest='tokens', default=20000,
+                      help='Approximate tokens per configuration, default is 20000.')
+    parser.add_option('-c', '--conj', type='float', dest='conj', default=0.2, help='Conjunction probability, default is 0.2.')
+    parser.add_option('-a', '--appos', type='float', dest='appos', default=0.1, help='Apposition probability, default is 0.1.')
+    parser.add_option('-x', '--xcomp', type='float', dest='xcomp', default=0.1, help='XCOMP probability, default is 0.1.')
+    parser.add_option('-d', '--depth', type='int', dest='depth', default=2, help='Maximum prepositional chain, default is 2.')
+    parser.add_option('-r', '--repeat', type='int', dest='repeat', default=3, help='Timed runs per configuration, default is 3.')
+    parser.add_option('-V', '--vectorize', action='store_true', dest='vectorize', help='Build clause spans with NumPy masks.')
+    parser.add_option('--seed', type='int', dest='seed', default=1, help='Random seed, default is 1.')
+    options, args = parser.parse_args()
+
+    print('%9s %6s %6s %8s %8s %7s %9s %12s %11s' % ('sentences', 'length', 'docs', 'tokens', 'clauses', 'errors',
+                                                     'us/token', 'tokens/token', 'spans/token'))
+    baseline = None
+    for nsentences in _int_list(options.sentences):
+        for length in _int_list(options.lengths):
+            generator = TreeGenerator(options.seed, options.conj, options.appos, options.xcomp, options.depth)
+            ndocs = max(1, options.tokens // (nsentences * length))
+            r = run_benchmark(generator, ndocs, nsentences, length, options.repeat, options.vectorize)
+            if baseline is None:
+                baseline = r['usPerToken']
+            print('%9i %6i %6i %8i %8i %7i %9.2f %12.2f %11.2f  x%.2f' % (nsentences, length, ndocs, r['tokens'],
+                  r['clauses'], r['errors'], r['usPerToken'], r['tokenAllocs'], r['spanAllocs'],
+                  r['usPerToken'] / baseline))
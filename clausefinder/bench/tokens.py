@@ -0,0 +1,69 @@
+# Token allocation benchmark for googlenlp.Doc
+#
+# Counts how many Token instances find_clauses allocates compared with the
+# number of token lookups (doc[i], iteration, head and children). Before
+# Doc cached its tokens every lookup allocated a new Token.
+
+import json
+import time
+from optparse import OptionParser
+from clausefinder import ClauseFinder
+from clausefinder import googlenlp
+from clausefinder.bench import DEFAULT_JSON
+
+
+def count_allocations(nlpResult, repeat=1):
+    '''Run the clause finder over a document and count token allocations.
+
+    Args:
+        nlpResult: A Google NLP result or compact annotation.
+        repeat: The number of times the clause finder is run.
+
+    Returns:
+        A tuple (lookups, allocations, seconds).
+    '''
+    counts = [0, 0]
+    tokenInit = googlenlp.Token.__init__
+    docToken = googlenlp.Doc._token
+
+    def counting_init(self, doc, offset):
+        counts[1] += 1
+        tokenInit(self, doc, offset)
+
+    def counting_token(self, i):
+        counts[0] += 1
+        return docToken(self, i)
+
+    googlenlp.Token.__init__ = counting_init
+    googlenlp.Doc._token = counting_token
+    try:
+        start = time.time()
+        doc = googlenlp.Doc(nlpResult)
+        for _ in range(repeat):
+            cf = ClauseFinder(doc)
+            for s in doc.sents:
+                cf.find_clauses(s)
+        seconds = time.time() - start
+    finally:
+        googlenlp.Token.__init__ = tokenInit
+        googlenlp.Doc._token = docToken
+    return counts[0], counts[1], seconds
+
+
+if __name__ == '__main__':
+    usage = '%prog [options] [/path/to/google/response.json]'
+    parser = OptionParser(usage)
+    parser.add_option('-r', '--repeat', type='int', dest='repeat', default=10, help='Number of clause finder runs, default is 10.')
+    options, args = parser.parse_args()
+
+    jsonfile = args[0] if len(args) != 0 else DEFAULT_JSON
+    with open(jsonfile, 'rt') as fd:
+        result = json.load(fd)
+
+    lookups, allocs, seconds = count_allocations(result, options.repeat)
+    print('Document: %s (%i tokens)' % (jsonfile, len(result['tokens'] if 'tokens' in result else result['text'])))
+    print('Runs:            %i' % options.repeat)
+    print('Token lookups:   %i (one allocation each without caching)' % lookups)
+    print('Token allocs:    %i' % allocs)
+    print('Reduction:       %.1fx' % (float(lookups) / max(allocs, 1)))
+    print('Time:            %.3f sec' % seconds)
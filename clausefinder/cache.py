@@ -0,0 +1,82 @@
+# Persistent clause cache
+#
+# Stores the clauses found in a document keyed by the document fingerprint
+# and the clause finder version, so an unchanged corpus does not need the
+# clause finder to be run again. The cache is a SQLite database, many
+# processes can read it but writes should come from one process.
+
+import json
+import sqlite3
+from clausefinder.common import CLAUSEFINDER_VERSION
+
+
+class ClauseCache(object):
+    '''Clause cache backed by a SQLite file.'''
+
+    def __init__(self, filename, version=CLAUSEFINDER_VERSION, readonly=False):
+        '''Open or create a cache.
+
+        Args:
+            filename: The path to the cache file.
+            version: The clause finder version. Entries written by a different
+                version are never returned.
+            readonly: If True the cache will not be created or written.
+        '''
+        self._version = version
+        self._readonly = readonly
+        self._db = sqlite3.connect(filename)
+        if not readonly:
+            self._db.execute('CREATE TABLE IF NOT EXISTS clauses (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            self._db.commit()
+        self._pending = 0
+
+    def key(self, fingerprint):
+        '''Get the cache key for a document fingerprint.'''
+        return '%s:%s' % (self._version, fingerprint)
+
+    def get(self, doc):
+        '''Get the cached clauses of a document.
+
+        Args:
+            doc: A googlenlp.Doc instance or a document fingerprint.
+
+        Returns:
+            The clauses stored by put() or None if not cached.
+        '''
+        fingerprint = doc if isinstance(doc, basestring) else doc.fingerprint
+        row = self._db.execute('SELECT value FROM clauses WHERE key = ?', (self.key(fingerprint),)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def put(self, doc, clauses):
+        '''Store the clauses of a document. Changes are committed by flush().
+
+        Args:
+            doc: A googlenlp.Doc instance or a document fingerprint.
+            clauses: A JSON serializable list of clauses, see
+                batch.clause_to_dict().
+        '''
+        if self._readonly:
+            raise IOError('clause cache is read only')
+        fingerprint = doc if isinstance(doc, basestring) else doc.fingerprint
+        self._db.execute('INSERT OR REPLACE INTO clauses (key, value) VALUES (?, ?)',
+                         (self.key(fingerprint), json.dumps(clauses)))
+        self._pending += 1
+        if self._pending >= 1000:
+            self.flush()
+
+    def flush(self):
+        '''Commit pending writes.'''
+        if self._pending != 0:
+            self._db.commit()
+            self._pending = 0
+
+    def close(self):
+        '''Commit pending writes and close the cache.'''
+        self.flush()
+        self._db.close()
+
+    def __len__(self):
+        row = self._db.execute('SELECT COUNT(*) FROM clauses WHERE key LIKE ?', (self._version + ':%',)).fetchone()
+        return row[0]
@@ -8,6 +8,8 @@ from clausefinder.common import ClauseFinderMap
 from clausefinder.common import SyntheticSpan
 from clausefinder.common import IndexSpan
 from clausefinder.common import SubtreeSpan
+from clausefinder.googlenlp.vocab import LowerSet
+from clausefinder.vector import SpanMasks
 if not DELAY_SPACY_IMPORT:
     import spacynlp
 
@@ -26,6 +28,8 @@ def is_descendant(token, ancestor, module):
     Returns:
         True if token is a descendant of ancestor.
     '''
+    if module is googlenlp:
+        return token.doc.is_in_subtree(token.i, ancestor.i)
     while token.dep != module.dep.ROOT:
         if token.i == ancestor.i:
             return True
@@ -57,10 +61,10 @@ class Clause(object):
             self._objSpans = objectSpans
 
         # Now do final fixup
-        self._subjSpan._indexes = filter(lambda x: x <= subjectSpan.i, subjectSpan._indexes)
+        self._subjSpan.remove_after(subjectSpan.i)
         # Handle synthetic spans
         if isinstance(verbSpan, IndexSpan):
-            self._span._indexes = filter(lambda x: x <= verbSpan.i, verbSpan._indexes)
+            self._span.remove_after(verbSpan.i)
         '''
         for s in self._objSpans:
             # Truncate after first occurrence of punctuation or conjunction
@@ -86,10 +90,10 @@ class Clause(object):
     @property
     def text(self):
         '''Return a string represent the compoents of the clause.'''
-        txt = '(%s) (%s)' % (self._subjSpan.text, self._span.text)
+        parts = ['(%s) (%s)' % (self._subjSpan.text, self._span.text)]
         for s in self._objSpans:
-            txt += ' (%s)' % s.text
-        return txt
+            parts.append(' (%s)' % s.text)
+        return ''.join(parts)
 
     @property
     def type(self):
@@ -120,7 +124,10 @@ class Clause(object):
 class ParsedClause(Clause):
     '''View of a clause in a sentence.'''
 
-    def __init__(self, doc, type, subject, verb, objects=None, exclude=None, merge=None):
+    def __init__(self, doc, type, subject, verb, objects=None, exclude=None, merge=None, profile=None,
+                 masks=None):
+        if profile is not None:
+            profile.enter('spans')
         module = None
         if isinstance(doc, googlenlp.Doc):
             module = googlenlp
@@ -138,100 +145,157 @@ class ParsedClause(Clause):
         if not isinstance(verb, module.Token):
             raise TypeError
 
-        # Calculate excluded token span
-        excludeSpan = IndexSpan(doc)
-        if exclude is not None:
-            for x in exclude:
-                if isinstance(x, module.Token):
-                    excludeSpan.union(SubtreeSpan(x))
-                elif isinstance(x, list):
-                    if len(x) > 0:
-                        if isinstance(x[0], module.Token):
-                            excludeSpan._indexes.extend(
-                                filter(lambda y: y not in excludeSpan._indexes, [y.i for y in x]))
+        if masks is not None:
+            subjSpan, verbSpan, objSpans, nsetOps = masks.clause_spans(subject, verb, objects, exclude, merge)
+            # Subject, verb and objects are counted below, there is no exclude span
+            nspans = len(objSpans) - 1
+            setOpSize = nsetOps * len(masks)
+        else:
+            # Span and set operation counts for the profile
+            nspans = 0
+            nsetOps = 0
+            setOpSize = 0
+
+            # Calculate excluded token span
+            excludeSpan = IndexSpan(doc)
+            if exclude is not None:
+                for x in exclude:
+                    if isinstance(x, module.Token):
+                        xs = SubtreeSpan(x)
+                    elif isinstance(x, list):
+                        if len(x) > 0:
+                            if isinstance(x[0], module.Token):
+                                xs = IndexSpan(doc, [y.i for y in x])
+                            else:
+                                raise TypeError
                         else:
+                            continue
+                    else:
+                        raise TypeError
+                    if profile is not None:
+                        nspans += 1
+                        nsetOps += 1
+                        setOpSize += len(xs)
+                    excludeSpan.union(xs)
+
+            # Calculate span of subject
+            subjSpan = SubtreeSpan(subject)
+            if profile is not None:
+                nsetOps += 1
+                setOpSize += len(excludeSpan)
+            subjSpan.complement(excludeSpan)
+            if len(subjSpan) == 0:
+                subjSpan._indexes = [subject.i]
+
+            # Calculate span of objects
+            if objects is not None:
+                if isinstance(objects, collections.Iterable):
+                    objSpans = []
+                    for o in objects:
+                        if not isinstance(o, module.Token):
                             raise TypeError
+                        objSpans.append(SubtreeSpan(o))
+                    # O(n^2) but len(objects) is typically < 3
+                    for o, s in zip(objects, objSpans):
+                        for p, t in zip(objects, objSpans):
+                            if p.i == o.i:
+                                continue
+                            if is_descendant(p, o, module):
+                                if profile is not None:
+                                    nsetOps += 1
+                                    setOpSize += len(t)
+                                s.complement(t)
+                            elif is_descendant(o, p, module):
+                                if profile is not None:
+                                    nsetOps += 1
+                                    setOpSize += len(s)
+                                t.complement(s)
                 else:
-                    raise TypeError
-
-        # Calculate span of subject
-        subjSpan = SubtreeSpan(subject)
-        subjSpan.complement(excludeSpan)
-        if len(subjSpan) == 0:
-            subjSpan._indexes = [subject.i]
-
-        # Calculate span of objects
-        if objects is not None:
-            if isinstance(objects, collections.Iterable):
-                objSpans = []
-                for o in objects:
-                    if not isinstance(o, (googlenlp.Token, spacynlp.Token)):
+                    if not isinstance(objects, module.Token):
                         raise TypeError
-                    objSpans.append(SubtreeSpan(o))
-                # O(n^2) but len(objects) is typically < 3
-                for o, s in zip(objects, objSpans):
-                    for p, t in zip(objects, objSpans):
-                        if p.i == o.i:
-                            continue
-                        if is_descendant(p, o, module):
-                            s._indexes = filter(lambda x: x not in t._indexes, s._indexes)
-                        elif is_descendant(o, p, module):
-                            t._indexes = filter(lambda x: x not in s._indexes, t._indexes)
+                    objSpans = [SubtreeSpan(objects)]
             else:
-                if not isinstance(objects, (googlenlp.Token, spacynlp.Token)):
-                    raise TypeError
-                objSpans = [SubtreeSpan(objects)]
-        else:
-            objSpans = []
-
-        # Calculate span of verb - remove objects, subject, and exclude spans
-        # Calc indexes to remove from verb span
-        toRem = []
-        toRem.extend(subjSpan._indexes)
-        toRem.extend(excludeSpan._indexes)
-        emptyObjs = []
-        for i in reversed(range(len(objSpans))):
-            s = objSpans[i]
-            # Remove exclude region form object spans
-            s.complement(excludeSpan)
-            toRem.extend(s._indexes)
-            # Remove dep mark starting a span
-            if len(s._indexes) > 0 and doc[s._indexes[0]].dep == module.dep.MARK:
-                s._indexes.pop(0)
-            s.repair()
-
-        verbSpan = SubtreeSpan(verb, shallow=True)
-        if verb.i > 0 and doc[verb.i].dep == module.dep.AUXPASS:
-            verbSpan._indexes = [verb.i-1, verb.i]
-        '''
-        complement = filter(lambda x: x not in toRem, verbSpan._indexes)
-        if len(complement) == 0:
-            complement = [verb.i]
-        verbSpan._indexes = complement
-        '''
-        subjSpan.repair()
-        verbSpan.repair()
-        # Process merges formatted as: [ [focusIdx1, idx1, ...], [focusIdx2, idxN, ...]]
-        if merge is not None and len(merge) > 0:
-            for m in merge:
-                focus = objSpans[ m[0] ]
-                m = m[1:]
-                m.sort()
-                for i in reversed(m):
-                    focus.union(objSpans[i])
-                    objSpans.pop(i)
+                objSpans = []
+
+            nspans += len(objSpans)
+
+            for i in reversed(range(len(objSpans))):
+                s = objSpans[i]
+                # Remove exclude region form object spans
+                if profile is not None:
+                    nsetOps += 1
+                    setOpSize += len(excludeSpan)
+                s.complement(excludeSpan)
+                # Remove dep mark starting a span
+                if len(s._indexes) > 0 and doc[s._indexes[0]].dep == module.dep.MARK:
+                    s.discard(s._indexes[0])
+                s.repair()
+
+            verbSpan = SubtreeSpan(verb, shallow=True)
+            if verb.i > 0 and doc[verb.i].dep == module.dep.AUXPASS:
+                verbSpan._indexes = [verb.i-1, verb.i]
+            subjSpan.repair()
+            verbSpan.repair()
+            # Process merges formatted as: [ [focusIdx1, idx1, ...], [focusIdx2, idxN, ...]]
+            if merge is not None and len(merge) > 0:
+                for m in merge:
+                    focus = objSpans[ m[0] ]
+                    m = m[1:]
+                    m.sort()
+                    for i in reversed(m):
+                        if profile is not None:
+                            nsetOps += 1
+                            setOpSize += len(objSpans[i])
+                        focus.union(objSpans[i])
+                        objSpans.pop(i)
         # Finally call base class
         super(ParsedClause, self).__init__(doc=doc, type=type, subjectSpan=subjSpan, verbSpan=verbSpan, objectSpans=objSpans)
+        if profile is not None:
+            # Subject, verb, exclude and object spans
+            profile.count('spans', nspans + 3)
+            profile.count('setOps', nsetOps)
+            profile.count('setOpSize', setOpSize)
+            profile.leave()
 
 
 class ClauseFinder(object):
     '''Class to find the clauses in a document.'''
 
-    def __init__(self, doc):
+    def __init__(self, doc, profile=None, vectorize=False):
         '''Constructor.
 
         Args:
              doc: A google.Doc or spacy.Doc
+             profile: An optional instrument.PhaseProfile that collects phase
+                times and counters for all sentences of the document.
+             vectorize: If True compute clause spans with NumPy masks, see
+                vector.SpanMasks. Requires numpy.
+        '''
+        self._masks = None
+        self._vectorize = vectorize
+        self._map = ClauseFinderMap()
+        self._conjAMap = ClauseFinderMap()
+        self._conjOMap = ClauseFinderMap()
+        self._conjVMap = ClauseFinderMap()
+        # Governor tables hold a token index or -1 if there is no governor.
+        # An entry is only valid if _govGen holds the current _docGen, else
+        # the token has not been looked up yet.
+        self._docGen = 0
+        self._govGen = []
+        self._govVerb = []
+        self._govSubj = []
+        self._govObj = []
+        self._govVA = []
+        self._firstOfConj = []
+        self.reset(doc, profile)
+
+    def reset(self, doc, profile=None):
+        '''Reuse the clause finder for another document. The lookup tables are
+        kept and only grow, so a batch run does not allocate them per document.
+
+        Args:
+             doc: A google.Doc or spacy.Doc
+             profile: An optional instrument.PhaseProfile.
         '''
         if isinstance(doc, googlenlp.Doc):
             self._nlp = googlenlp
@@ -241,13 +305,45 @@ class ClauseFinder(object):
                 import spacynlp
             if isinstance(doc, spacynlp.Doc):
                 self._nlp = spacynlp
+                spacynlp.init_tags(doc.vocab)
             else:
                 raise TypeError
         self._doc = doc
-        self._map = ClauseFinderMap(doc)
-        self._conjAMap = ClauseFinderMap(doc)
-        self._conjOMap = ClauseFinderMap(doc)
-        self._conjVMap = ClauseFinderMap(doc)
+        self._profile = profile
+        # Relative pronouns, created on first use
+        self._relSet = None
+        self._map.reset(doc)
+        self._conjAMap.reset(doc)
+        self._conjOMap.reset(doc)
+        self._conjVMap.reset(doc)
+        if self._vectorize:
+            if self._masks is None:
+                self._masks = SpanMasks(doc, self._nlp)
+            else:
+                self._masks.reset(doc, self._nlp)
+        if self._nlp is googlenlp:
+            self._headCol = doc._head
+            self._depCol = doc._dep
+            self._posCol = doc._pos
+        else:
+            self._headCol = [t.head.i for t in doc]
+            self._depCol = [t.dep for t in doc]
+            self._posCol = [t.pos for t in doc]
+        self._docGen += 1
+        grow = len(doc) - len(self._govGen)
+        if grow > 0:
+            self._govGen.extend([0] * grow)
+            for table in [self._govVerb, self._govSubj, self._govObj, self._govVA, self._firstOfConj]:
+                table.extend([-1] * grow)
+
+    def _is_relative_pronoun(self, token):
+        # True if the token is 'which' or 'that' in any case. Google documents
+        # compare vocabulary ids instead of strings.
+        if self._nlp is not googlenlp:
+            return token.text.lower() in ['which', 'that']
+        if self._relSet is None:
+            self._relSet = LowerSet(self._doc._vocab, [u'which', u'that'])
+        return self._doc._textId[token.i] in self._relSet
 
     def _process_as_obj(self, O, V=None):
         if V is None: V = self.get_governor_verb(O)
@@ -276,7 +372,7 @@ class ClauseFinder(object):
                 assert V != token
                 self._conjVMap.insert_new(V, [A])
                 self._conjVMap.append(V, token)
-            elif A.dep in [self._nlp.dep.DOBJ, self._nlp.dep.IOBJ, self._nlp.dep.ACOMP]:
+            elif self._nlp.IS_OBJECT[A.dep]:
                 self._conjOMap.insert_new(V, [A])
                 self._conjOMap.append(V, token)
             else:
@@ -290,11 +386,82 @@ class ClauseFinder(object):
         V = self.get_governor_verb(O)
         if V is not None:
             if O.pos == self._nlp.pos.VERB or \
-                            O.dep in [self._nlp.dep.DOBJ, self._nlp.dep.IOBJ, self._nlp.dep.ACOMP] or \
+                            self._nlp.IS_OBJECT[O.dep] or \
                             self.get_governor_obj(O) is not None:
                 return True
         return False
 
+    def _build_governors(self, i):
+        '''Fill the governor table entries of a token and of the ancestors
+        that have none yet. Entries are computed top down from the integer
+        columns, each from the entry of its head, so a token is visited at
+        most once per document and tokens never looked up are not visited.
+
+        Args:
+            i: A token index.
+        '''
+        profile = self._profile
+        if profile is not None:
+            profile.enter('governors')
+        nlp = self._nlp
+        head = self._headCol
+        deps = self._depCol
+        poss = self._posCol
+        gen = self._docGen
+        govGen = self._govGen
+        govVerb = self._govVerb
+        govSubj = self._govSubj
+        govObj = self._govObj
+        govVA = self._govVA
+        firstOfConj = self._firstOfConj
+        isObject = nlp.IS_OBJECT
+        rootId = nlp.dep.ROOT
+        conjId = nlp.dep.CONJ
+        nsubjId = nlp.dep.NSUBJ
+        verbId = nlp.pos.VERB
+        adjId = nlp.pos.ADJ
+        # Walk up to the first ancestor with entries or to the root
+        path = []
+        while govGen[i] != gen:
+            path.append(i)
+            if deps[i] == rootId:
+                break
+            i = head[i]
+        for i in reversed(path):
+            govGen[i] = gen
+            d = deps[i]
+            isVerb = poss[i] == verbId
+            if d == rootId:
+                govVerb[i] = i if isVerb else -1
+                govSubj[i] = -1
+                govObj[i] = -1
+                govVA[i] = i if isVerb or poss[i] == adjId else -1
+                firstOfConj[i] = i
+            else:
+                h = head[i]
+                if isVerb:
+                    # Trace conjunctions
+                    govVerb[i] = govVerb[h] if d == conjId and poss[h] == verbId else i
+                else:
+                    govVerb[i] = govVerb[h]
+                govSubj[i] = i if d == nsubjId else govSubj[h]
+                govObj[i] = i if isObject[d] else govObj[h]
+                govVA[i] = i if isVerb or poss[i] == adjId else govVA[h]
+                firstOfConj[i] = firstOfConj[h] if d == conjId else i
+        if profile is not None:
+            profile.count('governorSteps', len(path))
+            profile.leave()
+
+    def _lookup_governor(self, table, token):
+        # Map a governor table entry to a token
+        i = token.i
+        if self._govGen[i] != self._docGen:
+            self._build_governors(i)
+        i = table[i]
+        if i < 0:
+            return None
+        return self._doc[i]
+
     def get_governor_verb(self, token):
         '''Get the verb governor of token. If the verb is part of a conjunction
          then the head of conjunction is returned.
@@ -305,16 +472,7 @@ class ClauseFinder(object):
         Returns:
             The governor verb if it exists or None.
         '''
-        while token.dep != self._nlp.dep.ROOT:
-            if token.pos == self._nlp.pos.VERB:
-                # Trace conjunctions
-                while token.dep == self._nlp.dep.CONJ and token.head.pos == self._nlp.pos.VERB:
-                    token = token.head
-                return token
-            token = token.head
-        if token.pos == self._nlp.pos.VERB:
-            return token
-        return None
+        return self._lookup_governor(self._govVerb, token)
 
     def get_governor_pos(self, token, pos):
         '''Get the governor part-of-speech of token.
@@ -334,6 +492,18 @@ class ClauseFinder(object):
             return token
         return None
 
+    def get_governor_verb_or_adj(self, token):
+        '''Get the verb or adjective governor of token. Same as
+        get_governor_pos(token, [VERB, ADJ]).
+
+        Args:
+            token: A Token instance.
+
+        Returns:
+            The governor verb or adjective if it exists or None.
+        '''
+        return self._lookup_governor(self._govVA, token)
+
     def get_governor_subj(self, token):
         '''Get the governor subject token.
 
@@ -343,11 +513,7 @@ class ClauseFinder(object):
         Returns:
             The governor subject if it exists or None.
         '''
-        while token.dep != self._nlp.dep.ROOT:
-            if token.dep == self._nlp.dep.NSUBJ:
-                return token
-            token = token.head
-        return None
+        return self._lookup_governor(self._govSubj, token)
 
     def get_governor_obj(self, token):
         '''Get the governor object token.
@@ -358,11 +524,7 @@ class ClauseFinder(object):
         Returns:
             The governor object if it exists or None.
         '''
-        while token.dep != self._nlp.dep.ROOT:
-            if token.dep in [self._nlp.dep.DOBJ, self._nlp.dep.IOBJ, self._nlp.dep.ACOMP]:
-                return token
-            token = token.head
-        return None
+        return self._lookup_governor(self._govObj, token)
 
     def get_first_of_conj(self, token):
         '''Get the first conjunction linking to token.
@@ -374,20 +536,36 @@ class ClauseFinder(object):
             The first token in the conjunction.
         '''
         assert token.dep == self._nlp.dep.CONJ
-        while token.dep != self._nlp.dep.ROOT:
-            if token.dep != self._nlp.dep.CONJ:
-                return token
-            token = token.head
-        return token
+        return self._lookup_governor(self._firstOfConj, token)
 
-    def find_clauses(self, sentence):
+    def find_clauses(self, sentence, types=None):
         '''Find all clauses in a sentence.
 
         Args:
             sentence: A Span describing a sentence.
+            types: An optional set of clause types, e.g. set(['ISA', 'SVO']).
+                Clauses of other types are not built.
 
         Returns:
-            A list of Clause instances or a Clause instance.
+            A list of Clause instances.
+        '''
+        return list(self.iter_clauses(sentence, types))
+
+    def iter_clauses(self, sentence, types=None):
+        '''Find the clauses in a sentence lazily. The sentence is walked on the
+        first call to next() and each clause is built when it is yielded, so
+        a caller that stops early or filters by type does not pay for the
+        span computations of the clauses it does not want. The clause finder
+        must not be used for another sentence until the iterator is
+        exhausted or discarded.
+
+        Args:
+            sentence: A Span describing a sentence.
+            types: An optional set of clause types, e.g. set(['ISA', 'SVO']).
+                Clauses of other types are not built.
+
+        Yields:
+            Clause instances in the order find_clauses() returns them.
         '''
         global DELAY_SPACY_IMPORT
         if not isinstance(sentence, SubtreeSpan):
@@ -395,6 +573,23 @@ class ClauseFinder(object):
                 import spacynlp
             if not isinstance(sentence, spacynlp.Span):
                 raise TypeError
+        if self._profile is None:
+            return self._iter_clauses(sentence, types, None)
+        return self._profile_clauses(self._iter_clauses(sentence, types, self._profile), self._profile)
+
+    def _profile_clauses(self, clauses, profile):
+        # Stop the phase clocks while the caller has control
+        try:
+            for clause in clauses:
+                profile.count('clauses')
+                phases = profile.pause()
+                yield clause
+                profile.resume(phases)
+        finally:
+            # Close phases left open by an exception or an early exit
+            profile.leave_all()
+
+    def _iter_clauses(self, sentence, types, profile):
         # Reset lookup tables
         self._map.clear()
         self._conjAMap.clear()
@@ -402,10 +597,14 @@ class ClauseFinder(object):
         self._conjVMap.clear()
         excludeList = []
         coordList = []
-        clauses = []
         state = (states.ROOT_FIND, None)
         stk = [ ]
+        if profile is not None:
+            profile.enter('walk')
+            profile.count('sentences')
+            profile.count('tokens', len(sentence))
         # find all token indexes from this root
+        dep = self._nlp.dep
         for token in sentence:
             if state[0] == states.NSUBJ_FIND:
                 if self.get_governor_subj(token) != state[1]:
@@ -413,12 +612,13 @@ class ClauseFinder(object):
                 #else:
                 #    excludeList.append(token)
 
+            tokDep = token.dep
             # 'NSUBJPASS', 'CSUBJ', 'CSUBJPASS', 'NOMCSUBJ', 'NOMCSUBJPASS'
-            if token.dep  == self._nlp.dep.NSUBJ:
+            if tokDep == dep.NSUBJ:
                 self._process_as_subj(token)
 
-            elif token.dep == self._nlp.dep.NSUBJPASS:
-                if token.text.lower() in ['which', 'that']:
+            elif tokDep == dep.NSUBJPASS:
+                if self._is_relative_pronoun(token):
                     S = self.get_governor_subj(token)
                     if S is None:
                         self._process_as_subj(token)
@@ -441,36 +641,37 @@ class ClauseFinder(object):
                 else:
                     self._process_as_obj(token, self.get_governor_verb(token))
 
-            elif token.dep in [self._nlp.dep.DOBJ, self._nlp.dep.IOBJ, self._nlp.dep.ACOMP, self._nlp.dep.ATTR]:
+            elif self._nlp.IS_OBJECT[tokDep] or tokDep == dep.ATTR:
                 self._process_as_obj(token)
 
-            elif token.dep == self._nlp.dep.APPOS:
+            elif tokDep == dep.APPOS:
                 # Check if we need to create a synthetic is-a relationship
-                if token.head.dep in [self._nlp.dep.NSUBJ, self._nlp.dep.NSUBJPASS]:
+                if self._nlp.IS_SUBJECT[token.head.dep]:
                     if state[0] == states.NSUBJ_FIND:
                         assert token.head.dep == self._nlp.dep.NSUBJPASS
                         S = state[1]
                     else:
                         S = token.head
                     excludeList.append(token)
-                    clauses.append(Clause(self._doc, \
-                                          type='ISA', \
-                                          subjectSpan=SubtreeSpan(S, shallow=True), \
-                                          verbSpan=SyntheticSpan('is'), \
-                                          objectSpans=SubtreeSpan(token)))
+                    if types is None or 'ISA' in types:
+                        yield Clause(self._doc, \
+                                     type='ISA', \
+                                     subjectSpan=SubtreeSpan(S, shallow=True), \
+                                     verbSpan=SyntheticSpan('is'), \
+                                     objectSpans=SubtreeSpan(token))
                     S = None
-            elif token.dep == self._nlp.dep.CONJ:
+            elif tokDep == dep.CONJ:
                 # Find the first conjunction and label all other the same
                 self._process_conj(token)
 
-            elif token.dep == self._nlp.dep.CC:
+            elif tokDep == dep.CC:
                 # Save for later. This will be excluded when we expand conjunctions
                 if self._check_conj(token):
                     coordList.append(token)
 
-            elif token.dep in [self._nlp.dep.XCOMP, self._nlp.dep.CCOMP]:
+            elif tokDep == dep.XCOMP or tokDep == dep.CCOMP:
                 # Xcomp can have a VERB or ADJ as a parent
-                VA = self.get_governor_pos(token.head, [self._nlp.pos.VERB, self._nlp.pos.ADJ])
+                VA = self.get_governor_verb_or_adj(token.head)
                 if VA is not None:
                     if VA.dep == self._nlp.dep.ROOT:
                         # OK token will be used as is
@@ -484,11 +685,16 @@ class ClauseFinder(object):
                         if VA not in self._map.lookup(V):
                             self._map.append(V, VA)
 
+        if profile is not None:
+            profile.leave()
+            profile.enter('expand')
+        typeName = self._nlp.TYPE_NAME
         for k, m in self._map:
-            if m is None or self._nlp.get_type_name(m[0].dep) != 'S': continue
-            type = ''
-            for tok in m:
-                type += self._nlp.get_type_name(tok.pos) + self._nlp.get_type_name(tok.dep)
+            if m is None or typeName[m[0].dep] != 'S': continue
+            type = ''.join([typeName[tok.pos] + typeName[tok.dep] for tok in m])
+            # Unwanted clauses are skipped but the exclude lists are still
+            # updated, later clauses depend on them
+            wanted = types is None or type in types
 
             if len(m) >= 3:
                 # Check for conjunctions. Iterate and replace the object in SVO.
@@ -516,8 +722,9 @@ class ClauseFinder(object):
                         objs[1] = O
                         conjAList = self._conjAMap.lookup(m[2])
                         if conjAList is None:
-                            clauses.append(ParsedClause(doc=self._doc, type=type, subject=m[0], verb=V, objects=objs[1:],
-                                                        exclude=exclude))
+                            if wanted:
+                                yield ParsedClause(doc=self._doc, type=type, subject=m[0], verb=V, objects=objs[1:],
+                                                   exclude=exclude, profile=profile, masks=self._masks)
                         else:
                             excludeA = exclude
                             if conjAList[0].dep == self._nlp.dep.AMOD:
@@ -531,8 +738,9 @@ class ClauseFinder(object):
                                 x = []
                                 x.extend(excludeA)
                                 x.extend(conjAList[i+1:])
-                                clauses.append(ParsedClause(doc=self._doc, type=type, subject=m[0], verb=V, objects=objs,
-                                                            exclude=x, merge=merge))
+                                if wanted:
+                                    yield ParsedClause(doc=self._doc, type=type, subject=m[0], verb=V, objects=objs,
+                                                       exclude=x, merge=merge, profile=profile, masks=self._masks)
                                 excludeA.append(A)
                             objs[0] = None
                         objs[1] = None
@@ -542,8 +750,12 @@ class ClauseFinder(object):
                     conjVList = [m[1]]
                 else: # sanity check
                     assert m[1] == conjVList[0]
+                if not wanted:
+                    continue
                 for V in conjVList:
-                    clauses.append(ParsedClause(doc=self._doc, type=type, subject=m[0], verb=V, exclude=excludeList))
+                    yield ParsedClause(doc=self._doc, type=type, subject=m[0], verb=V, exclude=excludeList,
+                                       profile=profile, masks=self._masks)
 
-        return clauses
+        if profile is not None:
+            profile.leave()
 
@@ -1,21 +1,52 @@
+# Import spacynlp on first use so the Google path works without spaCy installed
 DELAY_SPACY_IMPORT = True
 
+# Increment when a change alters the output of ClauseFinder.find_clauses.
+# Used to invalidate cached clauses.
+CLAUSEFINDER_VERSION = '0.2'
+
+
 class ClauseFinderMap(object):
-    '''Helper for ClauseFinder. Should be faster than a dictionary, especially
-    for large documents, since clear, insert and lookup are done in O(1) time.
+    '''Helper for ClauseFinder. Maps tokens to values and iterates in
+    insertion order. Should be faster than a dictionary, especially for large
+    documents, since clear, insert and lookup are done in O(1) time.
+
+    Each token slot is stamped with the generation it was written in. clear()
+    starts a new generation so all older slots read as empty without being
+    touched. reset() reuses the slots for another document.
     '''
 
-    def __init__(self, doc):
+    def __init__(self, doc=None):
         '''Constructor
 
         Args:
-            doc: A googlenlp.Doc or spacy.Doc instance
+            doc: A googlenlp.Doc or spacy.Doc instance, or None to create an
+                empty map that must be reset() before use.
         '''
         #if not isinstance(doc, (googlenlp.Doc, spacynlp.Doc)):
         #    raise TypeError
-        self._tokMap = [0] * len(doc)
+        self._gen = 0
+        self._tokGen = []
+        self._tokMap = []
         self._tokLimit = 0
         self._map = []
+        if doc is not None:
+            self.reset(doc)
+
+    def reset(self, doc):
+        '''Clear the map and prepare it for a new document. The slots only
+        grow, so a map reused across a batch allocates once per size increase.
+
+        Args:
+            doc: A googlenlp.Doc or spacy.Doc instance.
+        '''
+        grow = len(doc) - len(self._tokGen)
+        if grow > 0:
+            self._tokGen.extend([-1] * grow)
+            self._tokMap.extend([0] * grow)
+        # Release values that refer to the previous document
+        del self._map[:]
+        self.clear()
 
     def insert_new(self, key, value):
         '''Insert value at key if the key is not mapped else do nothing.
@@ -27,28 +58,29 @@ class ClauseFinderMap(object):
         Returns:
             True if the inserted, false if not.
         '''
-        if self._tokMap[key.i] >= self._tokLimit or self._map[self._tokMap[key.i]][0] != key.i:
-            self._tokMap[key.i] = self._tokLimit
-            if self._tokLimit < len(self._map):
-                self._map[self._tokLimit] = (key.i, value)
-            else:
-                assert self._tokLimit == len(self._map)
-                self._map.append((key.i, value))
-            self._tokLimit += 1
-            return True
-        return False
+        i = key.i
+        if self._tokGen[i] == self._gen:
+            return False
+        self._tokGen[i] = self._gen
+        self._tokMap[i] = self._tokLimit
+        if self._tokLimit < len(self._map):
+            self._map[self._tokLimit] = (i, value)
+        else:
+            self._map.append((i, value))
+        self._tokLimit += 1
+        return True
 
-    def clear(self, deep=True):
-        '''Clears the map to an empty state.
+    def clear(self, deep=False):
+        '''Clears the map to an empty state in O(1) time.
 
         Args:
-            deep: If true do a deep reset in O(N) time, else do a shallow reset
-                in O(1) time.
+            deep: If true also release the values of the cleared entries, in
+                O(N) time.
         '''
-        # Once fully debugged we can set default deep=False.
         if deep:
             for i in range(self._tokLimit):
                 self._map[i] = None
+        self._gen += 1
         self._tokLimit = 0
 
     def append(self, key, value):
@@ -82,8 +114,9 @@ class ClauseFinderMap(object):
         Returns:
              The value at key.
         '''
-        if self._tokMap[key.i] < self._tokLimit and self._map[self._tokMap[key.i]][0] == key.i:
-            return self._map[self._tokMap[key.i]][1]
+        i = key.i
+        if self._tokGen[i] == self._gen:
+            return self._map[self._tokMap[i]][1]
 
     def replace(self, key, value):
         '''Replace the current value at key with a new value.
@@ -92,9 +125,10 @@ class ClauseFinderMap(object):
             key: An instance of Token.
             value: The new value.
         '''
-        if self._tokMap[key.i] < self._tokLimit and self._map[self._tokMap[key.i]][0] == key.i:
+        i = key.i
+        if self._tokGen[i] == self._gen:
             # map items are a tuple so keep list reference
-            L = self._map[self._tokMap[key.i]][1]
+            L = self._map[self._tokMap[i]][1]
             del L[0:len(L)]
             L.extend(value)
 
@@ -105,7 +139,11 @@ class ClauseFinderMap(object):
     def __getitem__(self, slice_i_j):
         # Iterable override
         if isinstance(slice_i_j, slice):
-            return self._map(range(slice_i_j))
+            return self._map[0:self._tokLimit][slice_i_j]
+        if slice_i_j < 0:
+            slice_i_j += self._tokLimit
+        if slice_i_j < 0 or slice_i_j >= self._tokLimit:
+            raise IndexError('map index out of range')
         return self._map[slice_i_j]
 
     def __iter__(self):
@@ -114,16 +152,110 @@ class ClauseFinderMap(object):
             yield self._map[i]
 
 
+def indexes_to_mask(indexes):
+    '''Convert a list of token indexes to a bitset.
+
+    Args:
+        indexes: An iterable of token indexes.
+
+    Returns:
+        An integer with bit i set for each index i.
+    '''
+    mask = 0
+    for i in indexes:
+        mask |= 1 << i
+    return mask
+
+
+def mask_to_indexes(mask):
+    '''Convert a bitset to a sorted list of token indexes.
+
+    Args:
+        mask: An integer bitset.
+
+    Returns:
+        A list of the set bit positions in ascending order.
+    '''
+    indexes = []
+    while mask:
+        low = mask & -mask
+        indexes.append(low.bit_length() - 1)
+        mask ^= low
+    return indexes
+
+
+def render_tokens(tokens):
+    '''Join token text. Tokens are separated by a space except punctuation
+    which is attached to the previous token.
+
+    Args:
+        tokens: A list of Token instances.
+
+    Returns:
+        A string.
+    '''
+    if len(tokens) == 0:
+        return ''
+    parts = [tokens[0].text]
+    for tok in tokens[1:]:
+        if not tok.is_punct:
+            parts.append(' ')
+        parts.append(tok.text)
+    return ''.join(parts)
+
+
+def range_mask(start, end):
+    '''Create a bitset for a contiguous range of token indexes.
+
+    Args:
+        start: The first token index.
+        end: One past the last token index.
+
+    Returns:
+        An integer with bits start to end-1 set.
+    '''
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
 class IndexSpan(object):
     '''View of a document. The class has a similar interface to spacy.Span
+
+    The token indexes are stored as a bitset so union, complement and intersect
+    are word parallel. The sorted index list is built on demand and cached, it
+    must not be modified in place, assign to _indexes instead.
     '''
     def __init__(self, doc, indexes=None):
         self._doc = doc
+        self._cache = None
+        self._textCache = None
         if indexes is None:
-            self._indexes = []
+            self._mask = 0
         else:
             self._indexes = indexes
 
+    @property
+    def _indexes(self):
+        if self._cache is None:
+            self._cache = mask_to_indexes(self._mask)
+        return self._cache
+
+    @_indexes.setter
+    def _indexes(self, indexes):
+        self._mask = indexes_to_mask(indexes)
+        self._changed()
+
+    def _changed(self):
+        # Invalidate cached index list and text
+        self._cache = None
+        self._textCache = None
+
+    @property
+    def mask(self):
+        '''The token indexes as a bitset.'''
+        return self._mask
+
     def __len__(self):
         return len(self._indexes)
 
@@ -137,36 +269,59 @@ class IndexSpan(object):
     def __repr__(self):
         return self.text
 
+    def __contains__(self, i):
+        return (self._mask >> i) & 1 == 1
+
+    def add(self, i):
+        '''Add a token index to the span.'''
+        self._mask |= 1 << i
+        self._changed()
+
+    def discard(self, i):
+        '''Remove a token index from the span if present.'''
+        self._mask &= ~(1 << i)
+        self._changed()
+
+    def remove_after(self, i):
+        '''Remove all token indexes greater than i from the span.'''
+        self._mask &= (1 << (i + 1)) - 1
+        self._changed()
+
     def union(self, other):
         '''Union two spans.'''
-        if other is None or len(other) == 0: return
-        self._indexes.extend(filter(lambda x: x not in self._indexes, other._indexes))
-        self._indexes.sort()
+        if other is None or other._mask == 0: return
+        self._mask |= other._mask
+        self._changed()
 
     def complement(self, other):
         '''Remove other from this span.'''
-        if other is None or len(other) == 0: return
-        self._indexes = filter(lambda x: x not in other._indexes, self._indexes)
+        if other is None or other._mask == 0: return
+        self._mask &= ~other._mask
+        self._changed()
 
     def intersect(self, other):
         '''Find common span.'''
-        if other is None or len(other) == 0:
-            self._indexes = []
-            return
-        self._indexes = filter(lambda x: x in other._indexes, self._indexes)
+        if other is None:
+            self._mask = 0
+        else:
+            self._mask &= other._mask
+        self._changed()
 
     @property
     def text(self):
-        if len(self._indexes) == 0:
-            return ''
-        txt = self._doc[self._indexes[0]].text
-        for i in self._indexes[1:]:
-            tok = self._doc[i]
-            if tok.is_punct:
-                txt += tok.text
+        '''The span text. Tokens are separated by a space except punctuation
+        which is attached to the previous token. The text is cached until the
+        span changes.
+        '''
+        if self._textCache is None:
+            if len(self._indexes) == 0:
+                self._textCache = ''
+            elif hasattr(self._doc, 'render'):
+                # Google document, copies runs of tokens from the source text
+                self._textCache = self._doc.render(self._indexes)
             else:
-                txt += ' ' + tok.text
-        return txt
+                self._textCache = render_tokens([self._doc[i] for i in self._indexes])
+        return self._textCache
 
     @property
     def text_with_ws(self):
@@ -204,13 +359,14 @@ class SubtreeSpan(IndexSpan):
             if hasattr(tok, 'adj'):
                 # Google document
                 if stk is None:
-                    stk = []
-                    stk.extend(tok.adj)
-                indexes.extend(stk)
-                while len(stk) != 0:
-                    tok = doc[stk.pop()]
-                    stk.extend(tok.adj)
-                    indexes.extend(tok.adj)
+                    # Precomputed subtree
+                    indexes = doc.subtree_indexes(idx)
+                else:
+                    indexes.extend(stk)
+                    while len(stk) != 0:
+                        tok = doc[stk.pop()]
+                        stk.extend(tok.adj)
+                        indexes.extend(tok.adj)
 
             else:
                 # Spacy document
@@ -235,25 +391,33 @@ class SubtreeSpan(IndexSpan):
         super(SubtreeSpan, self).__init__(doc, indexes)
         self._rootIdx = idx
 
+    @classmethod
+    def from_range(cls, doc, idx, start, end):
+        '''Create a span over a contiguous range of tokens without walking the
+        subtree. Used for sentences where the range is known to be the subtree.
+
+        Args:
+            doc: The document.
+            idx: The root token index.
+            start: The first token index.
+            end: One past the last token index.
+
+        Returns:
+            A SubtreeSpan instance.
+        '''
+        span = cls(doc, idx, shallow=True)
+        span._mask = range_mask(start, end)
+        span._changed()
+        return span
+
     def __repr__(self):
-        if len(self._indexes) == 0:
-            return '(%i,\"\")' % self._rootIdx
-        txt = '(%i,\"%s' % (self._rootIdx, self._doc[self._indexes[0]].text)
-        for i in self._indexes[1:]:
-            tok = self._doc[i]
-            if tok.is_punct:
-                txt += tok.text
-            else:
-                txt += ' ' + tok.text
-        return txt + '\")'
+        return '(%i,\"%s\")' % (self._rootIdx, self.text)
 
     def repair(self):
         '''If the span no longer includes the root index due to complement or intersect
         operations then this ensures the root idx is included. Also sorts indexes.
         '''
-        if self._rootIdx not in self._indexes:
-            self._indexes.append(self._rootIdx)
-        self._indexes.sort()
+        self.add(self._rootIdx)
 
     @property
     def root(self):
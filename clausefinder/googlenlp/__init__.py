@@ -1,7 +1,13 @@
 # Google NLP Interface
 
+import hashlib
+import sys
+from array import array
 from . import dep
 from . import pos
+from . import compact
+from . import tag
+from .vocab import Vocab
 from googleapiclient import discovery
 from googleapiclient.errors import HttpError
 from oauth2client.client import GoogleCredentials
@@ -28,6 +34,19 @@ GOOGLE_TYPE_NAMES = {
 }
 
 
+# Dense tables indexed by tag id, dependency and part-of-speech ids do not
+# overlap so one table covers both.
+_TAG_ID_LIMIT = 200 + len(pos.TAG)
+_TAG_BY_ID = tag.make_table(dict([(t.id, t) for t in dep.TAG.values() + pos.TAG.values()]),
+                            _TAG_ID_LIMIT, None)
+# Tag id to type name, '' if the tag has no type name
+TYPE_NAME = tag.make_table(GOOGLE_TYPE_NAMES, _TAG_ID_LIMIT, '')
+# Tag id to True if the dependency marks a clause subject
+IS_SUBJECT = tag.make_table(dict.fromkeys([dep.NSUBJ, dep.NSUBJPASS], True), _TAG_ID_LIMIT, False)
+# Tag id to True if the dependency marks a clause object
+IS_OBJECT = tag.make_table(dict.fromkeys([dep.DOBJ, dep.IOBJ, dep.ACOMP], True), _TAG_ID_LIMIT, False)
+
+
 def get_type_name(tag):
     '''Get a google type string from the grammatical relation id.
 
@@ -37,23 +56,17 @@ def get_type_name(tag):
     Returns:
         A string.
     '''
-    if GOOGLE_TYPE_NAMES.has_key(tag.id):
-        return GOOGLE_TYPE_NAMES[tag.id]
-    return ''
+    return TYPE_NAME[tag]
 
 
 class Token(object):
-    '''A token in the dependency tree. The class has a similar interface to spacy.Token
+    '''A token in the dependency tree. The class has a similar interface to spacy.Token.
+    A token is a view onto the column arrays of its document.
     '''
+    __slots__ = ('_doc', '_idx')
 
     def __init__(self, doc, offset):
         self._doc = doc
-        self._gtok = doc._tokens[offset]
-        self._lemma = None  # self._gtok['lemma']
-        self._text = None   # self._gtok['text']['content']
-        self._dep = None    # dep.TAG[ self._gtok['dependencyEdge']['label'] ]
-        self._pos = None    # pos.TAG[ self._gtok['partOfSpeech']['tag'] ]
-        self._adj = self._gtok['adj']
         self._idx = offset
 
     def __repr__(self):
@@ -82,9 +95,12 @@ class Token(object):
 
     @property
     def lemma(self):
-        if self._lemma is None:
-            self._lemma = self._gtok['lemma']
-        return self._lemma
+        return self._doc._strings[self._doc._lemmaId[self._idx]]
+
+    @property
+    def lemma_id(self):
+        '''The id of the lemma in the document vocabulary.'''
+        return self._doc._lemmaId[self._idx]
 
     @property
     def orth(self):
@@ -96,15 +112,11 @@ class Token(object):
 
     @property
     def dep(self):
-        if self._dep is None:
-            self._dep = dep.TAG[self._gtok['dependencyEdge']['label']]
-        return self._dep
+        return _TAG_BY_ID[self._doc._dep[self._idx]]
 
     @property
     def pos(self):
-        if self._pos is None:
-            self._pos = pos.TAG[self._gtok['partOfSpeech']['tag']]
-        return self._pos
+        return _TAG_BY_ID[self._doc._pos[self._idx]]
 
     @property
     def shape(self):
@@ -120,11 +132,11 @@ class Token(object):
 
     @property
     def is_punct(self):
-        return self._pos == pos.PUNCT
+        return self._doc._pos[self._idx] == pos.PUNCT.id
 
     @property
     def like_num(self):
-        return self._pos == pos.NUM
+        return self._doc._pos[self._idx] == pos.NUM.id
 
     @property
     def is_space(self):
@@ -134,88 +146,476 @@ class Token(object):
     def i(self):
         return self._idx
 
+    @property
+    def idx(self):
+        '''The character offset of the token in the document text.'''
+        return self._doc._offset[self._idx]
+
     @property
     def doc(self):
         return self._doc
 
+    @property
+    def sent_id(self):
+        '''The index of the sentence containing this token.'''
+        return self._doc._sentId[self._idx]
+
+    @property
+    def sent(self):
+        '''The sentence span containing this token.'''
+        return self._doc.sentence(self._doc._sentId[self._idx])
+
     @property
     def text(self):
-        if self._text is None:
-            self._text = self._gtok['text']['content']
-        return self._text
+        return self._doc._strings[self._doc._textId[self._idx]]
+
+    @property
+    def text_id(self):
+        '''The id of the text in the document vocabulary.'''
+        return self._doc._textId[self._idx]
 
     @property
     def head(self):
-        return Token(self._doc, self._gtok['dependencyEdge']['headTokenIndex'])
+        return self._doc._token(self._doc._head[self._idx])
+
+    @property
+    def adj(self):
+        '''The indexes of the children of this token.'''
+        return self._doc._adjIdx[self._doc._adjStart[self._idx]:self._doc._adjStart[self._idx+1]]
 
     @property
     def children(self):
-        for i in self._adj:
-            yield Token(self._doc, i)
+        for i in self.adj:
+            yield self._doc._token(i)
 
     @property
     def subtree(self):
         span = SubtreeSpan(self._doc, self._idx)
         for i in span._indexes:
-            yield Token(self._doc, i)
-
+            yield self._doc._token(i)
 
 
 class Doc(object):
-    '''Google NLP Document. The class has a similar interface to spacy.Doc'''
+    '''Google NLP Document. The class has a similar interface to spacy.Doc.
+
+    Tokens are decoded once at construction into parallel column arrays indexed
+    by token index:
+        _head:    head token index.
+        _dep:     dependency tag id, see googlenlp.dep.
+        _pos:     part-of-speech tag id, see googlenlp.pos.
+        _offset:  character offset of the token.
+        _textId:  id of the token text in the vocabulary.
+        _lemmaId: id of the token lemma in the vocabulary.
+        _sentId:  sentence index.
+    Strings are resolved through _strings, the string list of the vocabulary.
+    Sentence g covers the tokens _sentStart[g] to _sentStart[g+1]-1 and is
+    rooted at token _trees[g].
+    The children of token i are _adjIdx[_adjStart[i]:_adjStart[i+1]].
+
+    Subtrees are stored as intervals of a depth first ordering of the tokens,
+    with children visited in token order. The subtree of token i is
+    _order[_enter[i]:_exit[i]] and spans the token indexes _lo[i] to _hi[i].
+
+    Token instances are created on first access and then reused, so doc[i]
+    always returns the same instance.
+    '''
 
-    def __init__(self, nlpResult):
+    def __init__(self, nlpResult, vocab=None):
         '''Construct a document form a Google NLP result.
 
         Args:
-            nlpResult: The result of a GoogleNLP.parse() call.
+            nlpResult: The result of a GoogleNLP.parse() call or a compact
+                annotation created by compact.encode().
+            vocab: An optional Vocab shared with other documents. If None the
+                document gets its own.
         '''
-        self._sentences = nlpResult['sentences']
-        self._tokens = nlpResult['tokens']
-        self._trees = [None] * len(self._sentences)
+        self._vocab = vocab
+        if compact.is_compact(nlpResult):
+            self._init_from_compact(nlpResult)
+        else:
+            self._init_from_result(nlpResult)
+        self._init_sentences()
+        self._init_adjacency()
+        self._init_subtrees()
+        self._init_state()
+
+    def _init_state(self):
+        # Derived state, called once all columns are set. Also used by
+        # googlenlp.binary when loading a document without parsing it.
         self._hash = 0
+        for i in self._textId:
+            self._hash ^= hash(self._strings[i])
+        self._tokCache = [None] * len(self._head)
+        self._fingerprint = None
+        self._source = None
+        self._runEnd = None
+
+    def _init_from_result(self, nlpResult):
+        # Decode the token dictionaries into columns
+        if self._vocab is None:
+            self._vocab = Vocab()
+        intern = self._vocab.intern
+        tokens = nlpResult['tokens']
+        self._head = array('i', [tok['dependencyEdge']['headTokenIndex'] for tok in tokens])
+        self._dep = array('h', [dep.TAG[tok['dependencyEdge']['label']].id for tok in tokens])
+        self._pos = array('h', [pos.TAG[tok['partOfSpeech']['tag']].id for tok in tokens])
+        self._offset = array('i', [tok['text']['beginOffset'] for tok in tokens])
+        self._textId = array('i', [intern(tok['text']['content']) for tok in tokens])
+        self._lemmaId = array('i', [intern(tok['lemma']) for tok in tokens])
+        sentences = nlpResult['sentences']
+        self._sentOffset = array('i', [s['text']['beginOffset'] for s in sentences])
+        self._sentTextId = array('i', [intern(s['text']['content']) for s in sentences])
+        self._strings = self._vocab.strings
+
+    def _init_from_compact(self, compactResult):
+        # Compact annotations are already in column form
+        if compactResult['version'] != compact.COMPACT_VERSION:
+            raise ValueError('unsupported compact annotation version %s' % compactResult['version'])
+        self._head = array('i', compactResult['head'])
+        self._dep = array('h', compactResult['dep'])
+        self._pos = array('h', compactResult['pos'])
+        self._offset = array('i', compactResult['offset'])
+        textId = compactResult['text']
+        lemmaId = compactResult['lemma']
+        sentTextId = [s[0] for s in compactResult['sentences']]
+        if self._vocab is None:
+            # Copied, the vocabulary can grow
+            self._vocab = Vocab(list(compactResult['strings']))
+        else:
+            ids = [self._vocab.intern(s) for s in compactResult['strings']]
+            textId = [ids[k] for k in textId]
+            lemmaId = [ids[k] for k in lemmaId]
+            sentTextId = [ids[k] for k in sentTextId]
+        self._textId = array('i', textId)
+        self._lemmaId = array('i', lemmaId)
+        self._sentOffset = array('i', [s[1] for s in compactResult['sentences']])
+        self._sentTextId = array('i', sentTextId)
+        self._strings = self._vocab.strings
+
+    def _init_sentences(self):
+        # Assign tokens to sentences and find the root of each sentence.
+        # Tokens are in text order so each sentence is a contiguous range.
+        rootId = dep.ROOT.id
+        n = len(self._head)
+        self._sentId = array('i', [0] * n)
+        self._sentStart = array('i', [n] * (len(self._sentOffset) + 1))
+        self._trees = [None] * len(self._sentOffset)
         g = -1
-        for tok in self._tokens:
-            tok['adj'] = []
-            self._hash ^= hash(tok['text']['content'])
-        i = 0
         limit = -1
-        for tok in self._tokens:
-            if tok['text']['beginOffset'] >= limit:
+        for i in range(n):
+            if self._offset[i] >= limit:
                 g += 1
-                limit = self._sentences[g]['text']['beginOffset'] + len(self._sentences[g]['text']['content'])
-            if tok['dependencyEdge']['label'] == dep.ROOT.text:
-                self._trees[g] = tok
-            else:
-                self._tokens[tok['dependencyEdge']['headTokenIndex']]['adj'].append(i)
-            i += 1
+                limit = self._sentOffset[g] + len(self._strings[self._sentTextId[g]])
+                self._sentStart[g] = i
+            self._sentId[i] = g
+            if self._dep[i] == rootId:
+                self._trees[g] = i
+        # Sentences without tokens are empty ranges
+        for g in reversed(range(len(self._sentOffset))):
+            if self._sentStart[g] > self._sentStart[g+1]:
+                self._sentStart[g] = self._sentStart[g+1]
+
+    def _init_adjacency(self):
+        # Compressed adjacency lists, children are in token order
+        rootId = dep.ROOT.id
+        n = len(self._head)
+        counts = [0] * (n + 1)
+        for i in range(n):
+            if self._dep[i] != rootId:
+                counts[self._head[i] + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        self._adjStart = array('i', counts)
+        adjIdx = [0] * counts[n]
+        for i in range(n):
+            if self._dep[i] != rootId:
+                h = self._head[i]
+                adjIdx[counts[h]] = i
+                counts[h] += 1
+        self._adjIdx = array('i', adjIdx)
+
+    def _init_subtrees(self):
+        # Depth first order, one pass from each sentence root. Tokens that
+        # cannot be reached from a root are visited last as their own roots.
+        n = len(self._head)
+        order = []
+        enter = [-1] * n
+        exit = [-1] * n
+        roots = [t for t in self._trees if t is not None]
+        roots.extend(range(n))
+        for r in roots:
+            if enter[r] >= 0:
+                continue
+            stk = [r]
+            while len(stk) != 0:
+                t = stk.pop()
+                if t < 0:
+                    exit[~t] = len(order)
+                    continue
+                enter[t] = len(order)
+                order.append(t)
+                stk.append(~t)
+                children = self._adjIdx[self._adjStart[t]:self._adjStart[t+1]]
+                for c in reversed(children):
+                    if enter[c] < 0:
+                        stk.append(c)
+        # Token index range of each subtree, propagated from the leaves up
+        lo = range(n)
+        hi = range(n)
+        for k in reversed(range(n)):
+            t = order[k]
+            h = self._head[t]
+            if h != t and enter[h] < enter[t] < exit[h]:
+                if lo[t] < lo[h]:
+                    lo[h] = lo[t]
+                if hi[t] > hi[h]:
+                    hi[h] = hi[t]
+        self._order = array('i', order)
+        self._enter = array('i', enter)
+        self._exit = array('i', exit)
+        self._lo = array('i', lo)
+        self._hi = array('i', hi)
+
+    @property
+    def vocab(self):
+        '''The Vocab of the document.'''
+        return self._vocab
+
+    def local_strings(self):
+        '''Get the strings used by the document, e.g. to store it without a
+        shared vocabulary.
+
+        Returns:
+            A tuple (strings, ids) where strings is a list of the distinct
+            strings of the tokens and sentences and ids maps a string id of
+            the document to an index into strings. ids is None if strings is
+            the whole vocabulary and the ids are unchanged.
+        '''
+        used = set(self._textId)
+        used.update(self._lemmaId)
+        used.update(self._sentTextId)
+        if len(used) == len(self._strings):
+            return self._strings, None
+        used = sorted(used)
+        return [self._strings[k] for k in used], dict([(sid, k) for k, sid in enumerate(used)])
+
+    def is_in_subtree(self, i, rootIdx):
+        '''Check if a token is in the subtree rooted at another token in O(1).
+
+        Args:
+            i: A token index.
+            rootIdx: The index of the subtree root.
+
+        Returns:
+            True if i == rootIdx or rootIdx is an ancestor of i.
+        '''
+        return self._enter[rootIdx] <= self._enter[i] < self._exit[rootIdx]
+
+    def subtree_indexes(self, rootIdx):
+        '''Get the token indexes of a subtree.
+
+        Args:
+            rootIdx: The index of the subtree root.
+
+        Returns:
+            A new sorted list of token indexes.
+        '''
+        lo = self._lo[rootIdx]
+        hi = self._hi[rootIdx]
+        enter = self._enter[rootIdx]
+        exit = self._exit[rootIdx]
+        if hi - lo + 1 == exit - enter:
+            # Projective subtree, a contiguous range of tokens
+            return range(lo, hi + 1)
+        indexes = list(self._order[enter:exit])
+        indexes.sort()
+        return indexes
+
+    def _init_text(self):
+        # Rebuild the source text from the sentences and find the runs of
+        # tokens whose source text matches the rendering of render().
+        # _runEnd[i] is the last token of the run starting at token i, or -1
+        # if the text of token i is not found at its offset.
+        parts = []
+        end = 0
+        for g in range(len(self._sentOffset)):
+            begin = self._sentOffset[g]
+            if begin > end:
+                parts.append(u' ' * (begin - end))
+            elif begin < end:
+                # Overlapping sentences, offsets cannot be trusted
+                parts = []
+                break
+            sentence = self._strings[self._sentTextId[g]]
+            parts.append(sentence)
+            end = begin + len(sentence)
+        source = u''.join(parts)
+        n = len(self._head)
+        runEnd = array('i', [-1] * n)
+        punctId = pos.PUNCT.id
+        for i in reversed(range(n)):
+            text = self._strings[self._textId[i]]
+            begin = self._offset[i]
+            if source[begin:begin + len(text)] != text:
+                continue
+            runEnd[i] = i
+            if i + 1 < n and runEnd[i+1] >= 0:
+                gap = source[begin + len(text):self._offset[i+1]]
+                if gap == (u'' if self._pos[i+1] == punctId else u' '):
+                    runEnd[i] = runEnd[i+1]
+        self._source = source
+        self._runEnd = runEnd
+
+    def render(self, indexes):
+        '''Render the text of a list of tokens. Tokens are separated by a space
+        except punctuation which is attached to the previous token. Runs of
+        consecutive tokens whose source text already has that form are copied
+        from the source text in one slice.
+
+        Args:
+            indexes: A sorted list of token indexes.
+
+        Returns:
+            A string.
+        '''
+        if self._runEnd is None:
+            self._init_text()
+        punctId = pos.PUNCT.id
+        parts = []
+        n = len(indexes)
+        p = 0
+        while p < n:
+            i = indexes[p]
+            if p != 0 and self._pos[i] != punctId:
+                parts.append(u' ')
+            last = self._runEnd[i]
+            if last < 0:
+                parts.append(self._strings[self._textId[i]])
+                p += 1
+                continue
+            q = p
+            while q + 1 < n and indexes[q+1] == indexes[q] + 1 and indexes[q+1] <= last:
+                q += 1
+            j = indexes[q]
+            parts.append(self._source[self._offset[i]:self._offset[j] + len(self._strings[self._textId[j]])])
+            p = q + 1
+        return u''.join(parts)
+
+    @property
+    def fingerprint(self):
+        '''A stable content hash of the document. Unlike _hash it does not
+        depend on the process and changes if any token text, lemma, offset,
+        head, label or tag changes, or if the sentence boundaries change.
+
+        Returns:
+            A hex digest string.
+        '''
+        if self._fingerprint is None:
+            h = hashlib.sha1()
+            h.update(('%i,%i;' % (len(self._head), len(self._sentOffset))).encode('ascii'))
+            for column in [self._head, self._dep, self._pos, self._offset, self._sentOffset]:
+                # Little endian 32 bit integers
+                a = array('i', column)
+                if sys.byteorder != 'little':
+                    a.byteswap()
+                h.update(a.tostring())
+            for ids in [self._textId, self._lemmaId, self._sentTextId]:
+                h.update(u'\0'.join([self._strings[i] for i in ids]).encode('utf-8'))
+                h.update(b'\1')
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def sentence_fingerprint(self, g):
+        '''A stable content hash of a sentence. Heads and offsets are relative
+        to the sentence so the hash does not change if other sentences are
+        edited, added or removed.
+
+        Args:
+            g: The sentence index.
+
+        Returns:
+            A hex digest string.
+        '''
+        start = self._sentStart[g]
+        end = self._sentStart[g+1]
+        h = hashlib.sha1()
+        h.update(('%i;' % (end - start)).encode('ascii'))
+        columns = [
+            [x - start for x in self._head[start:end]],
+            self._dep[start:end],
+            self._pos[start:end],
+            [x - self._sentOffset[g] for x in self._offset[start:end]]
+        ]
+        for column in columns:
+            # Little endian 32 bit integers
+            a = array('i', column)
+            if sys.byteorder != 'little':
+                a.byteswap()
+            h.update(a.tostring())
+        for ids in [self._textId[start:end], self._lemmaId[start:end], [self._sentTextId[g]]]:
+            h.update(u'\0'.join([self._strings[i] for i in ids]).encode('utf-8'))
+            h.update(b'\1')
+        return h.hexdigest()
+
+    def _token(self, i):
+        # Flyweight lookup, i must be a non-negative index
+        tok = self._tokCache[i]
+        if tok is None:
+            tok = Token(self, i)
+            self._tokCache[i] = tok
+        return tok
 
     def __getitem__(self, slice_i_j):
         if isinstance(slice_i_j, slice):
-            return Span(self, range(slice_i_j))
-        return Token(self, slice_i_j)
+            return Span(self, range(*slice_i_j.indices(len(self._head))))
+        if slice_i_j < 0:
+            slice_i_j += len(self._head)
+        return self._token(slice_i_j)
 
     def __iter__(self):
-        for i in range(len(self._tokens)):
-            yield Token(self, i)
+        for i in range(len(self._head)):
+            yield self._token(i)
 
     def __len__(self):
-        return len(self._tokens)
+        return len(self._head)
 
     @property
     def text(self):
-        span = Span(self, range(len(self._tokens)))
+        span = Span(self, range(len(self._head)))
         return span.text
 
     @property
     def text_with_ws(self):
-        span = Span(self, range(len(self._tokens)))
+        span = Span(self, range(len(self._head)))
         return span.text_with_ws
 
+    def sentence(self, g):
+        '''Get a sentence span.
+
+        Args:
+            g: The sentence index.
+
+        Returns:
+            A SubtreeSpan rooted at the sentence root.
+        '''
+        return SubtreeSpan.from_range(self, self._trees[g], self._sentStart[g], self._sentStart[g+1])
+
+    def sentence_range(self, g):
+        '''Get the token range of a sentence.
+
+        Args:
+            g: The sentence index.
+
+        Returns:
+            A tuple (start, end) where end is one past the last token index.
+        '''
+        return self._sentStart[g], self._sentStart[g+1]
+
     @property
     def sents(self):
-        for t in self._trees:
-            yield SubtreeSpan(self, t['dependencyEdge']['headTokenIndex'])
+        for g in range(len(self._trees)):
+            if self._trees[g] is not None:
+                yield self.sentence(g)
 
 
 def getGoogleNlpService():
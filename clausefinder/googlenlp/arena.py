@@ -0,0 +1,346 @@
+# Corpus wide token arena
+#
+# An Arena stores the columns of many googlenlp.Doc instances end to end in
+# one contiguous buffer per column, with offset tables giving the range of
+# each document. Token text, lemmas and sentence text share one string table.
+# A document is loaded as a Doc whose columns are views into the buffers, so
+# nothing is copied, and corpus wide queries such as all tokens with dep NUM
+# scan a single column. With numpy installed column() returns the columns as
+# arrays and find_tokens() is vectorized.
+#
+# Columns hold document local values, e.g. head is a token index within the
+# document, so a slice is a valid Doc column as is. The arena is built once
+# by ArenaBuilder and is read only afterwards.
+#
+# Memory is about 56 bytes per token plus 8 bytes per sentence and 12 bytes
+# per document, and one copy of each distinct string.
+
+import bisect
+import ctypes
+from array import array
+from . import Doc
+from . import Vocab
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+
+# Column name, array type code and length per document: 'n' tokens, 'n1' one
+# entry per token plus one, 'adj' adjacency entries, 's' sentences and 's1'
+# one entry per sentence plus one.
+_COLUMNS = [
+    ('_head', 'i', 'n'),
+    ('_dep', 'h', 'n'),
+    ('_pos', 'h', 'n'),
+    ('_offset', 'i', 'n'),
+    ('_textId', 'i', 'n'),
+    ('_lemmaId', 'i', 'n'),
+    ('_sentId', 'i', 'n'),
+    ('_order', 'i', 'n'),
+    ('_enter', 'i', 'n'),
+    ('_exit', 'i', 'n'),
+    ('_lo', 'i', 'n'),
+    ('_hi', 'i', 'n'),
+    ('_adjStart', 'i', 'n1'),
+    ('_adjIdx', 'i', 'adj'),
+    ('_sentOffset', 'i', 's'),
+    ('_sentTextId', 'i', 's'),
+    ('_sentStart', 'i', 's1'),
+    ('_trees', 'i', 's')
+]
+
+_CTYPES = {'i': ctypes.c_int32, 'h': ctypes.c_int16}
+_DTYPES = {'i': '=i4', 'h': '=i2'}
+
+# Public column names accepted by Arena.column() and find_tokens()
+_PUBLIC = {
+    'head': '_head',
+    'dep': '_dep',
+    'pos': '_pos',
+    'offset': '_offset',
+    'textId': '_textId',
+    'lemmaId': '_lemmaId',
+    'sentId': '_sentId'
+}
+
+
+class ArenaBuilder(object):
+    '''Append documents to the columns of a new arena.'''
+
+    def __init__(self, vocab=None):
+        '''Create a builder.
+
+        Args:
+            vocab: An optional Vocab for the arena strings. Documents created
+                with the same Vocab are added without remapping their ids.
+        '''
+        self._columns = dict([(name, array(code)) for name, code, _ in _COLUMNS])
+        self._vocab = Vocab() if vocab is None else vocab
+        self._keys = []
+        # Start of each document in the token, adjacency and sentence columns
+        self._docTok = array('i', [0])
+        self._docAdj = array('i', [0])
+        self._docSent = array('i', [0])
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, doc, key=-1):
+        '''Append a document. The document is copied and can be discarded.
+
+        Args:
+            doc: A googlenlp.Doc instance.
+            key: An optional integer key, e.g. the iIndex of a word problem.
+
+        Returns:
+            The index of the document in the arena.
+        '''
+        ids = None
+        if doc._vocab is not self._vocab:
+            strings, local = doc.local_strings()
+            ids = [self._vocab.intern(s) for s in strings]
+            if local is not None:
+                ids = dict([(sid, ids[k]) for sid, k in local.items()])
+        cols = self._columns
+        for name, _, _ in _COLUMNS:
+            if ids is not None and name in ('_textId', '_lemmaId', '_sentTextId'):
+                cols[name].extend([ids[i] for i in getattr(doc, name)])
+            elif name == '_trees':
+                cols[name].extend([-1 if t is None else t for t in doc._trees])
+            else:
+                cols[name].extend(getattr(doc, name))
+        self._keys.append(key)
+        self._docTok.append(self._docTok[-1] + len(doc._head))
+        self._docAdj.append(self._docAdj[-1] + len(doc._adjIdx))
+        self._docSent.append(self._docSent[-1] + len(doc._sentOffset))
+        return len(self._keys) - 1
+
+    def build(self):
+        '''Create the arena. The builder is empty afterwards.
+
+        Returns:
+            An Arena instance.
+        '''
+        arena = Arena(self._columns, self._vocab, self._keys, self._docTok, self._docAdj, self._docSent)
+        self.__init__()
+        return arena
+
+
+class Arena(object):
+    '''The columns of many documents in contiguous buffers. Create with
+    ArenaBuilder or Arena.from_docs().
+    '''
+
+    def __init__(self, columns, vocab, keys, docTok, docAdj, docSent):
+        # Buffers are bytearrays so they cannot be resized while views exist
+        self._buffers = {}
+        self._codes = {}
+        for name, code, _ in _COLUMNS:
+            # Release each column once copied to keep the peak memory down
+            a = columns.pop(name)
+            if a.itemsize != ctypes.sizeof(_CTYPES[code]):
+                raise TypeError('unexpected item size for %s' % name)
+            self._buffers[name] = bytearray(buffer(a))
+            self._codes[name] = code
+        self._vocab = vocab
+        self._keys = keys
+        self._docTok = docTok
+        self._docAdj = docAdj
+        self._docSent = docSent
+
+    @classmethod
+    def from_docs(cls, docs, keys=None, vocab=None):
+        '''Build an arena from documents.
+
+        Args:
+            docs: An iterable of googlenlp.Doc instances, e.g. a
+                binary.Corpus. Documents are copied one at a time.
+            keys: An optional sequence of integer keys, one per document.
+            vocab: An optional Vocab, see ArenaBuilder.
+
+        Returns:
+            An Arena instance.
+        '''
+        builder = ArenaBuilder(vocab)
+        for k, doc in enumerate(docs):
+            builder.add(doc, -1 if keys is None else keys[k])
+        return builder.build()
+
+    def _view(self, name, start, length):
+        ctype = _CTYPES[self._codes[name]]
+        return (ctype * length).from_buffer(self._buffers[name], start * ctypes.sizeof(ctype))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __getitem__(self, k):
+        '''Load a document.
+
+        Args:
+            k: The index of the document in the arena.
+
+        Returns:
+            A googlenlp.Doc instance whose columns are views into the arena.
+        '''
+        if k < 0:
+            k += len(self._keys)
+        if k < 0 or k >= len(self._keys):
+            raise IndexError('document index out of range')
+        t0 = self._docTok[k]
+        a0 = self._docAdj[k]
+        s0 = self._docSent[k]
+        # Columns with one extra entry per document are offset by k
+        starts = {'n': t0, 'n1': t0 + k, 'adj': a0, 's': s0, 's1': s0 + k}
+        lengths = {
+            'n': self._docTok[k+1] - t0,
+            'n1': self._docTok[k+1] - t0 + 1,
+            'adj': self._docAdj[k+1] - a0,
+            's': self._docSent[k+1] - s0,
+            's1': self._docSent[k+1] - s0 + 1
+        }
+        doc = Doc.__new__(Doc)
+        for name, _, kind in _COLUMNS:
+            setattr(doc, name, self._view(name, starts[kind], lengths[kind]))
+        doc._trees = [None if t < 0 else t for t in doc._trees]
+        doc._vocab = self._vocab
+        doc._strings = self._vocab.strings
+        doc._init_state()
+        return doc
+
+    def __iter__(self):
+        for k in range(len(self._keys)):
+            yield self[k]
+
+    def key(self, k):
+        '''Get the key of a document.
+
+        Args:
+            k: The index of the document in the arena.
+
+        Returns:
+            The key passed to ArenaBuilder.add(), -1 if there was none.
+        '''
+        return self._keys[k]
+
+    @property
+    def ntokens(self):
+        '''The number of tokens in all documents.'''
+        return self._docTok[-1]
+
+    @property
+    def vocab(self):
+        '''The shared Vocab, textId and lemmaId are ids into it.'''
+        return self._vocab
+
+    @property
+    def strings(self):
+        '''The shared string list, textId and lemmaId index it.'''
+        return self._vocab.strings
+
+    def string_id(self, s):
+        '''Get the id of a string.
+
+        Args:
+            s: A unicode string.
+
+        Returns:
+            The index of s in the string table or None if no token has it.
+        '''
+        return self._vocab.get(s)
+
+    def token_range(self, k):
+        '''Get the range of a document in the token columns.
+
+        Args:
+            k: The index of the document in the arena.
+
+        Returns:
+            A tuple (start, end) where end is one past the last token.
+        '''
+        return self._docTok[k], self._docTok[k+1]
+
+    def locate(self, i):
+        '''Find the document of a token.
+
+        Args:
+            i: A token index into the corpus wide columns.
+
+        Returns:
+            A tuple (k, j), token i is token j of document k.
+        '''
+        k = bisect.bisect_right(self._docTok, i) - 1
+        return k, i - self._docTok[k]
+
+    def column(self, name):
+        '''Get a corpus wide token column without copying.
+
+        Args:
+            name: One of head, dep, pos, offset, textId, lemmaId or sentId.
+                Values are document local, see googlenlp.Doc.
+
+        Returns:
+            A numpy array.
+        '''
+        if np is None:
+            raise ImportError('Arena.column() requires numpy')
+        name = _PUBLIC[name]
+        return np.frombuffer(self._buffers[name], dtype=_DTYPES[self._codes[name]])
+
+    def _query(self, dep, pos, text, lemma):
+        # Returns a list of (column, value) pairs or None if nothing can match
+        query = []
+        for name, value in [('_dep', dep), ('_pos', pos)]:
+            if value is not None:
+                query.append((name, int(value)))
+        for name, value in [('_textId', text), ('_lemmaId', lemma)]:
+            if value is not None:
+                sid = self._vocab.get(value)
+                if sid is None:
+                    return None
+                query.append((name, sid))
+        return query
+
+    def find_tokens(self, dep=None, pos=None, text=None, lemma=None):
+        '''Find the tokens matching all the given values in the corpus.
+
+        Args:
+            dep: A googlenlp.dep tag or None.
+            pos: A googlenlp.pos tag or None.
+            text: A token text or None.
+            lemma: A token lemma or None.
+
+        Returns:
+            A tuple (docs, tokens) of integer arrays of equal length, in corpus
+            order. Match m is token tokens[m] of document docs[m]. The arrays
+            are numpy arrays if numpy is installed, else array.array.
+        '''
+        query = self._query(dep, pos, text, lemma)
+        if np is not None:
+            docTok = np.frombuffer(self._docTok, dtype='=i4')
+            if query is None:
+                return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+            mask = np.ones(self.ntokens, dtype=bool)
+            for name, value in query:
+                mask &= np.frombuffer(self._buffers[name], dtype=_DTYPES[self._codes[name]]) == value
+            tokens = np.flatnonzero(mask)
+            docs = np.searchsorted(docTok, tokens, side='right') - 1
+            return docs, tokens - docTok[docs]
+
+        docs = array('i')
+        tokens = array('i')
+        if query is None:
+            return docs, tokens
+        columns = [(self._view(name, 0, self.ntokens), value) for name, value in query]
+        k = 0
+        for i in range(self.ntokens):
+            for column, value in columns:
+                if column[i] != value:
+                    break
+            else:
+                while self._docTok[k+1] <= i:
+                    k += 1
+                docs.append(k)
+                tokens.append(i - self._docTok[k])
+        return docs, tokens
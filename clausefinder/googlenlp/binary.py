@@ -0,0 +1,299 @@
+# Binary storage for parsed Google NLP documents
+#
+# A corpus file holds the column arrays of many googlenlp.Doc instances so
+# they can be loaded without parsing JSON or rebuilding the sentence,
+# adjacency and subtree tables. Corpus maps the file into memory and the
+# integer columns of each document are views into the mapping, nothing is
+# copied until a document is modified.
+#
+# All integers are little endian. Layout (version 1):
+#   magic        8 bytes, 'CFDOCS\0\0'
+#   version      uint32
+#   ndocs        uint32
+#   keys         int64[ndocs], e.g. the iIndex of a word problem or -1
+#   offsets      uint64[ndocs+1], absolute offset of each document record,
+#                the last entry is the file size
+#   records      one per document, 8 byte aligned
+#
+# Document record, n tokens and s sentences:
+#   header       int32[5]: n, s, nstrings, nadj, strbytes
+#   head, dep, pos, offset, textId, lemmaId, sentId    int32[n] each
+#   sentOffset, sentTextId                             int32[s] each
+#   sentStart                                          int32[s+1]
+#   trees                                              int32[s], -1 for None
+#   adjStart                                           int32[n+1]
+#   adjIdx                                             int32[nadj]
+#   order, enter, exit, lo, hi                         int32[n] each
+#   strOffsets   int32[nstrings+1], byte offsets into the string blob
+#   strings      strbytes bytes of utf-8 text
+#
+# Usage: python -m clausefinder.googlenlp.binary [options] corpus.json out.bin
+
+import ctypes
+import mmap
+import struct
+import sys
+from array import array
+from optparse import OptionParser
+from . import Doc
+from . import Vocab
+
+BINARY_VERSION = 1
+BINARY_MAGIC = b'CFDOCS\0\0'
+
+_FILE_HEADER = struct.Struct('<8sII')
+_DOC_HEADER = struct.Struct('<5i')
+_INT32 = ctypes.c_int32.__ctype_le__
+
+# Per token columns in record order
+_TOKEN_COLUMNS = ['_head', '_dep', '_pos', '_offset', '_textId', '_lemmaId', '_sentId']
+_SUBTREE_COLUMNS = ['_order', '_enter', '_exit', '_lo', '_hi']
+
+
+def _pack_ints(values):
+    a = array('i', values)
+    if sys.byteorder != 'little':
+        a.byteswap()
+    return a.tostring()
+
+
+def _pad(nbytes):
+    return b'\0' * (-nbytes % 8)
+
+
+def pack_doc(doc):
+    '''Serialize a document to a binary record.
+
+    Args:
+        doc: A googlenlp.Doc instance. Only the strings the document uses are
+            stored, so it may share its vocabulary.
+
+    Returns:
+        A byte string, see the layout at the top of this module.
+    '''
+    strings, ids = doc.local_strings()
+    blob = []
+    strOffsets = [0]
+    for s in strings:
+        b = s.encode('utf-8')
+        blob.append(b)
+        strOffsets.append(strOffsets[-1] + len(b))
+    blob = b''.join(blob)
+
+    parts = [_DOC_HEADER.pack(len(doc._head), len(doc._sentOffset), len(strings),
+                              len(doc._adjIdx), len(blob))]
+    for name in _TOKEN_COLUMNS:
+        column = getattr(doc, name)
+        if ids is not None and name in ('_textId', '_lemmaId'):
+            column = [ids[k] for k in column]
+        parts.append(_pack_ints(column))
+    parts.append(_pack_ints(doc._sentOffset))
+    parts.append(_pack_ints(doc._sentTextId if ids is None else [ids[k] for k in doc._sentTextId]))
+    parts.append(_pack_ints(doc._sentStart))
+    parts.append(_pack_ints([-1 if t is None else t for t in doc._trees]))
+    parts.append(_pack_ints(doc._adjStart))
+    parts.append(_pack_ints(doc._adjIdx))
+    for name in _SUBTREE_COLUMNS:
+        parts.append(_pack_ints(getattr(doc, name)))
+    parts.append(_pack_ints(strOffsets))
+    parts.append(blob)
+    record = b''.join(parts)
+    return record + _pad(len(record))
+
+
+def unpack_doc(buf, base=0):
+    '''Load a document from a binary record. The integer columns of the
+    document are views into buf.
+
+    Args:
+        buf: A writable buffer, e.g. a bytearray or an mmap.
+        base: The offset of the record in buf.
+
+    Returns:
+        A googlenlp.Doc instance.
+    '''
+    n, s, nstrings, nadj, strbytes = _DOC_HEADER.unpack_from(buf, base)
+    # Offsets of the columns in buf, in record order
+    lengths = [n] * len(_TOKEN_COLUMNS) + [s, s, s + 1, s, n + 1, nadj] + \
+              [n] * len(_SUBTREE_COLUMNS) + [nstrings + 1]
+    columns = []
+    pos = base + _DOC_HEADER.size
+    for length in lengths:
+        columns.append((_INT32 * length).from_buffer(buf, pos))
+        pos += 4 * length
+
+    doc = Doc.__new__(Doc)
+    k = 0
+    for name in _TOKEN_COLUMNS:
+        setattr(doc, name, columns[k])
+        k += 1
+    doc._sentOffset, doc._sentTextId, doc._sentStart = columns[k:k+3]
+    doc._trees = [None if t < 0 else t for t in columns[k+3]]
+    doc._adjStart, doc._adjIdx = columns[k+4:k+6]
+    k += 6
+    for name in _SUBTREE_COLUMNS:
+        setattr(doc, name, columns[k])
+        k += 1
+    strOffsets = columns[k]
+    doc._vocab = Vocab([bytes(buf[pos + strOffsets[i]:pos + strOffsets[i+1]]).decode('utf-8')
+                        for i in range(nstrings)])
+    doc._strings = doc._vocab.strings
+    doc._init_state()
+    return doc
+
+
+def _pack_header(keys, records):
+    # File header and document offsets, padded to the first record
+    size = _FILE_HEADER.size + 8 * len(keys) + 8 * (len(keys) + 1)
+    offsets = [size + len(_pad(size))]
+    for r in records:
+        offsets.append(offsets[-1] + len(r))
+    header = _FILE_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(keys)) + \
+        struct.pack('<%iq' % len(keys), *keys) + \
+        struct.pack('<%iQ' % len(offsets), *offsets)
+    return header + _pad(len(header))
+
+
+def write_corpus(filename, docs, keys=None):
+    '''Write documents to a corpus file.
+
+    Args:
+        filename: The path of the corpus file.
+        docs: A sequence of googlenlp.Doc instances.
+        keys: An optional sequence of integer keys, one per document.
+    '''
+    if keys is None:
+        keys = [-1] * len(docs)
+    elif len(keys) != len(docs):
+        raise ValueError('expected %i keys, got %i' % (len(docs), len(keys)))
+    records = [pack_doc(doc) for doc in docs]
+    with open(filename, 'wb') as fd:
+        fd.write(_pack_header(keys, records))
+        for r in records:
+            fd.write(r)
+
+
+def _read_header(buf):
+    # Returns (keys, offsets)
+    if len(buf) < _FILE_HEADER.size:
+        raise ValueError('not a binary corpus')
+    magic, version, ndocs = _FILE_HEADER.unpack_from(buf, 0)
+    if magic != BINARY_MAGIC:
+        raise ValueError('not a binary corpus')
+    if version != BINARY_VERSION:
+        raise ValueError('unsupported binary corpus version %s' % version)
+    keys = struct.unpack_from('<%iq' % ndocs, buf, _FILE_HEADER.size)
+    offsets = struct.unpack_from('<%iQ' % (ndocs + 1), buf, _FILE_HEADER.size + 8 * ndocs)
+    if offsets[-1] > len(buf):
+        raise ValueError('truncated binary corpus')
+    return keys, offsets
+
+
+class Corpus(object):
+    '''A read only view of a corpus file. The file is memory mapped and
+    documents are loaded on access.
+    '''
+
+    def __init__(self, filename):
+        '''Open a corpus file.
+
+        Args:
+            filename: The path of a file created by write_corpus().
+        '''
+        with open(filename, 'rb') as fd:
+            # Copy on write so columns can be exposed as writable views
+            self._map = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_COPY)
+        self._keys, self._offsets = _read_header(self._map)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __getitem__(self, k):
+        '''Load a document.
+
+        Args:
+            k: The index of the document in the corpus.
+
+        Returns:
+            A googlenlp.Doc instance.
+        '''
+        if k < 0:
+            k += len(self._keys)
+        if k < 0 or k >= len(self._keys):
+            raise IndexError('document index out of range')
+        return unpack_doc(self._map, self._offsets[k])
+
+    def __iter__(self):
+        for k in range(len(self._keys)):
+            yield unpack_doc(self._map, self._offsets[k])
+
+    def key(self, k):
+        '''Get the key of a document.
+
+        Args:
+            k: The index of the document in the corpus.
+
+        Returns:
+            The key passed to write_corpus(), -1 if there was none.
+        '''
+        return self._keys[k]
+
+    def close(self):
+        '''Release the corpus. Documents already loaded keep the mapping
+        alive until they are garbage collected.
+        '''
+        self._map = None
+
+
+def dumps(doc):
+    '''Serialize a single document.
+
+    Args:
+        doc: A googlenlp.Doc instance.
+
+    Returns:
+        A byte string in corpus file format.
+    '''
+    record = pack_doc(doc)
+    return _pack_header([-1], [record]) + record
+
+
+def loads(data):
+    '''Load a single document serialized by dumps().
+
+    Args:
+        data: A byte string.
+
+    Returns:
+        A googlenlp.Doc instance.
+    '''
+    buf = bytearray(data)
+    keys, offsets = _read_header(buf)
+    if len(keys) != 1:
+        raise ValueError('expected one document, got %i' % len(keys))
+    return unpack_doc(buf, offsets[0])
+
+
+def main(args=None):
+    from clausefinder.batch import read_problems
+    usage = '%prog [options] /path/to/corpus.json|jsonl /path/to/output.bin'
+    parser = OptionParser(usage)
+    options, args = parser.parse_args(args)
+    if len(args) != 2:
+        parser.error('expected an input and an output file')
+    docs = []
+    keys = []
+    # All documents are held until written, share their strings
+    vocab = Vocab()
+    for prob in read_problems(args[0]):
+        if 'nlp' not in prob:
+            continue
+        docs.append(Doc(prob['nlp'], vocab))
+        keys.append(prob.get('iIndex', -1))
+    write_corpus(args[1], docs, keys)
+    sys.stderr.write('Wrote %i documents to %s\n' % (len(docs), args[1]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+# Compact storage for Google NLP annotations
+#
+# A Google NLP response carries entities, language and verbose nested keys
+# that Doc never reads. project() strips a response down to the fields Doc
+# uses and encode() stores those fields as parallel integer columns with a
+# single string table for token text, lemmas and sentence text.
+#
+# Compact layout (version 1):
+#   {
+#     'version':   1,
+#     'strings':   [ string, ... ],
+#     'sentences': [ [textId, beginOffset], ... ],
+#     'text':      [ textId, ... ],       # one entry per token
+#     'offset':    [ beginOffset, ... ],
+#     'lemma':     [ lemmaId, ... ],
+#     'pos':       [ pos tag id, ... ],   # googlenlp.pos.X.id
+#     'head':      [ headTokenIndex, ... ],
+#     'dep':       [ dep tag id, ... ]    # googlenlp.dep.X.id
+#   }
+
+from . import dep
+from . import pos
+
+COMPACT_VERSION = 1
+
+_DEP_NAMES = dict([(t.id, t.text) for t in dep.TAG.values()])
+_POS_NAMES = dict([(t.id, t.text) for t in pos.TAG.values()])
+
+
+def is_compact(nlpResult):
+    '''Check if an annotation is in compact form.
+
+    Args:
+        nlpResult: A Google NLP result or a compact annotation.
+
+    Returns:
+        True if nlpResult was created by encode().
+    '''
+    return 'version' in nlpResult and 'strings' in nlpResult
+
+
+def project(nlpResult):
+    '''Project a Google NLP result onto the fields used by googlenlp.Doc. The
+    result keeps the Google schema so it can be passed to Doc unchanged.
+
+    Args:
+        nlpResult: The result of a GoogleNLP.parse() call.
+
+    Returns:
+        A Google NLP result with only sentences and tokens.
+    '''
+    sentences = []
+    for s in nlpResult['sentences']:
+        sentences.append({
+            'text': {
+                'content': s['text']['content'],
+                'beginOffset': s['text']['beginOffset']
+            }
+        })
+    tokens = []
+    for tok in nlpResult['tokens']:
+        tokens.append({
+            'text': {
+                'content': tok['text']['content'],
+                'beginOffset': tok['text']['beginOffset']
+            },
+            'lemma': tok['lemma'],
+            'partOfSpeech': {
+                'tag': tok['partOfSpeech']['tag']
+            },
+            'dependencyEdge': {
+                'headTokenIndex': tok['dependencyEdge']['headTokenIndex'],
+                'label': tok['dependencyEdge']['label']
+            }
+        })
+    return {'sentences': sentences, 'tokens': tokens}
+
+
+def encode(nlpResult):
+    '''Encode a Google NLP result in compact form.
+
+    Args:
+        nlpResult: The result of a GoogleNLP.parse() call.
+
+    Returns:
+        A compact annotation suitable for JSON serialization.
+    '''
+    strings = []
+    stringIds = {}
+
+    def intern(s):
+        sid = stringIds.get(s)
+        if sid is None:
+            sid = len(strings)
+            stringIds[s] = sid
+            strings.append(s)
+        return sid
+
+    tokens = nlpResult['tokens']
+    text = [0] * len(tokens)
+    offset = [0] * len(tokens)
+    lemma = [0] * len(tokens)
+    postag = [0] * len(tokens)
+    head = [0] * len(tokens)
+    deptag = [0] * len(tokens)
+    for i in range(len(tokens)):
+        tok = tokens[i]
+        text[i] = intern(tok['text']['content'])
+        offset[i] = tok['text']['beginOffset']
+        lemma[i] = intern(tok['lemma'])
+        postag[i] = pos.TAG[tok['partOfSpeech']['tag']].id
+        head[i] = tok['dependencyEdge']['headTokenIndex']
+        deptag[i] = dep.TAG[tok['dependencyEdge']['label']].id
+
+    sentences = []
+    for s in nlpResult['sentences']:
+        sentences.append([intern(s['text']['content']), s['text']['beginOffset']])
+
+    return {
+        'version': COMPACT_VERSION,
+        'strings': strings,
+        'sentences': sentences,
+        'text': text,
+        'offset': offset,
+        'lemma': lemma,
+        'pos': postag,
+        'head': head,
+        'dep': deptag
+    }
+
+
+def decode(compact):
+    '''Decode a compact annotation to a projected Google NLP result.
+
+    Args:
+        compact: The result of an encode() call.
+
+    Returns:
+        A Google NLP result equal to project() of the original result.
+    '''
+    if compact['version'] != COMPACT_VERSION:
+        raise ValueError('unsupported compact annotation version %s' % compact['version'])
+    strings = compact['strings']
+    sentences = []
+    for textId, beginOffset in compact['sentences']:
+        sentences.append({
+            'text': {
+                'content': strings[textId],
+                'beginOffset': beginOffset
+            }
+        })
+    tokens = []
+    for i in range(len(compact['text'])):
+        tokens.append({
+            'text': {
+                'content': strings[compact['text'][i]],
+                'beginOffset': compact['offset'][i]
+            },
+            'lemma': strings[compact['lemma'][i]],
+            'partOfSpeech': {
+                'tag': _POS_NAMES[compact['pos'][i]]
+            },
+            'dependencyEdge': {
+                'headTokenIndex': compact['head'][i],
+                'label': _DEP_NAMES[compact['dep'][i]]
+            }
+        })
+    return {'sentences': sentences, 'tokens': tokens}
@@ -82,13 +82,4 @@ _GOOGLE_DEP_NAMES = [
 ]
 
 
-for i in range(len(_GOOGLE_DEP_NAMES)):
-    exec('%s = tag.ConstantTag(%i, _GOOGLE_DEP_NAMES[%i])' % (_GOOGLE_DEP_NAMES[i], i+100, i))
-
-
-TAG = {}
-for i in range(len(_GOOGLE_DEP_NAMES)):
-    exec('TAG[ _GOOGLE_DEP_NAMES[%i] ] = %s' % (i, _GOOGLE_DEP_NAMES[i]))
-
-
-
+TAG = tag.make_constants(globals(), _GOOGLE_DEP_NAMES, 100)
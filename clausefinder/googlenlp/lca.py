@@ -0,0 +1,130 @@
+# Lowest common ancestors in the dependency trees of a document
+#
+# LCAIndex answers lowest common ancestor and path queries between any two
+# tokens of a googlenlp.Doc in O(log depth) by binary lifting: _up[k][t] is
+# the ancestor 2**k steps above token t, or -1 past the root of its
+# sentence. Ancestor tests use the depth first intervals of the Doc
+# subtrees, so the lifting only walks up from one of the two tokens.
+#
+# Each sentence is its own tree. Sentence roots, and tokens that cannot be
+# reached from a root, hang off a virtual document root with index -1 and
+# depth -1, so tokens in different sentences have the lowest common
+# ancestor -1 and a path through both sentence roots.
+
+from array import array
+
+
+class LCAIndex(object):
+    '''Lowest common ancestor queries on the tokens of a document.'''
+
+    def __init__(self, doc):
+        '''Build the index, O(n log depth) time and memory.
+
+        Args:
+            doc: A googlenlp.Doc instance.
+        '''
+        self._doc = doc
+        head = doc._head
+        enter = doc._enter
+        exit = doc._exit
+        n = len(head)
+        parent = [-1] * n
+        depth = [0] * n
+        # Depth first order visits a head before the tokens below it
+        for t in doc._order:
+            h = head[t]
+            if h != t and enter[h] < enter[t] < exit[h]:
+                parent[t] = h
+                depth[t] = depth[h] + 1
+        self._depth = array('i', depth)
+        self._up = [array('i', parent)]
+        maxDepth = max(depth) if n != 0 else 0
+        while (1 << len(self._up)) <= maxDepth:
+            prev = self._up[-1]
+            self._up.append(array('i', [-1 if p < 0 else prev[p] for p in prev]))
+
+    def depth(self, i):
+        '''Get the depth of a token in its sentence.
+
+        Args:
+            i: A token index.
+
+        Returns:
+            The number of edges from the sentence root to i.
+        '''
+        return self._depth[i]
+
+    def is_ancestor(self, a, i):
+        '''Check if a token is an ancestor of another.
+
+        Args:
+            a: A token index or -1 for the virtual document root.
+            i: A token index.
+
+        Returns:
+            True if a == i or a is above i.
+        '''
+        return a < 0 or self._doc._enter[a] <= self._doc._enter[i] < self._doc._exit[a]
+
+    def lca(self, u, v):
+        '''Find the lowest common ancestor of two tokens.
+
+        Args:
+            u: A token index.
+            v: A token index.
+
+        Returns:
+            A token index, or -1 if u and v are in different trees.
+        '''
+        enter = self._doc._enter
+        exit = self._doc._exit
+        if enter[u] <= enter[v] < exit[u]:
+            return u
+        if enter[v] <= enter[u] < exit[v]:
+            return v
+        ev = enter[v]
+        for up in reversed(self._up):
+            w = up[u]
+            if w >= 0 and not (enter[w] <= ev < exit[w]):
+                u = w
+        return self._up[0][u]
+
+    def distance(self, u, v):
+        '''Get the number of edges on the path between two tokens.
+
+        Args:
+            u: A token index.
+            v: A token index.
+
+        Returns:
+            An integer, paths between sentences pass the virtual root.
+        '''
+        a = self.lca(u, v)
+        da = -1 if a < 0 else self._depth[a]
+        return self._depth[u] + self._depth[v] - 2 * da
+
+    def path(self, u, v):
+        '''Get the path between two tokens.
+
+        Args:
+            u: The start token index.
+            v: The end token index.
+
+        Returns:
+            A tuple (lca, up, down). up lists the tokens from u up to the
+            child of lca, down lists the tokens from the child of lca down to
+            v. Each edge is labelled by the dependency of its lower token, so
+            the labels of the path are those of up followed by those of down.
+        '''
+        a = self.lca(u, v)
+        parent = self._up[0]
+        up = []
+        while u != a:
+            up.append(u)
+            u = parent[u]
+        down = []
+        while v != a:
+            down.append(v)
+            v = parent[v]
+        down.reverse()
+        return a, up, down
@@ -21,13 +21,7 @@ _GOOGLE_POS_NAMES = [
 ]
 
 
-for i in range(len(_GOOGLE_POS_NAMES)):
-    exec('%s = tag.ConstantTag(%i, _GOOGLE_POS_NAMES[%i])' % (_GOOGLE_POS_NAMES[i], i+200, i))
-
-
-TAG = {}
-for i in range(len(_GOOGLE_POS_NAMES)):
-    exec('TAG[ _GOOGLE_POS_NAMES[%i] ] = %s' % (i, _GOOGLE_POS_NAMES[i]))
+TAG = tag.make_constants(globals(), _GOOGLE_POS_NAMES, 200)
 
 
 # SpaCy specific tags
@@ -1,41 +1,73 @@
 # Generic tag class used for a part-of-speech or a dependency-relation
 
-class ConstantTag(object):
-    '''Constant Tag class'''
-    def __init__(self, id, name):
-        self._id = id
+class ConstantTag(int):
+    '''Constant Tag class. A tag is an integer id with a name, so tags compare
+    and hash as their id and can index lookup tables directly.
+    '''
+    def __new__(cls, id, name):
+        self = int.__new__(cls, id)
         self._name = name
+        return self
 
-    def __eq__(self, other):
-        return isinstance(other, ConstantTag) and other._id == self._id
-
-    def __ne__(self, other):
-        return not isinstance(other, ConstantTag) or other._id != self._id
-
-    def __lt__(self, other):
-        return other._id < self._id
-
-    def __gt__(self, other):
-        return other._id > self._id
-
-    def __le__(self, other):
-        return other._id <= self._id
-
-    def __ge__(self, other):
-        return other._id >= self._id
-
-    def __hash__(self):
-        return (self._id << 5) ^ (self.id >> 27)
+    def __getnewargs__(self):
+        return int(self), self._name
 
     def __repr__(self):
         return self._name
 
+    __str__ = __repr__
+
     @property
     def id(self):
-        return self._id
+        return int(self)
 
     @property
     def text(self):
         return self._name
 
 
+def make_constants(namespace, names, base):
+    '''Create a ConstantTag for each name and add it to a module namespace.
+
+    Args:
+        namespace: The module globals().
+        names: A list of tag names.
+        base: The id of the first tag, tag i has id base+i.
+
+    Returns:
+        A dictionary mapping names to tags.
+    '''
+    tags = {}
+    for i, name in enumerate(names):
+        tags[name] = ConstantTag(base + i, name)
+    namespace.update(tags)
+    return tags
+
+
+def make_table(mapping, size, default):
+    '''Create a dense lookup table indexed by tag id.
+
+    Args:
+        mapping: A dictionary mapping tags or tag ids to values.
+        size: The table size, all tag ids must be less than size.
+        default: The value for ids not in mapping.
+
+    Returns:
+        A list.
+    '''
+    table = [default] * size
+    for k, v in mapping.items():
+        table[k] = v
+    return table
+
+
+class TagTable(dict):
+    '''A sparse lookup table with the same interface as make_table(), for
+    tags with ids too large for a dense table.
+    '''
+    def __init__(self, mapping, default):
+        super(TagTable, self).__init__(mapping)
+        self._default = default
+
+    def __missing__(self, key):
+        return self._default
@@ -0,0 +1,134 @@
+# String table for googlenlp documents
+#
+# A Doc stores token text, lemmas and sentence text as integer ids into a
+# Vocab and only resolves them to strings when a Token attribute asks for
+# them. Each Doc has its own Vocab unless one is passed to its constructor;
+# documents created with the same Vocab store each distinct string once, so
+# a corpus held in memory keeps one copy of 'the' rather than one per
+# document, and ids can be compared across the documents.
+#
+# Ids are never removed, a shared Vocab grows with the distinct strings of
+# all its documents, sentence text included. Share one per corpus, not per
+# process.
+
+from array import array
+
+
+class Vocab(object):
+    '''Map strings to integer ids and back.'''
+
+    def __init__(self, strings=None):
+        '''Create a vocabulary.
+
+        Args:
+            strings: An optional list of distinct strings, string i gets id i.
+                The list is used as is and grows as strings are added.
+        '''
+        self.strings = [] if strings is None else strings
+        # Built on first lookup, documents loaded from compact or binary form
+        # often never look up a string
+        self._ids = None
+        # String id to the id of its lowercase form, -1 if not found yet
+        self._lower = array('i')
+
+    def _index(self):
+        if self._ids is None:
+            self._ids = dict([(s, k) for k, s in enumerate(self.strings)])
+        return self._ids
+
+    def intern(self, s):
+        '''Get the id of a string, adding it if needed.
+
+        Args:
+            s: A unicode string.
+
+        Returns:
+            An integer id.
+        '''
+        ids = self._index()
+        sid = ids.get(s)
+        if sid is None:
+            sid = len(self.strings)
+            ids[s] = sid
+            self.strings.append(s)
+        return sid
+
+    def get(self, s, default=None):
+        '''Get the id of a string without adding it.
+
+        Args:
+            s: A unicode string.
+            default: The value returned if s is not in the vocabulary.
+
+        Returns:
+            An integer id or default.
+        '''
+        return self._index().get(s, default)
+
+    def lower(self, sid):
+        '''Get the id of the lowercase form of a string without adding it.
+        Found ids are cached so repeated calls are an array lookup.
+
+        Args:
+            sid: A string id.
+
+        Returns:
+            An integer id, sid if the string is already lowercase, or -1 if
+            the lowercase form is not in the vocabulary.
+        '''
+        lower = self._lower
+        if sid >= len(lower):
+            lower.extend([-1] * (len(self.strings) - len(lower)))
+        lid = lower[sid]
+        if lid < 0:
+            s = self.strings[sid]
+            t = s.lower()
+            lid = sid if t == s else self._index().get(t, -1)
+            if lid >= 0:
+                lower[sid] = lid
+        return lid
+
+    def __getitem__(self, sid):
+        return self.strings[sid]
+
+    def __contains__(self, s):
+        return s in self._index()
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class LowerSet(object):
+    '''A set of lowercase words that string ids of a Vocab are tested against
+    in any case, e.g. sid in LowerSet(vocab, [u'which', u'that']). Nothing is
+    added to the vocabulary. Ids are compared while the lowercase form of the
+    tested string is in the vocabulary, else the string is lowercased.
+    '''
+
+    def __init__(self, vocab, words):
+        '''Create a set.
+
+        Args:
+            vocab: A Vocab instance.
+            words: A list of lowercase unicode strings.
+        '''
+        self._vocab = vocab
+        self._words = frozenset(words)
+        # Vocabulary size when _ids was computed, a new string can be one of
+        # the words
+        self._size = -1
+        self._ids = frozenset()
+        self._complete = False
+
+    def __contains__(self, sid):
+        vocab = self._vocab
+        if self._size != len(vocab.strings):
+            self._size = len(vocab.strings)
+            self._ids = frozenset([vocab.get(w) for w in self._words if w in vocab])
+            self._complete = len(self._ids) == len(self._words)
+        lid = vocab.lower(sid)
+        if lid >= 0:
+            return lid in self._ids
+        # The lowercase form is not in the vocabulary, so it is not one of
+        # the words that are
+        return not self._complete and vocab.strings[sid].lower() in self._words
@@ -0,0 +1,141 @@
+# Incremental clause finding for edited documents
+#
+# IncrementalClauseFinder remembers the clauses of each sentence keyed by a
+# fingerprint of the sentence tokens and arcs. When a new version of a
+# document arrives only the sentences with a new fingerprint are passed to
+# the clause finder, the clauses of the other sentences are rebuilt from the
+# memo against the new document. Fingerprints are relative to the sentence so
+# inserting or removing a sentence does not invalidate the sentences after it.
+
+import hashlib
+from clausefinder.clause import Clause
+from clausefinder.clause import ClauseFinder
+from clausefinder.common import SubtreeSpan
+from clausefinder.common import SyntheticSpan
+
+
+def sentence_fingerprint(doc, start, end):
+    '''A content hash of a sentence built from the token interface, for
+    documents without a sentence_fingerprint() method.
+
+    Args:
+        doc: A spacy.Doc instance.
+        start: The first token index of the sentence.
+        end: One past the last token index of the sentence.
+
+    Returns:
+        A hex digest string.
+    '''
+    h = hashlib.sha1()
+    h.update(('%i;' % (end - start)).encode('ascii'))
+    base = doc[start].idx
+    for i in range(start, end):
+        tok = doc[i]
+        h.update(('%i,%i,%i,%i;' % (tok.head.i - start, tok.dep, tok.pos, tok.idx - base)).encode('ascii'))
+        h.update(tok.text.encode('utf-8'))
+        h.update(b'\0')
+        h.update(tok.lemma_.encode('utf-8'))
+        h.update(b'\1')
+    return h.hexdigest()
+
+
+def _sentence_key(doc, sentence):
+    # Returns (start, end, fingerprint) for a sentence span
+    if hasattr(doc, 'sentence_fingerprint'):
+        # Google document
+        g = sentence.root.sent_id
+        start, end = doc.sentence_range(g)
+        return start, end, doc.sentence_fingerprint(g)
+    return sentence.start, sentence.end, sentence_fingerprint(doc, sentence.start, sentence.end)
+
+
+def _span_record(span, start):
+    # A span relative to the sentence start. Synthetic spans do not refer to
+    # the document and are shared.
+    if isinstance(span, SyntheticSpan):
+        return span
+    return span.i - start, span.mask >> start
+
+
+def _span_from_record(doc, record, start):
+    if isinstance(record, SyntheticSpan):
+        return record
+    root, mask = record
+    span = SubtreeSpan(doc, root + start, shallow=True)
+    span._mask = mask << start
+    span._changed()
+    return span
+
+
+def _clause_record(clause, start):
+    return (clause.type, _span_record(clause.subject, start), _span_record(clause.root, start),
+            [_span_record(o, start) for o in clause.objects])
+
+
+def _clause_from_record(doc, record, start):
+    type, subj, verb, objs = record
+    return Clause(doc=doc, type=type, subjectSpan=_span_from_record(doc, subj, start),
+                  verbSpan=_span_from_record(doc, verb, start),
+                  objectSpans=[_span_from_record(doc, o, start) for o in objs])
+
+
+class IncrementalClauseFinder(object):
+    '''Find the clauses of successive versions of a document, only running the
+    clause finder on sentences that changed since the previous version.
+    '''
+
+    def __init__(self, profile=None, vectorize=False):
+        '''Constructor.
+
+        Args:
+            profile: An optional instrument.PhaseProfile passed to the clause
+                finder. Only recomputed sentences are profiled.
+            vectorize: Passed to the clause finder, see ClauseFinder.
+        '''
+        self._profile = profile
+        self._vectorize = vectorize
+        self._finder = None
+        self._memo = {}
+
+    def __len__(self):
+        # The number of memoized sentences
+        return len(self._memo)
+
+    def update(self, doc):
+        '''Find the clauses of a new version of the document. The memo is
+        replaced by the sentences of this version, so it does not grow as a
+        document is edited.
+
+        Args:
+            doc: A googlenlp.Doc or spacy.Doc instance.
+
+        Returns:
+            A tuple (clauses, recomputed). clauses is a list of Clause
+            instances for all sentences of doc in sentence order. recomputed
+            is a list of the positions in doc.sents of the sentences the
+            clause finder was run on.
+        '''
+        memo = {}
+        clauses = []
+        recomputed = []
+        reset = False
+        for k, sent in enumerate(doc.sents):
+            start, end, key = _sentence_key(doc, sent)
+            records = memo.get(key)
+            if records is None:
+                records = self._memo.get(key)
+            if records is None:
+                if self._finder is None:
+                    self._finder = ClauseFinder(doc, self._profile, self._vectorize)
+                elif not reset:
+                    self._finder.reset(doc, self._profile)
+                reset = True
+                found = self._finder.find_clauses(sent)
+                records = [_clause_record(c, start) for c in found]
+                clauses.extend(found)
+                recomputed.append(k)
+            else:
+                clauses.extend([_clause_from_record(doc, r, start) for r in records])
+            memo[key] = records
+        self._memo = memo
+        return clauses, recomputed
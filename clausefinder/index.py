@@ -0,0 +1,227 @@
+# Persistent clause index
+#
+# Maps terms of the clauses found in a corpus to the clauses that contain
+# them, so queries such as all SVO clauses whose verb lemma is 'mix' do not
+# rescan the batch output. Terms are the clause type and the lowercase
+# lemmas of the verb, the subject head and each object head. The index is a
+# SQLite database with a postings table from (field, term) to clause ids and
+# a clauses table from clause ids to (problem, sentence, clause) ids, where
+# clause is the position of the clause in the clause list of the problem.
+# Queries intersect the postings of each given term.
+#
+# Like ClauseCache the index can be read by many processes but should be
+# written by one, batch.py writes it as results arrive.
+#
+# Usage: python -m clausefinder.index [options] index.db
+
+import sqlite3
+import sys
+from optparse import OptionParser
+
+# Posting fields
+FIELDS = ['type', 'verb', 'subject', 'object']
+
+
+def span_head(doc, indexes):
+    '''Find the head of a span, the first token whose head is outside the span.
+
+    Args:
+        doc: A googlenlp.Doc instance.
+        indexes: A list of token indexes.
+
+    Returns:
+        A token index or None if indexes is empty.
+    '''
+    span = set(indexes)
+    for i in indexes:
+        head = doc[i].head.i
+        if head == i or head not in span:
+            return i
+    return None
+
+
+def clause_terms(doc, clause):
+    '''Get the index terms of a clause.
+
+    Args:
+        doc: The googlenlp.Doc instance the clause was found in.
+        clause: A dictionary created by batch.clause_to_dict().
+
+    Returns:
+        A list of (field, term) pairs without duplicates.
+    '''
+    terms = [('type', clause['type'])]
+    heads = [('subject', clause['subject'])]
+    if clause['verb'] is not None:
+        heads.append(('verb', clause['verb']))
+    heads.extend([('object', o) for o in clause['objects']])
+    for field, indexes in heads:
+        i = span_head(doc, indexes)
+        if i is not None:
+            term = (field, doc[i].lemma.lower())
+            if term not in terms:
+                terms.append(term)
+    return terms
+
+
+class ClauseIndex(object):
+    '''Clause index backed by a SQLite file.'''
+
+    def __init__(self, filename, readonly=False):
+        '''Open or create an index.
+
+        Args:
+            filename: The path to the index file.
+            readonly: If True the index will not be created or written.
+        '''
+        self._readonly = readonly
+        self._db = sqlite3.connect(filename)
+        if not readonly:
+            self._db.execute('CREATE TABLE IF NOT EXISTS clauses (id INTEGER PRIMARY KEY, problem INTEGER NOT NULL, '
+                             'sentence INTEGER NOT NULL, clause INTEGER NOT NULL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS clauses_problem ON clauses (problem)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS postings (field TEXT NOT NULL, term TEXT NOT NULL, '
+                             'clause INTEGER NOT NULL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS postings_term ON postings (field, term, clause)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS postings_clause ON postings (clause)')
+            self._db.commit()
+        self._pending = 0
+
+    def add(self, problem, clauses, terms):
+        '''Index the clauses of a problem, replacing any clauses indexed for
+        it before. Changes are committed by flush().
+
+        Args:
+            problem: The problem id, e.g. the iIndex of a word problem.
+            clauses: A list of dictionaries created by batch.clause_to_dict().
+            terms: A list with the clause_terms() of each clause.
+        '''
+        if self._readonly:
+            raise IOError('clause index is read only')
+        self.remove(problem)
+        for k, (clause, clauseTerms) in enumerate(zip(clauses, terms)):
+            cursor = self._db.execute('INSERT INTO clauses (problem, sentence, clause) VALUES (?, ?, ?)',
+                                      (problem, clause['sentence'], k))
+            self._db.executemany('INSERT INTO postings (field, term, clause) VALUES (?, ?, ?)',
+                                 [(field, term, cursor.lastrowid) for field, term in clauseTerms])
+        self._pending += 1
+        if self._pending >= 1000:
+            self.flush()
+
+    def remove(self, problem):
+        '''Remove the clauses of a problem.
+
+        Args:
+            problem: The problem id.
+        '''
+        if self._readonly:
+            raise IOError('clause index is read only')
+        self._db.execute('DELETE FROM postings WHERE clause IN (SELECT id FROM clauses WHERE problem = ?)', (problem,))
+        self._db.execute('DELETE FROM clauses WHERE problem = ?', (problem,))
+
+    def _select(self, terms, columns):
+        # Build the query for clauses with all the terms
+        sql = 'SELECT %s FROM clauses' % columns
+        args = []
+        if len(terms) != 0:
+            sql += ' WHERE id IN (%s)' % ' INTERSECT '.join(
+                ['SELECT clause FROM postings WHERE field = ? AND term = ?'] * len(terms))
+            for field, term in terms:
+                args.extend([field, term])
+        return sql, args
+
+    def _terms(self, type, verb, subject, object):
+        terms = []
+        for field, term in zip(FIELDS, [type, verb, subject, object]):
+            if term is not None:
+                terms.append((field, term if field == 'type' else term.lower()))
+        return terms
+
+    def query(self, type=None, verb=None, subject=None, object=None):
+        '''Find the clauses with all the given terms.
+
+        Args:
+            type: A clause type, e.g. 'SVO', or None.
+            verb: A verb lemma or None.
+            subject: A subject head lemma or None.
+            object: An object head lemma or None. A clause matches if any of
+                its objects does.
+
+        Returns:
+            A sorted list of (problem, sentence, clause) tuples.
+        '''
+        sql, args = self._select(self._terms(type, verb, subject, object), 'problem, sentence, clause')
+        return [tuple(r) for r in self._db.execute(sql + ' ORDER BY problem, clause', args)]
+
+    def problems(self, type=None, verb=None, subject=None, object=None):
+        '''Find the problems with a clause that has all the given terms, see
+        query().
+
+        Returns:
+            A sorted list of problem ids.
+        '''
+        sql, args = self._select(self._terms(type, verb, subject, object), 'DISTINCT problem')
+        return [r[0] for r in self._db.execute(sql + ' ORDER BY problem', args)]
+
+    def terms(self, field):
+        '''Count the clauses of each term of a field.
+
+        Args:
+            field: One of FIELDS.
+
+        Returns:
+            A list of (term, count) pairs, most frequent first.
+        '''
+        rows = self._db.execute('SELECT term, COUNT(*) AS n FROM postings WHERE field = ? GROUP BY term '
+                                'ORDER BY n DESC, term', (field,))
+        return [tuple(r) for r in rows]
+
+    def flush(self):
+        '''Commit pending writes.'''
+        if self._pending != 0:
+            self._db.commit()
+            self._pending = 0
+
+    def close(self):
+        '''Commit pending writes and close the index.'''
+        if not self._readonly:
+            self._db.commit()
+        self._pending = 0
+        self._db.close()
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM clauses').fetchone()[0]
+
+
+def main(args=None):
+    usage = '%prog [options] /path/to/index.db'
+    parser = OptionParser(usage)
+    parser.add_option('-t', '--type', type='string', dest='type', help='Clause type, e.g. SVO.')
+    parser.add_option('-v', '--verb', type='string', dest='verb', help='Verb lemma.')
+    parser.add_option('-s', '--subject', type='string', dest='subject', help='Subject head lemma.')
+    parser.add_option('-o', '--object', type='string', dest='object', help='Object head lemma.')
+    parser.add_option('-P', '--problems', action='store_true', dest='problems', help='List problem ids only.')
+    parser.add_option('-T', '--terms', type='string', dest='field', help='List the terms of a field with counts.')
+    options, args = parser.parse_args(args)
+    if len(args) != 1:
+        parser.error('expected an index file')
+    index = ClauseIndex(args[0], readonly=True)
+    try:
+        if options.field is not None:
+            if options.field not in FIELDS:
+                parser.error('field must be one of %s' % ', '.join(FIELDS))
+            for term, n in index.terms(options.field):
+                print('%s\t%i' % (term, n))
+        elif options.problems:
+            for problem in index.problems(options.type, options.verb, options.subject, options.object):
+                print(problem)
+        else:
+            for row in index.query(options.type, options.verb, options.subject, options.object):
+                print('%i\t%i\t%i' % row)
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# Optional instrumentation for the clause finder
+#
+# A PhaseProfile collects wall time per phase and event counters. Phases
+# nest and the time of a phase excludes the phases entered inside it, so the
+# phase times add up to the total time. ClauseFinder only calls a profile at
+# phase boundaries, and only if one was passed to it.
+#
+# ClauseFinder phases:
+#   walk:       the token walk of find_clauses
+#   governors:  filling governor table entries on lookup
+#   expand:     conjunction expansion of the clause map
+#   spans:      ParsedClause span construction
+#
+# ClauseFinder counters:
+#   sentences, tokens:  sentences and tokens walked by find_clauses
+#   governorSteps:      tokens visited while building governor tables
+#   clauses:            clauses found
+#   spans:              spans built by ParsedClause
+#   setOps, setOpSize:  span unions and complements in ParsedClause and the
+#                       total size of their operands
+
+import time
+
+
+class PhaseProfile(object):
+    '''Per phase wall time and counters, aggregated over all calls.'''
+
+    def __init__(self):
+        self.phases = {}
+        self.counters = {}
+        self._stack = []
+
+    def enter(self, phase):
+        '''Start timing a phase, pausing the current phase.
+
+        Args:
+            phase: The phase name.
+        '''
+        now = time.time()
+        if len(self._stack) != 0:
+            parent = self._stack[-1]
+            self.phases[parent[0]] = self.phases.get(parent[0], 0.0) + now - parent[1]
+        self._stack.append([phase, now])
+
+    def leave(self):
+        '''Stop timing the current phase and resume its parent.'''
+        now = time.time()
+        phase, start = self._stack.pop()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - start
+        if len(self._stack) != 0:
+            self._stack[-1][1] = now
+
+    def leave_all(self):
+        '''Stop timing all phases, e.g. after an exception.'''
+        while len(self._stack) != 0:
+            self.leave()
+
+    def pause(self):
+        '''Stop timing all phases so they can be resumed later, e.g. while a
+        generator has yielded.
+
+        Returns:
+            The names of the stopped phases, outermost first.
+        '''
+        phases = [p[0] for p in self._stack]
+        self.leave_all()
+        return phases
+
+    def resume(self, phases):
+        '''Restart timing phases stopped by pause().
+
+        Args:
+            phases: The value returned by pause().
+        '''
+        for phase in phases:
+            self.enter(phase)
+
+    def count(self, name, n=1):
+        '''Add to a counter.
+
+        Args:
+            name: The counter name.
+            n: The amount to add.
+        '''
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other):
+        '''Add the phase times and counters of another profile.
+
+        Args:
+            other: A PhaseProfile or a dictionary created by to_dict().
+        '''
+        if isinstance(other, PhaseProfile):
+            other = other.to_dict()
+        for k, v in other['phases'].items():
+            self.phases[k] = self.phases.get(k, 0.0) + v
+        for k, v in other['counters'].items():
+            self.counters[k] = self.counters.get(k, 0) + v
+
+    def to_dict(self):
+        '''Convert the profile to a dictionary suitable for JSON serialization.
+
+        Returns:
+            A dictionary with the keys 'phases', mapping phase names to
+            seconds, and 'counters', mapping counter names to integers.
+        '''
+        return {'phases': dict(self.phases), 'counters': dict(self.counters)}
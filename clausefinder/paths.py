@@ -0,0 +1,287 @@
+# Dependency path features between numbers and question targets
+#
+# Alignment models for word problems need the dependency path between each
+# number of a problem and the focus of its question, e.g. 'liters' in
+# 'How many liters are left?'. A path is described by its length and the
+# dependency labels of its edges, found with googlenlp.lca.LCAIndex rather
+# than by walking the heads of both tokens to the root for every pair.
+#
+# Numbers are tokens tagged NUM. Targets are the noun modified by the 'many'
+# or 'much' of a 'how many/much' question, or the quantifier itself if its
+# head is not a noun ('How much does it cost?'). If a document has no such
+# question the roots of its sentences ending in '?' are used.
+#
+# PathFeatures holds the pairs of a corpus in flat arrays, one entry per
+# pair, with the labels of all paths concatenated in a single int16 array.
+# Files are little endian. Layout (version 1):
+#   magic        8 bytes, 'CFPATHS\0'
+#   version      uint32
+#   npairs, ndocs, nlabels    uint32 each
+#   keys         int64[ndocs], e.g. the iIndex of a word problem or -1
+#   doc, number, target, lca, nup    int32[npairs] each
+#   labelStart   int32[npairs+1]
+#   labels       int16[nlabels], dependency tag ids
+#
+# Usage: python -m clausefinder.paths [options] corpus.json|jsonl out.paths
+
+import struct
+import sys
+from array import array
+from optparse import OptionParser
+from clausefinder import googlenlp
+from clausefinder.googlenlp.lca import LCAIndex
+from clausefinder.googlenlp.vocab import LowerSet
+
+PATHS_VERSION = 1
+PATHS_MAGIC = b'CFPATHS\0'
+
+_HEADER = struct.Struct('<8s4I')
+# Per pair columns in file order
+_PAIR_COLUMNS = ['doc', 'number', 'target', 'lca', 'nup']
+_DEP_NAME = dict([(t.id, t.text) for t in googlenlp.dep.TAG.values()])
+
+
+def number_tokens(doc):
+    '''Find the numbers of a document.
+
+    Args:
+        doc: A googlenlp.Doc instance.
+
+    Returns:
+        A list of token indexes.
+    '''
+    numId = googlenlp.pos.NUM.id
+    return [i for i in range(len(doc)) if doc._pos[i] == numId]
+
+
+def question_targets(doc):
+    '''Find the question targets of a document, see the top of this module.
+
+    Args:
+        doc: A googlenlp.Doc instance.
+
+    Returns:
+        A sorted list of token indexes.
+    '''
+    # Lookups only, the vocabulary may be shared by a corpus
+    quantifiers = LowerSet(doc.vocab, [u'many', u'much'])
+    how = LowerSet(doc.vocab, [u'how'])
+    nounId = googlenlp.pos.NOUN.id
+    lemmaId = doc._lemmaId
+    targets = set()
+    for i in range(len(doc)):
+        if lemmaId[i] not in quantifiers:
+            continue
+        for c in doc[i].adj:
+            if lemmaId[c] in how:
+                h = doc._head[i]
+                targets.add(h if h != i and doc._pos[h] == nounId else i)
+                break
+    if len(targets) == 0:
+        for g in range(len(doc._sentOffset)):
+            start, end = doc.sentence_range(g)
+            if end > start and doc._strings[doc._textId[end - 1]] == u'?' and doc._trees[g] is not None:
+                targets.add(doc._trees[g])
+    return sorted(targets)
+
+
+def _pack(a):
+    if sys.byteorder != 'little':
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tostring()
+
+
+def _unpack(typecode, data):
+    a = array(typecode)
+    a.fromstring(data)
+    if sys.byteorder != 'little':
+        a.byteswap()
+    return a
+
+
+class PathFeatures(object):
+    '''Dependency paths between numbers and question targets in a corpus.
+
+    Pair k is in document doc[k], from token number[k] to token target[k]
+    through their lowest common ancestor lca[k], -1 if they are in different
+    sentences. The labels of the path are labels[labelStart[k]:labelStart[k+1]],
+    the first nup[k] of them on the way up from the number. All columns are
+    array.array instances and can be wrapped with numpy.frombuffer().
+    '''
+
+    def __init__(self):
+        self.keys = []
+        self.doc = array('i')
+        self.number = array('i')
+        self.target = array('i')
+        self.lca = array('i')
+        self.nup = array('i')
+        self.labelStart = array('i', [0])
+        self.labels = array('h')
+
+    def add_doc(self, doc, key=-1, targets=None):
+        '''Add the paths of all number and target pairs of a document.
+
+        Args:
+            doc: A googlenlp.Doc instance.
+            key: An optional integer key, e.g. the iIndex of a word problem.
+            targets: An optional function returning the target token indexes
+                of a document, default is question_targets().
+
+        Returns:
+            The number of pairs added.
+        '''
+        k = len(self.keys)
+        self.keys.append(key)
+        numbers = number_tokens(doc)
+        if len(numbers) == 0:
+            return 0
+        targetIdx = (question_targets if targets is None else targets)(doc)
+        if len(targetIdx) == 0:
+            return 0
+        index = LCAIndex(doc)
+        deps = doc._dep
+        for u in numbers:
+            for v in targetIdx:
+                a, up, down = index.path(u, v)
+                self.doc.append(k)
+                self.number.append(u)
+                self.target.append(v)
+                self.lca.append(a)
+                self.nup.append(len(up))
+                self.labels.extend([deps[t] for t in up])
+                self.labels.extend([deps[t] for t in down])
+                self.labelStart.append(len(self.labels))
+        return len(numbers) * len(targetIdx)
+
+    def __len__(self):
+        return len(self.doc)
+
+    def length(self, k):
+        '''Get the number of edges of a path.
+
+        Args:
+            k: The pair index.
+
+        Returns:
+            An integer.
+        '''
+        return self.labelStart[k+1] - self.labelStart[k]
+
+    def path_labels(self, k):
+        '''Get the labels of a path.
+
+        Args:
+            k: The pair index.
+
+        Returns:
+            A tuple (up, down) of lists of dependency tag ids.
+        '''
+        start = self.labelStart[k]
+        mid = start + self.nup[k]
+        return self.labels[start:mid].tolist(), self.labels[mid:self.labelStart[k+1]].tolist()
+
+    def path_text(self, k):
+        '''Render a path, e.g. 'NUM^ DOBJ^ vNSUBJ'. Labels followed by ^ are on
+        the way up from the number, labels preceded by v on the way down to
+        the target.
+
+        Args:
+            k: The pair index.
+
+        Returns:
+            A string.
+        '''
+        up, down = self.path_labels(k)
+        return ' '.join(['%s^' % _DEP_NAME[t] for t in up] + ['v%s' % _DEP_NAME[t] for t in down])
+
+    def save(self, filename):
+        '''Write the features to a file, see the layout at the top of this
+        module.
+
+        Args:
+            filename: The output path.
+        '''
+        with open(filename, 'wb') as fd:
+            fd.write(_HEADER.pack(PATHS_MAGIC, PATHS_VERSION, len(self), len(self.keys), len(self.labels)))
+            fd.write(struct.pack('<%iq' % len(self.keys), *self.keys))
+            for name in _PAIR_COLUMNS:
+                fd.write(_pack(getattr(self, name)))
+            fd.write(_pack(self.labelStart))
+            fd.write(_pack(self.labels))
+
+    @classmethod
+    def load(cls, filename):
+        '''Read features written by save().
+
+        Args:
+            filename: The input path.
+
+        Returns:
+            A PathFeatures instance.
+        '''
+        with open(filename, 'rb') as fd:
+            data = fd.read()
+        magic, version, npairs, ndocs, nlabels = _HEADER.unpack_from(data, 0)
+        if magic != PATHS_MAGIC:
+            raise ValueError('not a path feature file')
+        if version != PATHS_VERSION:
+            raise ValueError('unsupported path feature version %s' % version)
+        self = cls()
+        pos = _HEADER.size
+        self.keys = list(struct.unpack_from('<%iq' % ndocs, data, pos))
+        pos += 8 * ndocs
+        for name in _PAIR_COLUMNS:
+            setattr(self, name, _unpack('i', data[pos:pos + 4 * npairs]))
+            pos += 4 * npairs
+        self.labelStart = _unpack('i', data[pos:pos + 4 * (npairs + 1)])
+        pos += 4 * (npairs + 1)
+        self.labels = _unpack('h', data[pos:pos + 2 * nlabels])
+        return self
+
+
+def extract_paths(docs, keys=None, targets=None):
+    '''Extract the number to target paths of a corpus.
+
+    Args:
+        docs: An iterable of googlenlp.Doc instances, e.g. a binary.Corpus.
+        keys: An optional sequence of integer keys, one per document.
+        targets: An optional target function, see PathFeatures.add_doc().
+
+    Returns:
+        A PathFeatures instance.
+    '''
+    features = PathFeatures()
+    for k, doc in enumerate(docs):
+        features.add_doc(doc, -1 if keys is None else keys[k], targets)
+    return features
+
+
+def main(args=None):
+    from clausefinder.batch import read_problems
+    usage = '%prog [options] /path/to/corpus.json|jsonl /path/to/output.paths'
+    parser = OptionParser(usage)
+    parser.add_option('-p', '--print', action='store_true', dest='show', help='Print each path to stdout.')
+    options, args = parser.parse_args(args)
+    if len(args) != 2:
+        parser.error('expected an input and an output file')
+    features = PathFeatures()
+    for prob in read_problems(args[0]):
+        if 'nlp' not in prob:
+            continue
+        doc = googlenlp.Doc(prob['nlp'])
+        start = len(features)
+        features.add_doc(doc, prob.get('iIndex', -1))
+        if options.show:
+            for k in range(start, len(features)):
+                print('%i\t%s\t%s\t%i\t%s' % (features.keys[-1], doc[features.number[k]].text,
+                                              doc[features.target[k]].text, features.length(k),
+                                              features.path_text(k)))
+    features.save(args[1])
+    sys.stderr.write('Wrote %i paths of %i documents to %s\n' % (len(features), len(features.keys), args[1]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,32 +1,61 @@
-#from spacy.en import English  # NLP with spaCy https://spacy.io
 from spacy.tokens import Token
 from spacy.tokens import Doc
 from spacy.tokens import Span
 from . import dep
 from . import pos
+from . import model
 from collections import OrderedDict
+from clausefinder.googlenlp.tag import TagTable
 
-# done in .dep
-#NLP = English() # will take some time to load
-
-SPACY_TYPE_NAMES = {
-    dep.ACOMP: 'C',        # Adjectival complement
-    dep.ADVMOD: 'Av',      # Adverbial modifier
-    dep.ATTR: 'c',         # Attribute dependent of a copular verb
-    dep.CCOMP: 'Cz',       # Clausal complement of a verb or adjective
-    dep.CSUBJ: 'S',        # Clausal subject
-    dep.CSUBJPASS: 'S',    # Clausal passive subject
-    dep.DOBJ: 'O',         # Direct object
-    dep.IOBJ: 'Oi',        # Indirect object
-    #dep.NOMCSUBJ: 'S',     # Nominalized clausal subject
-    #dep.NOMCSUBJPASS: 'S', # Nominalized clausal passive
-    dep.NSUBJ: 'S',        # Nominal subject
-    dep.NSUBJPASS: 'S',    # Passive nominal subject
-    dep.QUANTMOD: 'Aq',    # Quantifier phrase modifier
-    dep.XCOMP: 'Cx',       # Open clausal complement
-    pos.ADP: 'A',          # Adposition (preposition and postposition)
-    pos.VERB: 'V',         # Verb (all tenses and modes)
-}
+# The model is loaded on first use, see spacynlp.model
+
+# Tag tables, filled by init_tags(). SpaCy ids are string store ids so the
+# tables are sparse, see googlenlp for the dense equivalents.
+SPACY_TYPE_NAMES = {}
+TYPE_NAME = TagTable({}, '')
+IS_SUBJECT = TagTable({}, False)
+IS_OBJECT = TagTable({}, False)
+_tagVocab = None
+
+
+def init_tags(vocab):
+    '''Resolve the dependency label ids and the tag tables from the vocabulary
+    of a model. Called by ClauseFinder for each spaCy document, this is a no-op
+    if the vocabulary has not changed.
+
+    Args:
+        vocab: The spacy.Vocab of the model that parsed the documents.
+    '''
+    global _tagVocab
+    if vocab is _tagVocab:
+        return
+    dep.init_labels(vocab)
+    SPACY_TYPE_NAMES.clear()
+    SPACY_TYPE_NAMES.update({
+        dep.ACOMP: 'C',        # Adjectival complement
+        dep.ADVMOD: 'Av',      # Adverbial modifier
+        dep.ATTR: 'c',         # Attribute dependent of a copular verb
+        dep.CCOMP: 'Cz',       # Clausal complement of a verb or adjective
+        dep.CSUBJ: 'S',        # Clausal subject
+        dep.CSUBJPASS: 'S',    # Clausal passive subject
+        dep.DOBJ: 'O',         # Direct object
+        dep.IOBJ: 'Oi',        # Indirect object
+        #dep.NOMCSUBJ: 'S',     # Nominalized clausal subject
+        #dep.NOMCSUBJPASS: 'S', # Nominalized clausal passive
+        dep.NSUBJ: 'S',        # Nominal subject
+        dep.NSUBJPASS: 'S',    # Passive nominal subject
+        dep.QUANTMOD: 'Aq',    # Quantifier phrase modifier
+        dep.XCOMP: 'Cx',       # Open clausal complement
+        pos.ADP: 'A',          # Adposition (preposition and postposition)
+        pos.VERB: 'V',         # Verb (all tenses and modes)
+    })
+    TYPE_NAME.clear()
+    TYPE_NAME.update(SPACY_TYPE_NAMES)
+    IS_SUBJECT.clear()
+    IS_SUBJECT.update(dict.fromkeys([dep.NSUBJ, dep.NSUBJPASS], True))
+    IS_OBJECT.clear()
+    IS_OBJECT.update(dict.fromkeys([dep.DOBJ, dep.IOBJ, dep.ACOMP], True))
+    _tagVocab = vocab
 
 
 def get_type_name(tag):
@@ -38,9 +67,7 @@ def get_type_name(tag):
     Returns:
         A string.
     '''
-    if SPACY_TYPE_NAMES.has_key(tag):
-        return SPACY_TYPE_NAMES[tag]
-    return ''
+    return TYPE_NAME[tag]
 
 
 # Helper methods
@@ -110,13 +137,31 @@ def parse_sentence(sentence):
 '''
 
 
-def parse(text):
+def parse(text, entity=True):
     '''Parser for multi-sentences; split and apply parse in a list.
 
     Args:
         text: The text to parse.
+        entity: If True also run the entity recognizer, see merge_ents().
     '''
-    return dep.NLP(text, tag=True, entity=True)
-    #doc = NLP(text, tag=False, entity=False)
-    #return [NLP(sent.text) for sent in doc.sents]
+    return model.get_model(entity=entity)(text, tag=True, parse=True, entity=entity)
+
+
+def parse_batch(texts, batch_size=1000, n_threads=2, entity=False):
+    '''Parse a stream of texts in batches with spaCy's pipe. This avoids the
+    per call overhead of parse() when parsing many short texts.
 
+    Args:
+        texts: An iterable of unicode strings.
+        batch_size: The number of texts spaCy buffers per batch.
+        n_threads: The number of threads spaCy uses per batch.
+        entity: If True also load the entity recognizer. Once loaded it runs
+            on every batch.
+
+    Yields:
+        A spacy.Doc for each text, in input order.
+    '''
+    nlp = model.get_model(entity=entity)
+    init_tags(nlp.vocab)
+    for doc in nlp.pipe(texts, batch_size=batch_size, n_threads=n_threads):
+        yield doc
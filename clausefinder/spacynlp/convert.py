@@ -0,0 +1,236 @@
+# Convert spaCy documents to Google NLP results
+#
+# The result has the same schema as a GoogleNLP.parse() call so it can be
+# stored in the 'nlp' field of a word problem or passed to googlenlp.Doc.
+
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+from clausefinder import spacynlp
+from . import dep
+from . import model
+from clausefinder.googlenlp.dep import TAG as _GOOGLE_DEP_TAG
+from clausefinder.googlenlp.pos import TAG as _GOOGLE_POS_TAG
+
+# SpaCy labels with no identically named Google label.
+_SPACY_DEP_TO_GOOGLE = {
+    'ROOT': 'ROOT',
+    'acl': 'VMOD',
+    'agent': 'PREP',
+    'case': 'PS',
+    'complm': 'MARK',
+    'compound': 'NN',
+    'dative': 'IOBJ',
+    'hmod': 'NN',
+    'hyph': 'P',
+    'infmod': 'VMOD',
+    'intj': 'DISCOURSE',
+    'meta': 'DEP',
+    'nmod': 'NN',
+    'npmod': 'NPADVMOD',
+    'nummod': 'NUM',
+    'oprd': 'XCOMP',
+    'possessive': 'PS',
+    'relcl': 'RCMOD',
+}
+# Reverse of spacynlp.dep._GOOGLE_DEP_EQUIV
+for _name, _equiv in dep._GOOGLE_DEP_EQUIV.items():
+    if _equiv is not None:
+        _SPACY_DEP_TO_GOOGLE[_equiv] = _name
+
+_SPACY_POS_TO_GOOGLE = {
+    'AUX': 'VERB',
+    'CCONJ': 'CONJ',
+    'EOL': 'PUNCT',
+    'INTJ': 'X',
+    'PART': 'PRT',
+    'PROPN': 'NOUN',
+    'SCONJ': 'ADP',
+    'SPACE': 'PUNCT',
+    'SYM': 'X',
+}
+
+
+def get_google_dep_label(label):
+    '''Get the Google dependency label for a spaCy dependency label.
+
+    Args:
+        label: A spaCy dependency label string, e.g. token.dep_.
+
+    Returns:
+        A Google dependency label string. Labels without an equivalent are
+        mapped to 'DEP'.
+    '''
+    if label in _SPACY_DEP_TO_GOOGLE:
+        return _SPACY_DEP_TO_GOOGLE[label]
+    name = label.upper()
+    if name in _GOOGLE_DEP_TAG:
+        return name
+    return 'DEP'
+
+
+def get_google_pos_tag(tag):
+    '''Get the Google part-of-speech tag for a spaCy coarse part-of-speech tag.
+
+    Args:
+        tag: A spaCy part-of-speech string, e.g. token.pos_.
+
+    Returns:
+        A Google part-of-speech tag string. Tags without an equivalent are
+        mapped to 'UNKNOWN'.
+    '''
+    if tag in _SPACY_POS_TO_GOOGLE:
+        return _SPACY_POS_TO_GOOGLE[tag]
+    if tag in _GOOGLE_POS_TAG:
+        return tag
+    return 'UNKNOWN'
+
+
+def to_google(doc, language='en'):
+    '''Convert a parsed spaCy document to a Google NLP result. Whitespace
+    tokens have no Google equivalent and are dropped.
+
+    Args:
+        doc: A spacy.Doc instance with tags and dependencies.
+        language: The language code stored in the result.
+
+    Returns:
+        A Google NLP result.
+    '''
+    # Map spaCy token indexes to Google token indexes
+    tokmap = [-1] * len(doc)
+    n = 0
+    for tok in doc:
+        if not tok.is_space:
+            tokmap[tok.i] = n
+            n += 1
+
+    tokens = []
+    for tok in doc:
+        if tok.is_space:
+            continue
+        head = tok.head
+        while head.is_space and head.head.i != head.i:
+            head = head.head
+        if tok.dep_ == 'ROOT' or head.i == tok.i or head.is_space:
+            headIdx = tokmap[tok.i]
+            label = 'ROOT'
+        else:
+            headIdx = tokmap[head.i]
+            label = get_google_dep_label(tok.dep_)
+        lemma = tok.lemma_
+        if lemma == '-PRON-':
+            lemma = tok.text
+        tokens.append({
+            'text': {
+                'content': tok.text,
+                'beginOffset': tok.idx
+            },
+            'lemma': lemma,
+            'partOfSpeech': {
+                'tag': get_google_pos_tag(tok.pos_)
+            },
+            'dependencyEdge': {
+                'headTokenIndex': headIdx,
+                'label': label
+            }
+        })
+
+    sentences = []
+    for sent in doc.sents:
+        words = [x for x in sent if not x.is_space]
+        if len(words) == 0:
+            continue
+        begin = words[0].idx
+        end = words[-1].idx + len(words[-1].text)
+        sentences.append({
+            'text': {
+                'content': doc.text[begin:end],
+                'beginOffset': begin
+            }
+        })
+
+    return {
+        'sentences': sentences,
+        'tokens': tokens,
+        'entities': [],
+        'language': language
+    }
+
+
+def _annotate_chunk(texts):
+    # Worker task, the model was inherited from the parent by preload()
+    return [to_google(doc) for doc in spacynlp.parse_batch(texts, batch_size=len(texts), n_threads=1)]
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def annotate(texts, batch_size=1000, n_threads=2, processes=1):
+    '''Parse a stream of texts with spaCy and convert each to a Google NLP
+    result. Texts are parsed in batches using spaCy's pipe.
+
+    Args:
+        texts: An iterable of unicode strings.
+        batch_size: The number of texts spaCy buffers per batch. With more
+            than one process this is also the number of texts per task.
+        n_threads: The number of threads spaCy uses per batch.
+        processes: The number of worker processes. If 1 the texts are parsed
+            in this process. Workers are forked after the model is loaded so
+            they share its memory.
+
+    Yields:
+        A Google NLP result for each text, in input order.
+    '''
+    if processes <= 1:
+        for doc in spacynlp.parse_batch(texts, batch_size=batch_size, n_threads=n_threads):
+            yield to_google(doc)
+        return
+    model.preload()
+    pool = Pool(processes)
+    try:
+        for results in pool.imap(_annotate_chunk, _chunks(texts, batch_size)):
+            for result in results:
+                yield result
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def annotate_problems(problems, batch_size=1000, n_threads=2, processes=1):
+    '''Annotate a stream of word problems. The 'nlp' field of each problem is
+    set to the Google NLP result for its 'sQuestion' field.
+
+    Args:
+        problems: An iterable of word problem dictionaries.
+        batch_size: The number of texts spaCy buffers per batch.
+        n_threads: The number of threads spaCy uses per batch.
+        processes: The number of worker processes, see annotate().
+
+    Yields:
+        Each problem after it has been annotated.
+    '''
+    # Keep a reference to each problem while its text is in the pipe
+    pending = deque()
+
+    def texts():
+        for prob in problems:
+            pending.append(prob)
+            text = prob['sQuestion']
+            if isinstance(text, str):
+                text = text.decode('utf-8')
+            yield text
+
+    for response in annotate(texts(), batch_size=batch_size, n_threads=n_threads, processes=processes):
+        prob = pending.popleft()
+        prob['nlp'] = response
+        yield prob
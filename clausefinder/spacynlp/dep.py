@@ -1,9 +1,12 @@
-from spacy.en import English  # NLP with spaCy https://spacy.io
+# SpaCy dependency labels named after the Google labels. The label ids are
+# string store ids. They are defined at import from spaCy's symbol table,
+# whose names are the first strings of every vocabulary, so no model is
+# loaded. init_labels() resolves them again from the vocabulary of the model
+# in use, see spacynlp.init_tags().
+
 from spacy.symbols import IDS as SPACY_IDS
 from clausefinder.googlenlp.dep import _GOOGLE_DEP_NAMES
 
-NLP = English() # will take some time to load
-
 
 _NO_GOOGLE_DEP_EQUIV = [
     'agent',
@@ -61,16 +64,30 @@ _GOOGLE_DEP_EQUIV = {
 }
 
 
-for depname in _GOOGLE_DEP_NAMES:
-    dn = depname.lower()
-    try:
-        if SPACY_IDS.has_key(dn):
-            exec ('%s = %i' % (depname, NLP.vocab.strings[dn]))
-        elif _GOOGLE_DEP_EQUIV.has_key(depname) and _GOOGLE_DEP_EQUIV[depname] is not None:
-            exec ('%s = %i' % (depname, NLP.vocab.strings[ _GOOGLE_DEP_EQUIV[depname] ]))
-    except:
-        pass
+def _set_labels(lookup):
+    # Set the label constants of this module, lookup maps a spaCy label name
+    # to its id. Labels without a spaCy equivalent are not defined.
+    for depname in _GOOGLE_DEP_NAMES:
+        dn = depname.lower()
+        try:
+            if SPACY_IDS.has_key(dn):
+                globals()[depname] = lookup(dn)
+            elif _GOOGLE_DEP_EQUIV.has_key(depname) and _GOOGLE_DEP_EQUIV[depname] is not None:
+                globals()[depname] = lookup(_GOOGLE_DEP_EQUIV[depname])
+        except:
+            pass
+
+
+def init_labels(vocab):
+    '''Set the label constants of this module from a vocabulary.
+
+    Args:
+        vocab: The spacy.Vocab of the model that parsed the documents.
+    '''
+    global ROOT
+    _set_labels(lambda name: vocab.strings[name])
+    # See issue: https://github.com/explosion/spaCy/issues/607
+    ROOT = vocab.strings['ROOT']
 
 
-# See issue: https://github.com/explosion/spaCy/issues/607
-ROOT = NLP.vocab.strings['ROOT']
+_set_labels(lambda name: SPACY_IDS[name])
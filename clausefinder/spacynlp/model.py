@@ -0,0 +1,73 @@
+# Process wide spaCy model
+#
+# The English model takes seconds to load and a lot of memory so it is loaded
+# once per process, on first use. Only the tagger and parser are loaded unless
+# a caller asks for the entity recognizer. A pool that parses with spaCy
+# should call preload() before it forks so the workers inherit the model and
+# share its memory copy-on-write instead of each loading their own.
+
+from spacy.en import English
+
+_model = None
+
+# Parsed by warm_up() to load any data the pipeline reads lazily
+_WARM_UP_TEXT = u'John gave Mary three apples and she ate two of them.'
+
+
+def is_loaded():
+    '''Check if the model is loaded in this process.
+
+    Returns:
+        True if get_model() has been called.
+    '''
+    return _model is not None
+
+
+def get_model(entity=False):
+    '''Get the process wide model, loading it on first use.
+
+    Args:
+        entity: If True make sure the entity recognizer is loaded. It is
+            added to a model loaded without it.
+
+    Returns:
+        A spacy.en.English instance.
+    '''
+    global _model
+    if _model is None:
+        # English() takes the entity keyword as the entity recognizer itself,
+        # only False is safe to pass
+        _model = English() if entity else English(entity=False)
+    elif entity and not _model.entity:
+        _model.entity = English.Defaults.create_entity(_model)
+        _model.pipeline = English.Defaults.create_pipeline(_model)
+    return _model
+
+
+def warm_up(entity=False):
+    '''Load the model and parse a short text so the first real parse does not
+    pay for loading.
+
+    Args:
+        entity: If True also load and run the entity recognizer.
+
+    Returns:
+        The model.
+    '''
+    nlp = get_model(entity=entity)
+    nlp(_WARM_UP_TEXT, tag=True, parse=True, entity=entity)
+    return nlp
+
+
+def preload(entity=False):
+    '''Load and warm up the model before forking worker processes, e.g. before
+    creating a multiprocessing.Pool. Workers then use the parent's model
+    through get_model().
+
+    Args:
+        entity: If True also load the entity recognizer.
+    '''
+    from clausefinder import spacynlp
+    nlp = warm_up(entity=entity)
+    # Resolve the tag tables once in the parent as well
+    spacynlp.init_tags(nlp.vocab)
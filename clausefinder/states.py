@@ -10,6 +10,4 @@ _STATE_NAMES = [
 ]
 
 
-for i in range(len(_STATE_NAMES)):
-    exec('%s = googlenlp.tag.ConstantTag(%i, _STATE_NAMES[%i])' % (_STATE_NAMES[i], i, i))
-
+googlenlp.tag.make_constants(globals(), _STATE_NAMES, 0)
@@ -1,7 +1,11 @@
 
 if __name__ == '__main__':
-    import googlenlp_test
-    import spacynlp_test
+    import os
+    import sys
+    import unittest
 
-    spacynlp_test.run_tests()
-    googlenlp_test.run_tests()
+    # Run every *_test.py module, each module's run_tests() exits when done
+    testdir = os.path.dirname(os.path.abspath(__file__))
+    suite = unittest.TestLoader().discover(testdir, pattern='*_test.py', top_level_dir=testdir)
+    result = unittest.TextTestRunner().run(suite)
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,67 @@
+from testdata import load_results
+import unittest
+from clausefinder import googlenlp
+from clausefinder.batch import find_doc_clauses
+from clausefinder.bench.synthetic import TreeGenerator
+from clausefinder.googlenlp import arena
+
+
+def load_docs():
+    generator = TreeGenerator(3)
+    return [googlenlp.Doc(r) for r in load_results([generator.document(n, 10) for n in [1, 2, 3]])]
+
+
+class ArenaTest(unittest.TestCase):
+
+    def test0_Docs(self):
+        docs = load_docs()
+        keys = range(10, 10 + len(docs))
+        a = arena.Arena.from_docs(docs, keys)
+        self.assertEquals(len(docs), len(a))
+        self.assertEquals(sum([len(d) for d in docs]), a.ntokens)
+        for k, doc in enumerate(a):
+            self.assertEquals(keys[k], a.key(k))
+            self.assertEquals(docs[k].fingerprint, doc.fingerprint)
+            self.assertEquals(docs[k]._hash, doc._hash)
+            self.assertEquals(find_doc_clauses(docs[k]), find_doc_clauses(doc))
+            start, end = a.token_range(k)
+            self.assertEquals(len(doc), end - start)
+            if end > start:
+                self.assertEquals((k, len(doc) - 1), a.locate(end - 1))
+        self.assertEquals(docs[-1].fingerprint, a[-1].fingerprint)
+        self.assertRaises(IndexError, a.__getitem__, len(docs))
+        # Strings are shared
+        self.assertIs(a[0]._strings, a[1]._strings)
+
+    def test1_FindTokens(self):
+        docs = load_docs()
+        a = arena.Arena.from_docs(docs)
+        dep = googlenlp.dep
+        pos = googlenlp.pos
+        queries = [
+            {'dep': dep.NSUBJ},
+            {'dep': dep.DOBJ, 'pos': pos.NOUN},
+            {'lemma': docs[0][0].lemma},
+            {'text': u'no such token'}
+        ]
+        numpy = arena.np
+        try:
+            for np in [numpy, None]:
+                arena.np = np
+                for q in queries:
+                    expect = [(k, i) for k, d in enumerate(docs) for i in range(len(d))
+                              if all([getattr(d[i], name) == v for name, v in q.items()])]
+                    docIds, tokens = a.find_tokens(**q)
+                    self.assertEquals(expect, zip([int(x) for x in docIds], [int(x) for x in tokens]))
+        finally:
+            arena.np = numpy
+        if arena.HAS_NUMPY:
+            self.assertEquals([int(d) for doc in docs for d in doc._dep], a.column('dep').tolist())
+
+
+def run_tests():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+from testdata import GOOGLE_PROBLEMS
+import unittest
+import os
+import shutil
+import tempfile
+from clausefinder import googlenlp
+from clausefinder.batch import find_doc_clauses
+from clausefinder.googlenlp import binary
+
+
+_COLUMNS = ['_head', '_dep', '_pos', '_offset', '_textId', '_lemmaId', '_sentId', '_sentOffset',
+            '_sentTextId', '_sentStart', '_trees', '_adjStart', '_adjIdx', '_order', '_enter',
+            '_exit', '_lo', '_hi', '_strings']
+
+
+class BinaryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+    def assertSameDoc(self, expected, actual):
+        for name in _COLUMNS:
+            self.assertEquals(list(getattr(expected, name)), list(getattr(actual, name)))
+        self.assertEquals(expected._hash, actual._hash)
+        self.assertEquals(expected.fingerprint, actual.fingerprint)
+        self.assertEquals([t.text for t in expected], [t.text for t in actual])
+        self.assertEquals(find_doc_clauses(expected), find_doc_clauses(actual))
+
+    def test0_Dumps(self):
+        if GOOGLE_PROBLEMS is None:
+            return
+        for p in GOOGLE_PROBLEMS:
+            doc = googlenlp.Doc(p['google'])
+            self.assertSameDoc(doc, binary.loads(binary.dumps(doc)))
+        self.assertRaises(ValueError, binary.loads, b'not a corpus')
+
+    def test1_Corpus(self):
+        if GOOGLE_PROBLEMS is None:
+            return
+        filename = os.path.join(self._tmpdir, 'corpus.bin')
+        docs = [googlenlp.Doc(p['google']) for p in GOOGLE_PROBLEMS]
+        keys = range(100, 100 + len(docs))
+        binary.write_corpus(filename, docs, keys)
+        corpus = binary.Corpus(filename)
+        self.assertEquals(len(docs), len(corpus))
+        for k, doc in enumerate(corpus):
+            self.assertEquals(keys[k], corpus.key(k))
+            self.assertSameDoc(docs[k], doc)
+        self.assertSameDoc(docs[-1], corpus[-1])
+        self.assertRaises(IndexError, corpus.__getitem__, len(docs))
+        corpus.close()
+
+
+def run_tests():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    unittest.main()
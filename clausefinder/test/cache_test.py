@@ -0,0 +1,130 @@
+from testdata import GOOGLE_PROBLEMS
+import unittest
+import copy
+import os
+import shutil
+import sqlite3
+import tempfile
+from clausefinder import batch
+from clausefinder import googlenlp
+from clausefinder.batch import find_doc_clauses
+from clausefinder.batch import run_batch
+from clausefinder.cache import ClauseCache
+from clausefinder.googlenlp import compact
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+    def test0_Fingerprint(self):
+        if GOOGLE_PROBLEMS is None:
+            return
+        fingerprints = set()
+        for p in GOOGLE_PROBLEMS:
+            doc = googlenlp.Doc(p['google'])
+            self.assertEquals(doc.fingerprint, googlenlp.Doc(compact.encode(p['google'])).fingerprint)
+            fingerprints.add(doc.fingerprint)
+            # Changing one arc changes the fingerprint
+            changed = copy.deepcopy(p['google'])
+            edge = changed['tokens'][0]['dependencyEdge']
+            edge['headTokenIndex'] = (edge['headTokenIndex'] + 1) % len(changed['tokens'])
+            self.assertNotEquals(doc.fingerprint, googlenlp.Doc(changed).fingerprint)
+        self.assertEquals(len(GOOGLE_PROBLEMS), len(fingerprints))
+
+    def test1_Cache(self):
+        if GOOGLE_PROBLEMS is None:
+            return
+        filename = os.path.join(self._tmpdir, 'clauses.db')
+        cache = ClauseCache(filename)
+        docs = [googlenlp.Doc(p['google']) for p in GOOGLE_PROBLEMS]
+        for doc in docs:
+            self.assertIsNone(cache.get(doc))
+            cache.put(doc, find_doc_clauses(doc))
+        cache.close()
+
+        cache = ClauseCache(filename, readonly=True)
+        for doc in docs:
+            self.assertEquals(find_doc_clauses(doc), cache.get(doc))
+        cache.close()
+
+        # A new clause finder version invalidates the cache
+        cache = ClauseCache(filename, version='test')
+        self.assertEquals(0, len(cache))
+        for doc in docs:
+            self.assertIsNone(cache.get(doc))
+        cache.close()
+
+    def test2_BatchCache(self):
+        if GOOGLE_PROBLEMS is None:
+            return
+        filename = os.path.join(self._tmpdir, 'clauses.db')
+        problems = [{'iIndex': k, 'nlp': p['google']} for k, p in enumerate(GOOGLE_PROBLEMS)]
+        # Stale entry for the first problem
+        cache = ClauseCache(filename)
+        cache.put(googlenlp.Doc(problems[0]['nlp']), [])
+        cache.close()
+        expect = find_doc_clauses(googlenlp.Doc(problems[0]['nlp']))
+
+        results = [r for r, _ in run_batch(problems, processes=1, cachefile=filename)]
+        self.assertEquals([], results[0]['clauses'])
+        self.assertIsNone(batch._cache)
+        # A later run without a cache does not see the earlier one
+        results = [r for r, _ in run_batch(problems, processes=1)]
+        self.assertEquals(expect, results[0]['clauses'])
+        batch.init_worker(filename)
+        self.assertIsNotNone(batch._cache)
+        batch.init_worker()
+        self.assertIsNone(batch._cache)
+
+    def test3_PoolBatch(self):
+        if GOOGLE_PROBLEMS is None:
+            return
+
+        def rows(filename):
+            db = sqlite3.connect(filename)
+            try:
+                return db.execute('SELECT key, value FROM clauses ORDER BY key').fetchall()
+            finally:
+                db.close()
+
+        problems = [{'iIndex': k, 'nlp': p['google']} for k, p in enumerate(GOOGLE_PROBLEMS)]
+        problems.append({'iIndex': len(problems)})
+        single = os.path.join(self._tmpdir, 'single.db')
+        pooled = os.path.join(self._tmpdir, 'pooled.db')
+        expect = list(run_batch(problems, processes=1, cachefile=single, profile=True))
+        # Small chunks so both workers get problems
+        actual = list(run_batch(iter(problems), processes=2, chunksize=3, cachefile=pooled, profile=True))
+        self.assertEquals(len(problems), len(actual))
+        for (e, en), (a, an) in zip(expect, actual):
+            self.assertEquals(en, an)
+            # Timings differ between runs, counters do not
+            ep = e.pop('profile', None)
+            ap = a.pop('profile', None)
+            self.assertEquals(ep is None, ap is None)
+            if ep is not None:
+                self.assertEquals(ep['counters'], ap['counters'])
+            self.assertEquals(e, a)
+        self.assertEquals('no nlp annotation', actual[-1][0]['error'])
+        self.assertEquals(len(GOOGLE_PROBLEMS), len(rows(pooled)))
+        self.assertEquals(rows(single), rows(pooled))
+        # Workers read the cache written by the first run, made stale here
+        # for the first problem
+        cache = ClauseCache(pooled)
+        cache.put(googlenlp.Doc(problems[0]['nlp']), [])
+        cache.close()
+        again = [r for r, _ in run_batch(problems, processes=2, chunksize=3, cachefile=pooled)]
+        self.assertEquals([], again[0]['clauses'])
+        self.assertEquals([r for r, _ in expect[1:]], again[1:])
+
+
+def run_tests():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+from testdata import GOOGLE_PROBLEMS
+import unittest
+import json
+from clausefinder import ClauseFinder
+from clausefinder import googlenlp
+from clausefinder.googlenlp import compact
+
+
+def find_all_clauses(doc):
+    cf = ClauseFinder(doc)
+    clauses = []
+    for sent in doc.sents:
+        clauses.extend(cf.find_clauses(sent))
+    return clauses
+
+
+class CompactTest(unittest.TestCase):
+
+    def test0_RoundTrip(self):
+        if GOOGLE_PROBLEMS is None:
+            return
+        for p in GOOGLE_PROBLEMS:
+            encoded = json.loads(json.dumps(compact.encode(p['google'])))
+            self.assertTrue(compact.is_compact(encoded))
+            self.assertFalse(compact.is_compact(p['google']))
+            self.assertEquals(compact.project(p['google']), compact.decode(encoded))
+
+    def test1_Smaller(self):
+        if GOOGLE_PROBLEMS is None:
+            return
+        for p in GOOGLE_PROBLEMS:
+            original = len(json.dumps(p['google']))
+            projected = len(json.dumps(compact.project(p['google'])))
+            self.assertLess(projected, original)
+            self.assertLess(len(json.dumps(compact.encode(p['google']))), projected)
+
+    def test2_SameClauses(self):
+        if GOOGLE_PROBLEMS is None:
+            return
+        for p in GOOGLE_PROBLEMS:
+            expect = find_all_clauses(googlenlp.Doc(json.loads(json.dumps(p['google']))))
+            actual = find_all_clauses(googlenlp.Doc(compact.encode(p['google'])))
+            self.assertEquals(len(expect), len(actual))
+            for e, a in zip(expect, actual):
+                self.assertEquals(e.type, a.type)
+                self.assertEquals(e.text, a.text)
+
+
+def run_tests():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    unittest.main()
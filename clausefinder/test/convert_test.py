@@ -0,0 +1,164 @@
+import unittest
+from clausefinder import googlenlp
+from clausefinder.googlenlp import compact
+try:
+    from clausefinder import spacynlp
+    from clausefinder.spacynlp import convert
+    from clausefinder.spacynlp import model
+    HAS_SPACY = True
+except ImportError:
+    HAS_SPACY = False
+
+
+class StubToken(object):
+    '''The spaCy token attributes read by convert.to_google().'''
+
+    def __init__(self, doc, i, text, idx, dep, pos, lemma):
+        self.doc = doc
+        self.i = i
+        self.text = text
+        self.idx = idx
+        self.dep_ = dep
+        self.pos_ = pos
+        self.lemma_ = lemma
+        self.is_space = text.isspace()
+        self.headIdx = i
+
+    @property
+    def head(self):
+        return self.doc[self.headIdx]
+
+
+class StubDoc(object):
+    '''A parsed spaCy document built from (text, head, dep, pos, lemma) tuples
+    with spaCy token indexes. sents lists the index of the first token of each
+    sentence.'''
+
+    def __init__(self, text, tokens, sents=None):
+        self.text = text
+        self._tokens = []
+        offset = 0
+        for i, (word, head, dep, pos, lemma) in enumerate(tokens):
+            offset = text.index(word, offset)
+            tok = StubToken(self, i, word, offset, dep, pos, lemma)
+            tok.headIdx = head
+            self._tokens.append(tok)
+            offset += len(word)
+        starts = [0] if sents is None else sents
+        bounds = zip(starts, starts[1:] + [len(tokens)])
+        self.sents = [self._tokens[b:e] for b, e in bounds]
+
+    def __getitem__(self, i):
+        return self._tokens[i]
+
+    def __iter__(self):
+        return iter(self._tokens)
+
+    def __len__(self):
+        return len(self._tokens)
+
+
+# 'gave  Mary' has a whitespace token, the head of 'apples' is that token
+STUB = StubDoc(u'John gave  Mary apples. It ate $ 5.', [
+    (u'John', 1, 'nsubj', 'PROPN', u'john'),
+    (u'gave', 1, 'ROOT', 'VERB', u'give'),
+    (u' ', 3, '', 'SPACE', u' '),
+    (u'Mary', 1, 'dative', 'PROPN', u'mary'),
+    (u'apples', 2, 'dobj', 'NOUN', u'apple'),
+    (u'.', 1, 'punct', 'PUNCT', u'.'),
+    (u'It', 7, 'nsubj', 'PRON', u'-PRON-'),
+    (u'ate', 7, 'ROOT', 'VERB', u'eat'),
+    (u'$', 7, 'no_such_label', 'SYM', u'$'),
+    (u'5', 8, 'nummod', 'NO_SUCH_TAG', u'5'),
+    (u'.', 7, 'punct', 'PUNCT', u'.'),
+], sents=[0, 6])
+
+
+def stub_parse_batch(texts, batch_size=1000, n_threads=2, entity=False):
+    # Parse each word as a dependent of the first
+    for text in texts:
+        words = text.split()
+        yield StubDoc(text, [(w, 0, 'ROOT' if k == 0 else 'dobj', 'VERB' if k == 0 else 'NOUN', w.lower())
+                             for k, w in enumerate(words)])
+
+
+class ConvertTest(unittest.TestCase):
+
+    def test0_Labels(self):
+        if not HAS_SPACY:
+            return
+        for label, expect in [('ROOT', 'ROOT'), ('nsubj', 'NSUBJ'), ('dobj', 'DOBJ'), ('punct', 'P'),
+                              ('dative', 'IOBJ'), ('relcl', 'RCMOD'), ('compound', 'NN'), ('nummod', 'NUM'),
+                              ('no_such_label', 'DEP'), ('', 'DEP')]:
+            self.assertEquals(expect, convert.get_google_dep_label(label))
+        for tag, expect in [('VERB', 'VERB'), ('NOUN', 'NOUN'), ('PROPN', 'NOUN'), ('AUX', 'VERB'),
+                            ('CCONJ', 'CONJ'), ('SYM', 'X'), ('SPACE', 'PUNCT'), ('NO_SUCH_TAG', 'UNKNOWN')]:
+            self.assertEquals(expect, convert.get_google_pos_tag(tag))
+        # Every mapped name is a Google tag
+        for name in convert._SPACY_DEP_TO_GOOGLE.values():
+            self.assertIn(name, googlenlp.dep.TAG)
+        for name in convert._SPACY_POS_TO_GOOGLE.values():
+            self.assertIn(name, googlenlp.pos.TAG)
+
+    def test1_ToGoogle(self):
+        if not HAS_SPACY:
+            return
+        result = convert.to_google(STUB)
+        self.assertEquals('en', result['language'])
+        self.assertEquals([(u'John gave  Mary apples.', 0), (u'It ate $ 5.', 24)],
+                          [(s['text']['content'], s['text']['beginOffset']) for s in result['sentences']])
+        actual = [(t['text']['content'], t['text']['beginOffset'], t['lemma'], t['partOfSpeech']['tag'],
+                   t['dependencyEdge']['headTokenIndex'], t['dependencyEdge']['label']) for t in result['tokens']]
+        self.assertEquals([
+            (u'John', 0, u'john', 'NOUN', 1, 'NSUBJ'),
+            (u'gave', 5, u'give', 'VERB', 1, 'ROOT'),
+            (u'Mary', 11, u'mary', 'NOUN', 1, 'IOBJ'),
+            # The whitespace token is dropped and its head used instead
+            (u'apples', 16, u'apple', 'NOUN', 2, 'DOBJ'),
+            (u'.', 22, u'.', 'PUNCT', 1, 'P'),
+            (u'It', 24, u'It', 'PRON', 6, 'NSUBJ'),
+            (u'ate', 27, u'eat', 'VERB', 6, 'ROOT'),
+            (u'$', 31, u'$', 'X', 6, 'DEP'),
+            (u'5', 33, u'5', 'UNKNOWN', 7, 'NUM'),
+            (u'.', 34, u'.', 'PUNCT', 6, 'P'),
+        ], actual)
+        # The result is a valid googlenlp document, also in compact form
+        doc = googlenlp.Doc(result)
+        self.assertEquals([1, 6], [s.root.i for s in doc.sents])
+        self.assertEquals(googlenlp.dep.IOBJ, doc[2].dep)
+        self.assertEquals(googlenlp.pos.UNKNOWN, doc[8].pos)
+        self.assertEquals(u'John gave Mary apples.', doc.render(range(0, 5)))
+        self.assertEquals(doc.fingerprint, googlenlp.Doc(compact.encode(result)).fingerprint)
+
+    def test2_Annotate(self):
+        if not HAS_SPACY:
+            return
+        texts = [u'Find the %i apples' % i for i in range(7)]
+        saved = spacynlp.parse_batch, model.preload
+        spacynlp.parse_batch = stub_parse_batch
+        model.preload = lambda entity=False: None
+        try:
+            expect = list(convert.annotate(texts, batch_size=2))
+            # Forked workers inherit the stub parser
+            actual = list(convert.annotate(iter(texts), batch_size=2, processes=2))
+        finally:
+            spacynlp.parse_batch, model.preload = saved
+        self.assertEquals(len(texts), len(expect))
+        self.assertEquals(expect, actual)
+        self.assertEquals([u'Find', u'the', u'3', u'apples'], [t['text']['content'] for t in actual[3]['tokens']])
+        problems = [{'iIndex': i, 'sQuestion': t.encode('utf-8')} for i, t in enumerate(texts)]
+        spacynlp.parse_batch = stub_parse_batch
+        try:
+            annotated = list(convert.annotate_problems(problems, batch_size=3))
+        finally:
+            spacynlp.parse_batch = saved[0]
+        self.assertEquals(range(7), [p['iIndex'] for p in annotated])
+        self.assertEquals(expect, [p['nlp'] for p in annotated])
+
+
+def run_tests():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,17 @@
 from testdata import PROBLEMS
 from testdata import GOOGLE_PROBLEMS
+from testdata import NONPROJECTIVE
+from testdata import load_results
+from testdata import load_test_result
 import unittest
+import pickle
 from clausefinder import ClauseFinder
 from clausefinder import googlenlp
+from clausefinder.common import ClauseFinderMap
+from clausefinder.common import render_tokens
+from clausefinder.bench import synthetic
+from clausefinder.bench.synthetic import TreeGenerator
+from clausefinder.instrument import PhaseProfile
 
 class GoogleTest(unittest.TestCase):
 
@@ -22,6 +31,138 @@ class GoogleTest(unittest.TestCase):
                 self.assertEquals(expect['type'], actual.type)
                 self.assertEquals(expect['text'], actual.text)
 
+    def test2_Subtrees(self):
+        for result in load_results([NONPROJECTIVE], testfile=False):
+            doc = googlenlp.Doc(result)
+            for root in doc:
+                # Reference subtree by walking the adjacency
+                expect = [root.i]
+                stk = [root.i]
+                while len(stk) != 0:
+                    adj = doc[stk.pop()].adj
+                    stk.extend(adj)
+                    expect.extend(adj)
+                expect.sort()
+                self.assertEquals(expect, doc.subtree_indexes(root.i))
+                for token in doc:
+                    self.assertEquals(token.i in expect, doc.is_in_subtree(token.i, root.i))
+        self.assertEquals([0, 1, 4, 5, 6], googlenlp.Doc(NONPROJECTIVE).subtree_indexes(1))
+
+    def test5_Sentences(self):
+        for result in load_results([NONPROJECTIVE]):
+            doc = googlenlp.Doc(result)
+            n = 0
+            for g, sent in enumerate(doc.sents):
+                start, end = doc.sentence_range(g)
+                self.assertEquals(start, n)
+                self.assertEquals(range(start, end), sent._indexes)
+                self.assertEquals(doc.subtree_indexes(sent.root.i), sent._indexes)
+                for token in sent:
+                    self.assertEquals(g, token.sent_id)
+                    self.assertEquals(sent.root, token.sent.root)
+                n = end
+            self.assertEquals(len(doc), n)
+            self.assertEquals(range(1, len(doc)), doc[1:]._indexes)
+
+    def test6_Render(self):
+        for result in load_results([NONPROJECTIVE]):
+            doc = googlenlp.Doc(result)
+            n = len(doc)
+            spans = [range(i, j) for i in range(n) for j in range(i + 1, min(n, i + 12) + 1)]
+            spans.extend([doc.subtree_indexes(i) for i in range(n)])
+            spans.append(range(0, n, 2))
+            for indexes in spans:
+                self.assertEquals(render_tokens([doc[i] for i in indexes]), doc.render(indexes))
+
+    def test7_Tags(self):
+        dep = googlenlp.dep
+        pos = googlenlp.pos
+        self.assertEquals(dep.NSUBJ.id, dep.NSUBJ)
+        self.assertEquals('NSUBJ', repr(dep.NSUBJ))
+        self.assertEquals(dep.NSUBJ, dep.TAG['NSUBJ'])
+        self.assertEquals(dep.NSUBJ, pickle.loads(pickle.dumps(dep.NSUBJ, 2)))
+        self.assertNotEquals(dep.NSUBJ, dep.DOBJ)
+        self.assertNotEquals(dep.UNKNOWN, pos.UNKNOWN)
+        for t in dep.TAG.values() + pos.TAG.values():
+            self.assertEquals(googlenlp.GOOGLE_TYPE_NAMES.get(t.id, ''), googlenlp.get_type_name(t))
+            self.assertEquals(t in [dep.NSUBJ, dep.NSUBJPASS], googlenlp.IS_SUBJECT[t])
+            self.assertEquals(t in [dep.DOBJ, dep.IOBJ, dep.ACOMP], googlenlp.IS_OBJECT[t])
+        doc = googlenlp.Doc(NONPROJECTIVE)
+        for tok in doc:
+            self.assertIs(type(tok.dep), googlenlp.tag.ConstantTag)
+            self.assertEquals(NONPROJECTIVE['tokens'][tok.i]['dependencyEdge']['label'], tok.dep.text)
+
+    def test8_Synthetic(self):
+        generator = TreeGenerator(seed=7, conj=0.3, appos=0.2, xcomp=0.2)
+        for length in [5, 20, 60]:
+            result = generator.document(3, length)
+            doc = googlenlp.Doc(result)
+            sents = list(doc.sents)
+            self.assertEquals(3, len(sents))
+            for g, sent in enumerate(sents):
+                self.assertGreaterEqual(len(sent), length)
+                # One root and every token reachable from it
+                self.assertEquals(sent.root.i, doc._trees[g])
+                self.assertEquals(sent._indexes, doc.subtree_indexes(sent.root.i))
+                self.assertEquals(result['sentences'][g]['text']['content'], doc.render(sent._indexes))
+        # The clause finder handles every generated structure
+        for seed, conj in [(1, 0.2), (2, 0.5), (3, 0.8)]:
+            generator = TreeGenerator(seed, conj=conj, appos=0.3, xcomp=0.3, depth=3)
+            for length in [5, 20, 80]:
+                nclauses, nerrors = synthetic.find_clauses(googlenlp.Doc(generator.document(10, length)))
+                self.assertGreater(nclauses, 0)
+                self.assertEquals(0, nerrors)
+
+    def test10_ReuseFinder(self):
+        doc = googlenlp.Doc(load_test_result())
+        m = ClauseFinderMap(doc)
+        self.assertTrue(m.insert_new(doc[2], [2]))
+        self.assertTrue(m.insert_new(doc[0], [0]))
+        self.assertFalse(m.insert_new(doc[2], [3]))
+        self.assertEquals([2, 0], [k for k, v in m])
+        self.assertEquals([2], m.lookup(doc[2]))
+        m.clear()
+        self.assertEquals(0, len(m))
+        self.assertIsNone(m.lookup(doc[2]))
+        self.assertTrue(m.insert_new(doc[0], [1]))
+        self.assertEquals([(0, [1])], list(m))
+        # A finder reused for another document finds the same clauses as a new one
+        generator = TreeGenerator(5)
+        docs = [googlenlp.Doc(generator.document(n, 12)) for n in [3, 1, 5]] + [doc]
+        cf = ClauseFinder(docs[0])
+        for d in docs:
+            cf.reset(d)
+            expect = []
+            for s in d.sents:
+                expect.append([c.text for c in ClauseFinder(d).find_clauses(s)])
+            actual = []
+            for s in d.sents:
+                actual.append([c.text for c in cf.find_clauses(s)])
+            self.assertEquals(expect, actual)
+
+    def test13_ClauseTypes(self):
+        for result in load_results():
+            doc = googlenlp.Doc(result)
+            cf = ClauseFinder(doc)
+            for s in doc.sents:
+                expect = [(c.type, c.text) for c in cf.find_clauses(s)]
+                self.assertEquals(expect, [(c.type, c.text) for c in cf.iter_clauses(s)])
+                for types in [set(['ISA']), set(['SVO', 'SV']), set()]:
+                    actual = [(c.type, c.text) for c in cf.find_clauses(s, types)]
+                    self.assertEquals([c for c in expect if c[0] in types], actual)
+        # Stopping early closes the profile phases and counts only the
+        # clauses yielded
+        doc = googlenlp.Doc(load_test_result())
+        profile = PhaseProfile()
+        cf = ClauseFinder(doc, profile)
+        sent = next(doc.sents)
+        expect = cf.find_clauses(sent)
+        clauses = cf.iter_clauses(sent)
+        self.assertEquals(expect[0].text, next(clauses).text)
+        clauses.close()
+        self.assertEquals(len(expect) + 1, profile.counters['clauses'])
+        self.assertEquals([], profile.pause())
+
     def disabled_test1_TextProblems(self):
         nlp = googlenlp.GoogleNLP()
         for p in PROBLEMS:
@@ -0,0 +1,62 @@
+from testdata import NONPROJECTIVE
+from testdata import load_results
+import unittest
+from clausefinder import ClauseFinder
+from clausefinder import googlenlp
+from clausefinder.bench.synthetic import TreeGenerator
+
+
+def walk(token, found, checkRoot):
+    # Reference governor search by walking the head chain
+    dep = googlenlp.dep
+    while token.dep != dep.ROOT:
+        if found(token):
+            return token
+        token = token.head
+    return token if checkRoot and found(token) else None
+
+
+class GovernorsTest(unittest.TestCase):
+
+    def check_governors(self, doc, cf):
+        dep = googlenlp.dep
+        pos = googlenlp.pos
+        for token in doc:
+            verb = walk(token, lambda x: x.pos == pos.VERB, True)
+            while verb is not None and verb.dep == dep.CONJ and verb.head.pos == pos.VERB:
+                verb = verb.head
+            self.assertEquals(verb, cf.get_governor_verb(token))
+            self.assertEquals(walk(token, lambda x: x.dep == dep.NSUBJ, False), cf.get_governor_subj(token))
+            self.assertEquals(walk(token, lambda x: x.dep in [dep.DOBJ, dep.IOBJ, dep.ACOMP], False),
+                              cf.get_governor_obj(token))
+            self.assertEquals(cf.get_governor_pos(token, [pos.VERB, pos.ADJ]), cf.get_governor_verb_or_adj(token))
+            if token.dep == dep.CONJ:
+                self.assertEquals(walk(token, lambda x: x.dep != dep.CONJ, True), cf.get_first_of_conj(token))
+
+    def test0_Governors(self):
+        # Compare governor tables with walking the head chain
+        for result in load_results([NONPROJECTIVE]):
+            doc = googlenlp.Doc(result)
+            self.check_governors(doc, ClauseFinder(doc))
+
+    def test1_ReverseOrder(self):
+        # Entries are filled on lookup, looking up from the last token first
+        # fills the tables from the leaves
+        generator = TreeGenerator(9, conj=0.3, appos=0.2, xcomp=0.2)
+        for n in [5, 20, 60]:
+            doc = googlenlp.Doc(generator.document(3, n))
+            cf = ClauseFinder(doc)
+            for token in reversed(list(doc)):
+                cf.get_governor_obj(token)
+            self.check_governors(doc, cf)
+            # Tables are rebuilt after a reset
+            cf.reset(googlenlp.Doc(NONPROJECTIVE))
+            self.check_governors(cf._doc, cf)
+
+
+def run_tests():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from clausefinder import ClauseFinder
+from clausefinder import googlenlp
+from clausefinder.bench.synthetic import TreeGenerator
+from clausefinder.bench.synthetic import make_result
+from clausefinder.incremental import IncrementalClauseFinder
+
+
+def clause_list(clauses):
+    return [(c.type, c.text, c.subject.i, c.subject._indexes, [o._indexes for o in c.objects])
+            for c in clauses]
+
+
+class IncrementalTest(unittest.TestCase):
+
+    def test0_Update(self):
+        generator = TreeGenerator(5, conj=0.05)
+        sents = [generator.sentence(10) for _ in range(4)]
+        versions = [
+            (sents, [0, 1, 2, 3]),
+            (sents, []),
+            # Insert a sentence, the sentences after it move
+            (sents[:1] + [generator.sentence(8)] + sents[1:], [1]),
+            # Edit a sentence and remove one
+            (sents[:1] + [generator.sentence(12)] + sents[2:3], [1]),
+            # Sentences from an older version are forgotten
+            (sents, [1, 3])
+        ]
+        inc = IncrementalClauseFinder()
+        for sentences, expectRecomputed in versions:
+            doc = googlenlp.Doc(make_result(sentences))
+            clauses, recomputed = inc.update(doc)
+            self.assertEquals(expectRecomputed, recomputed)
+            self.assertEquals(len(sentences), len(inc))
+            cf = ClauseFinder(doc)
+            expect = [c for s in doc.sents for c in cf.find_clauses(s)]
+            self.assertEquals(clause_list(expect), clause_list(clauses))
+
+    def test1_Fingerprint(self):
+        # Heads and offsets are relative to the sentence
+        generator = TreeGenerator(5, conj=0.05)
+        sents = [generator.sentence(10) for _ in range(4)]
+        doc = googlenlp.Doc(make_result(sents))
+        moved = googlenlp.Doc(make_result(sents[1:]))
+        self.assertEquals(doc.sentence_fingerprint(1), moved.sentence_fingerprint(0))
+        self.assertNotEquals(doc.sentence_fingerprint(0), doc.sentence_fingerprint(1))
+
+
+def run_tests():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+from testdata import load_results
+from testdata import load_test_result
+import unittest
+import os
+import shutil
+import tempfile
+from clausefinder import googlenlp
+from clausefinder.batch import find_doc_clauses
+from clausefinder.batch import run_batch
+from clausefinder.bench.synthetic import TreeGenerator
+from clausefinder.index import ClauseIndex
+from clausefinder.index import clause_terms
+from clausefinder.index import span_head
+
+class IndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+    def test0_Terms(self):
+        doc = googlenlp.Doc(load_test_result())
+        for clause in find_doc_clauses(doc):
+            terms = clause_terms(doc, clause)
+            self.assertEquals(('type', clause['type']), terms[0])
+            self.assertEquals(len(terms), len(set(terms)))
+            self.assertIn(('subject', doc[span_head(doc, clause['subject'])].lemma.lower()), terms)
+        sent = next(doc.sents)
+        self.assertEquals(sent.root.i, span_head(doc, sent._indexes))
+        self.assertIsNone(span_head(doc, []))
+
+    def test1_Query(self):
+        generator = TreeGenerator(2, conj=0.05)
+        results = load_results([generator.document(2, 10) for _ in range(20)])
+        problems = [{'iIndex': 100 + k, 'nlp': r} for k, r in enumerate(results)]
+        filename = os.path.join(self._tmpdir, 'index.db')
+        for result, ntokens in run_batch(problems, processes=1, indexfile=filename):
+            self.assertNotIn('terms', result)
+
+        # Expected postings from the clauses of each problem
+        expect = {}
+        for prob in problems:
+            doc = googlenlp.Doc(prob['nlp'])
+            for k, clause in enumerate(find_doc_clauses(doc)):
+                for term in clause_terms(doc, clause):
+                    expect.setdefault(term, []).append((prob['iIndex'], clause['sentence'], k))
+
+        index = ClauseIndex(filename, readonly=True)
+        self.assertEquals(sum([len(v) for (field, _), v in expect.items() if field == 'type']), len(index))
+        for (field, term), rows in expect.items():
+            self.assertEquals(rows, index.query(**{field: term}))
+        verb, rows = max([(t, v) for t, v in expect.items() if t[0] == 'verb'], key=lambda x: len(x[1]))
+        for (field, term), others in expect.items():
+            if field == 'verb':
+                continue
+            both = sorted(set(rows).intersection(others))
+            self.assertEquals(both, index.query(verb=verb[1], **{field: term}))
+            self.assertEquals(sorted(set([r[0] for r in both])), index.problems(verb=verb[1], **{field: term}))
+        self.assertEquals([], index.query(verb=u'no such verb'))
+        self.assertEquals(len(expect[verb]), dict(index.terms('verb'))[verb[1]])
+        index.close()
+
+        # Adding a problem again replaces its clauses
+        index = ClauseIndex(filename)
+        n = len(index)
+        doc = googlenlp.Doc(problems[0]['nlp'])
+        clauses = find_doc_clauses(doc)
+        index.add(100, clauses, [clause_terms(doc, c) for c in clauses])
+        self.assertEquals(n, len(index))
+        index.remove(100)
+        self.assertEquals(n - len(clauses), len(index))
+        index.close()
+
+
+def run_tests():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+from testdata import load_test_result
+import unittest
+import json
+import time
+from clausefinder import ClauseFinder
+from clausefinder import googlenlp
+from clausefinder.instrument import PhaseProfile
+
+
+class InstrumentTest(unittest.TestCase):
+
+    def test0_Profile(self):
+        doc = googlenlp.Doc(load_test_result())
+        expect = [c.text for s in doc.sents for c in ClauseFinder(doc).find_clauses(s)]
+        profile = PhaseProfile()
+        start = time.time()
+        cf = ClauseFinder(doc, profile)
+        actual = [c.text for s in doc.sents for c in cf.find_clauses(s)]
+        elapsed = time.time() - start
+        self.assertEquals(expect, actual)
+        counters = profile.counters
+        self.assertEquals(len(list(doc.sents)), counters['sentences'])
+        self.assertEquals(sum([len(s) for s in doc.sents]), counters['tokens'])
+        self.assertEquals(len(expect), counters['clauses'])
+        self.assertGreater(counters['spans'], 0)
+        self.assertGreater(counters['governorSteps'], 0)
+        self.assertEquals(set(['walk', 'governors', 'expand', 'spans']), set(profile.phases.keys()))
+        # Phases are exclusive so they add up to no more than the total
+        self.assertLessEqual(sum(profile.phases.values()), elapsed + 1e-3)
+        total = PhaseProfile()
+        total.merge(profile)
+        total.merge(json.loads(json.dumps(profile.to_dict())))
+        self.assertEquals(2 * counters['clauses'], total.counters['clauses'])
+
+
+def run_tests():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    unittest.main()
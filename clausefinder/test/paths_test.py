@@ -0,0 +1,130 @@
+from testdata import load_results
+from testdata import make_google_result
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from clausefinder import googlenlp
+from clausefinder.bench.synthetic import TreeGenerator
+from clausefinder.googlenlp.lca import LCAIndex
+from clausefinder.paths import PathFeatures
+from clausefinder.paths import extract_paths
+from clausefinder.paths import number_tokens
+from clausefinder.paths import question_targets
+
+
+PROBLEM = make_google_result([
+    (u'John has 5 liters.', [
+        (u'John', 1, 'NSUBJ', 'NOUN'),
+        (u'has', 1, 'ROOT', 'VERB'),
+        (u'5', 3, 'NUM', 'NUM'),
+        (u'liters', 1, 'DOBJ', 'NOUN'),
+        (u'.', 1, 'P', 'PUNCT')
+    ]),
+    (u'He drinks 2 of them.', [
+        (u'He', 6, 'NSUBJ', 'PRON'),
+        (u'drinks', 6, 'ROOT', 'VERB'),
+        (u'2', 6, 'DOBJ', 'NUM'),
+        (u'of', 7, 'PREP', 'ADP'),
+        (u'them', 8, 'POBJ', 'PRON'),
+        (u'.', 6, 'P', 'PUNCT')
+    ]),
+    (u'How many liters are left?', [
+        (u'How', 12, 'ADVMOD', 'ADV'),
+        (u'many', 13, 'AMOD', 'ADJ'),
+        (u'liters', 15, 'NSUBJPASS', 'NOUN'),
+        (u'are', 15, 'AUXPASS', 'VERB'),
+        (u'left', 15, 'ROOT', 'VERB'),
+        (u'?', 15, 'P', 'PUNCT')
+    ])
+])
+
+
+def load_docs():
+    generator = TreeGenerator(5, conj=0.05)
+    results = [PROBLEM] + [generator.document(3, 10) for _ in range(5)]
+    return [googlenlp.Doc(r) for r in load_results(results)]
+
+
+def ancestors(doc, i):
+    # Reference ancestor list by walking the heads, ending with the root
+    chain = [i]
+    while doc._head[chain[-1]] != chain[-1] and doc._head[chain[-1]] not in chain:
+        chain.append(doc._head[chain[-1]])
+    return chain
+
+
+class PathsTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+    def test0_LCA(self):
+        for doc in load_docs():
+            index = LCAIndex(doc)
+            n = len(doc)
+            for u in range(n):
+                up = ancestors(doc, u)
+                self.assertEquals(len(up) - 1, index.depth(u))
+                for v in range(0, n, max(1, n // 25)):
+                    down = ancestors(doc, v)
+                    common = [a for a in up if a in down]
+                    expect = common[0] if len(common) != 0 else -1
+                    self.assertEquals(expect, index.lca(u, v))
+                    a, upPath, downPath = index.path(u, v)
+                    self.assertEquals(up[:up.index(a)] if a >= 0 else up, upPath)
+                    self.assertEquals(list(reversed(down[:down.index(a)] if a >= 0 else down)), downPath)
+                    self.assertEquals(len(upPath) + len(downPath), index.distance(u, v))
+                    self.assertTrue(index.is_ancestor(a, u) and index.is_ancestor(a, v))
+
+    def test1_Extract(self):
+        doc = googlenlp.Doc(PROBLEM)
+        self.assertEquals([2, 7], number_tokens(doc))
+        n = len(doc.vocab)
+        self.assertEquals([13], question_targets(doc))
+        self.assertEquals(n, len(doc.vocab))
+        features = extract_paths([doc], [7])
+        self.assertEquals(2, len(features))
+        self.assertEquals(-1, features.lca[0])
+        self.assertEquals(5, features.length(0))
+        self.assertEquals('NUM^ DOBJ^ ROOT^ vROOT vNSUBJPASS', features.path_text(0))
+        self.assertEquals('DOBJ^ ROOT^ vROOT vNSUBJPASS', features.path_text(1))
+
+        # Without a how many question the roots of questions are targets
+        result = json.loads(json.dumps(PROBLEM))
+        result['tokens'][11]['lemma'] = u'what'
+        self.assertEquals([15], question_targets(googlenlp.Doc(result)))
+        # Lemmas are matched in any case
+        result['tokens'][11]['lemma'] = u'How'
+        self.assertEquals([13], question_targets(googlenlp.Doc(result)))
+
+        docs = load_docs()
+        keys = range(100, 100 + len(docs))
+        features = extract_paths(docs, keys, lambda d: [d._trees[-1]] if len(d._trees) else [])
+        self.assertEquals(sum([len(number_tokens(d)) for d in docs]), len(features))
+        filename = os.path.join(self._tmpdir, 'features.paths')
+        features.save(filename)
+        loaded = PathFeatures.load(filename)
+        self.assertEquals(keys, loaded.keys)
+        for name in ['doc', 'number', 'target', 'lca', 'nup', 'labelStart', 'labels']:
+            self.assertEquals(getattr(features, name), getattr(loaded, name))
+        for k in range(len(loaded)):
+            doc = docs[loaded.doc[k]]
+            index = LCAIndex(doc)
+            self.assertEquals(index.distance(loaded.number[k], loaded.target[k]), loaded.length(k))
+            up, down = loaded.path_labels(k)
+            self.assertEquals(loaded.nup[k], len(up))
+            if loaded.length(k) != 0:
+                self.assertEquals(doc._dep[loaded.number[k]], up[0] if len(up) else down[0])
+
+
+def run_tests():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    unittest.main()
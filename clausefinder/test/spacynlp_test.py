@@ -2,6 +2,7 @@ from testdata import PROBLEMS
 import unittest
 from clausefinder import ClauseFinder
 from clausefinder import spacynlp
+from clausefinder.spacynlp import model
 
 class SpacyTest(unittest.TestCase):
 
@@ -18,6 +19,46 @@ class SpacyTest(unittest.TestCase):
                 self.assertEquals(expect['type'], actual.type)
                 self.assertEquals(expect['text'], actual.text)
 
+    def testDepLabels(self):
+        # Label ids are defined without loading a model and match the
+        # vocabulary of the model
+        from clausefinder.spacynlp import dep
+        nsubj = dep.NSUBJ
+        self.assertIsNotNone(dep.ROOT)
+        doc = spacynlp.parse(u'John gave Mary three apples.')
+        self.assertEquals(nsubj, doc.vocab.strings['nsubj'])
+        self.assertEquals(nsubj, doc[0].dep)
+
+    def testSharedModel(self):
+        nlp = model.warm_up()
+        self.assertTrue(model.is_loaded())
+        self.assertIs(nlp, model.get_model())
+        doc = spacynlp.parse(u'John gave Mary three apples.')
+        spacynlp.init_tags(doc.vocab)
+        self.assertEquals('S', spacynlp.get_type_name(spacynlp.dep.NSUBJ))
+        self.assertTrue(spacynlp.IS_OBJECT[spacynlp.dep.DOBJ])
+        self.assertFalse(spacynlp.IS_SUBJECT[spacynlp.dep.DOBJ])
+
+    def testEntityModel(self):
+        # A model first loaded with the entity recognizer parses
+        saved = model._model
+        model._model = None
+        try:
+            nlp = model.get_model(entity=True)
+            self.assertNotIn(True, nlp.pipeline)
+            doc = spacynlp.parse(u'John gave Mary three apples.')
+            self.assertEquals(u'John', doc[0].text)
+        finally:
+            model._model = saved
+
+    def testParseBatch(self):
+        texts = [p['sentence'].decode('utf-8') for p in PROBLEMS]
+        docs = list(spacynlp.parse_batch(texts, batch_size=2))
+        self.assertEquals(len(texts), len(docs))
+        for text, doc in zip(texts, docs):
+            expect = spacynlp.parse(text, entity=False)
+            self.assertEquals([(t.text, t.dep, t.head.i) for t in expect], [(t.text, t.dep, t.head.i) for t in doc])
+
 
 def run_tests():
     unittest.main()
@@ -0,0 +1,36 @@
+from testdata import NONPROJECTIVE
+import unittest
+from clausefinder import googlenlp
+from clausefinder.common import IndexSpan
+from clausefinder.common import SubtreeSpan
+
+
+class SpanTest(unittest.TestCase):
+
+    def test0_SpanAlgebra(self):
+        doc = googlenlp.Doc(NONPROJECTIVE)
+        span = IndexSpan(doc, [7, 1, 3])
+        self.assertEquals([1, 3, 7], span._indexes)
+        span.union(IndexSpan(doc, [0, 3, 5]))
+        self.assertEquals([0, 1, 3, 5, 7], span._indexes)
+        span.complement(IndexSpan(doc, [1, 2, 7]))
+        self.assertEquals([0, 3, 5], span._indexes)
+        span.intersect(IndexSpan(doc, [3, 4, 5, 6]))
+        self.assertEquals([3, 5], span._indexes)
+        self.assertTrue(5 in span)
+        self.assertFalse(4 in span)
+        self.assertEquals('scheduled the', span.text)
+        span.intersect(IndexSpan(doc))
+        self.assertEquals(0, len(span))
+        subtree = SubtreeSpan(doc, 1)
+        subtree.complement(IndexSpan(doc, [1, 4]))
+        subtree.repair()
+        self.assertEquals('(1,"A hearing the issue")', repr(subtree))
+
+
+def run_tests():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    unittest.main()
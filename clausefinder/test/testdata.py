@@ -322,6 +322,71 @@ if os.path.exists(JSONFILE_NAME):
         GOOGLE_PROBLEMS = json.load(fd)
 
 
+# Google NLP result of the text in clausefinder_test.txt
+TESTFILE_NAME = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                             'clausefinder_test.json')
+
+
+def load_test_result():
+    '''Load the Google NLP result in TESTFILE_NAME.'''
+    with open(TESTFILE_NAME, 'rt') as fd:
+        return json.load(fd)
+
+
+def load_results(extra=None, testfile=True):
+    '''Get the Google NLP results most tests run on.
+
+    Args:
+        extra: An optional list of results added after the test file result.
+        testfile: If True include the result in TESTFILE_NAME.
+
+    Returns:
+        A list of results, ending with the parses of GOOGLE_PROBLEMS if they
+        have been saved.
+    '''
+    results = [load_test_result()] if testfile else []
+    if extra is not None:
+        results.extend(extra)
+    if GOOGLE_PROBLEMS is not None:
+        results.extend([p['google'] for p in GOOGLE_PROBLEMS])
+    return results
+
+
+def make_google_result(sentences):
+    '''Build a Google NLP result from a list of (sentence, tokens) pairs where
+    tokens are (text, head, label, tag) tuples with document token heads.
+    Lemmas are the lowercase text.'''
+    result = {'sentences': [], 'tokens': []}
+    begin = 0
+    for sentence, tokens in sentences:
+        result['sentences'].append({'text': {'content': sentence, 'beginOffset': begin}})
+        offset = 0
+        for text, head, label, tag in tokens:
+            offset = sentence.index(text, offset)
+            result['tokens'].append({
+                'text': {'content': text, 'beginOffset': begin + offset},
+                'lemma': text.lower(),
+                'partOfSpeech': {'tag': tag},
+                'dependencyEdge': {'headTokenIndex': head, 'label': label}
+            })
+            offset += len(text)
+        begin += len(sentence) + 1
+    return result
+
+
+# Non-projective parse, the subtree of 'hearing' is not contiguous
+NONPROJECTIVE = make_google_result([('A hearing is scheduled on the issue today', [
+    ('A', 1, 'DET', 'DET'),
+    ('hearing', 3, 'NSUBJPASS', 'NOUN'),
+    ('is', 3, 'AUXPASS', 'VERB'),
+    ('scheduled', 3, 'ROOT', 'VERB'),
+    ('on', 1, 'PREP', 'ADP'),
+    ('the', 6, 'DET', 'DET'),
+    ('issue', 4, 'POBJ', 'NOUN'),
+    ('today', 3, 'TMOD', 'NOUN'),
+])])
+
+
 def save_google_testdata_in_json(compact=False):
     global GOOGLE_PROBLEMS
     from clausefinder import googlenlp
@@ -0,0 +1,35 @@
+from testdata import NONPROJECTIVE
+from testdata import load_results
+import unittest
+from clausefinder import ClauseFinder
+from clausefinder import googlenlp
+from clausefinder.bench.synthetic import TreeGenerator
+from clausefinder.vector import HAS_NUMPY
+
+
+class VectorTest(unittest.TestCase):
+
+    def test0_Vectorize(self):
+        if not HAS_NUMPY:
+            return
+        # Mask spans give the same clauses, including conjunction heavy
+        # sentences with merged and nested objects
+        generator = TreeGenerator(11, conj=0.4, appos=0.2, xcomp=0.2)
+        results = [NONPROJECTIVE] + [generator.document(4, n) for n in [8, 30, 80]]
+        for result in load_results(results):
+            doc = googlenlp.Doc(result)
+            expect = []
+            actual = []
+            for vectorize, clauses in [(False, expect), (True, actual)]:
+                cf = ClauseFinder(doc, vectorize=vectorize)
+                for s in doc.sents:
+                    clauses.append([(c.type, c.text) for c in cf.find_clauses(s)])
+            self.assertEquals(expect, actual)
+
+
+def run_tests():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+from testdata import load_results
+import unittest
+from clausefinder import ClauseFinder
+from clausefinder import googlenlp
+from clausefinder.bench.synthetic import TreeGenerator
+from clausefinder.googlenlp import binary
+from clausefinder.googlenlp.vocab import LowerSet
+
+
+class VocabTest(unittest.TestCase):
+
+    def test0_SharedVocab(self):
+        generator = TreeGenerator(4, conj=0.05)
+        results = load_results([generator.document(2, 10) for _ in range(5)])
+        vocab = googlenlp.Vocab()
+        for result in results:
+            for source in [result, googlenlp.compact.encode(result)]:
+                expect = googlenlp.Doc(result)
+                doc = googlenlp.Doc(source, vocab)
+                self.assertIs(vocab, doc.vocab)
+                self.assertEquals(expect.fingerprint, doc.fingerprint)
+                self.assertEquals(expect._hash, doc._hash)
+                for a, b in zip(expect, doc):
+                    self.assertEquals((a.text, a.lemma), (b.text, b.lemma))
+                    self.assertEquals(vocab.get(a.text), b.text_id)
+                    self.assertEquals(vocab.get(a.lemma), b.lemma_id)
+                cf = ClauseFinder(expect)
+                expectClauses = [(c.type, c.text) for s in expect.sents for c in cf.find_clauses(s)]
+                n = len(vocab)
+                cf = ClauseFinder(doc)
+                self.assertEquals(expectClauses, [(c.type, c.text) for s in doc.sents for c in cf.find_clauses(s)])
+                self.assertEquals(n, len(vocab))
+                # Stored without the strings of other documents
+                copy = binary.unpack_doc(bytearray(binary.pack_doc(doc)))
+                self.assertEquals(doc.fingerprint, copy.fingerprint)
+                self.assertEquals(len(doc.local_strings()[0]), len(copy.vocab))
+        self.assertEquals(len(vocab.strings), len(set(vocab.strings)))
+        self.assertIsNone(vocab.get(u'no such string'))
+        self.assertNotIn(u'no such string', vocab)
+
+    def test1_LowerSet(self):
+        # Case folding does not add strings
+        vocab = googlenlp.Vocab()
+        upper = vocab.intern(u'WhICh')
+        rel = LowerSet(vocab, [u'which', u'that'])
+        self.assertEquals(-1, vocab.lower(upper))
+        self.assertIn(upper, rel)
+        self.assertNotIn(vocab.intern(u'Thus'), rel)
+        self.assertEquals(2, len(vocab))
+        lower = vocab.intern(u'which')
+        self.assertEquals(lower, vocab.lower(upper))
+        self.assertEquals(lower, vocab.lower(lower))
+        self.assertIn(upper, rel)
+        self.assertIn(lower, rel)
+        self.assertNotIn(vocab.intern(u'thus'), rel)
+
+
+def run_tests():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    unittest.main()
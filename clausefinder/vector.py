@@ -0,0 +1,207 @@
+# NumPy implementation of ParsedClause span construction
+#
+# SpanMasks represents the subject, object and exclude spans of a clause as
+# boolean masks over the tokens of its sentence, so unions, complements and
+# descendant tests are array operations instead of subtree walks. Subtree
+# masks are cached per sentence, the clauses of a sentence share most of
+# their subjects, objects and excluded subtrees. The spans produced are the
+# same as the spans ParsedClause computes without masks.
+#
+# NumPy is optional, HAS_NUMPY is False if it is not installed.
+
+import collections
+try:
+    import numpy as np
+except ImportError:
+    np = None
+import googlenlp
+from clausefinder.common import SubtreeSpan
+
+HAS_NUMPY = np is not None
+
+
+class SpanMasks(object):
+    '''Compute clause spans with boolean masks over a sentence.'''
+
+    def __init__(self, doc, module):
+        '''Constructor.
+
+        Args:
+            doc: A googlenlp.Doc or spacy.Doc instance.
+            module: googlenlp or spacynlp.
+        '''
+        if np is None:
+            raise ImportError('SpanMasks requires numpy')
+        self.reset(doc, module)
+
+    def reset(self, doc, module):
+        '''Prepare for another document.
+
+        Args:
+            doc: A googlenlp.Doc or spacy.Doc instance.
+            module: googlenlp or spacynlp.
+        '''
+        self._doc = doc
+        self._module = module
+        if module is googlenlp:
+            # Euler tour order, the subtree of i is _order[_enter[i]:_exit[i]]
+            self._order = np.frombuffer(doc._order, dtype=np.intc)
+        else:
+            self._order = None
+        self._start = 0
+        self._end = 0
+        self._subtrees = {}
+        self._empty = None
+
+    def __len__(self):
+        # The mask length
+        return self._end - self._start
+
+    def _set_window(self, token):
+        # Make the sentence containing token the mask window
+        if self._start <= token.i < self._end:
+            return
+        if self._module is googlenlp:
+            self._start, self._end = self._doc.sentence_range(token.sent_id)
+        else:
+            root = token
+            while root.dep != self._module.dep.ROOT:
+                root = root.head
+            self._start = root.left_edge.i
+            self._end = root.right_edge.i + 1
+        self._subtrees = {}
+        self._empty = np.zeros(self._end - self._start, dtype=bool)
+
+    def _subtree(self, i):
+        # Subtree mask of token i. Subtrees do not cross sentences so a token
+        # outside the window has an empty subtree within it.
+        mask = self._subtrees.get(i)
+        if mask is None:
+            if not self._start <= i < self._end:
+                return self._empty
+            mask = self._empty.copy()
+            if self._order is not None:
+                doc = self._doc
+                mask[self._order[doc._enter[i]:doc._exit[i]] - self._start] = True
+            else:
+                mask[np.array(SubtreeSpan(self._doc, i)._indexes) - self._start] = True
+            self._subtrees[i] = mask
+        return mask
+
+    def _index_mask(self, indexes):
+        # Mask of a list of token indexes, indexes outside the window are
+        # dropped since spans never contain them
+        mask = self._empty.copy()
+        idx = np.array(indexes, dtype=np.intc) - self._start
+        mask[idx[(idx >= 0) & (idx < len(mask))]] = True
+        return mask
+
+    def _to_span(self, mask, rootIdx):
+        span = SubtreeSpan(self._doc, rootIdx, shallow=True)
+        span._indexes = (np.flatnonzero(mask) + self._start).tolist()
+        return span
+
+    def clause_spans(self, subject, verb, objects=None, exclude=None, merge=None):
+        '''Compute the spans of a clause. The arguments are the same as for
+        ParsedClause.
+
+        Args:
+            subject: The subject token.
+            verb: The verb token.
+            objects: None, an object token or a list of object tokens.
+            exclude: None or a list of tokens and token lists. The subtree of
+                a token is excluded, a token list excludes the tokens.
+            merge: None or a list of [focusIdx, idx1, ...] lists of object
+                indexes. The objects at idx1... are merged into the object at
+                focusIdx.
+
+        Returns:
+            A tuple (subjSpan, verbSpan, objSpans, nsetOps). nsetOps is the
+            number of mask operations, each over the sentence length.
+        '''
+        module = self._module
+        doc = self._doc
+        self._set_window(verb)
+        start = self._start
+        nsetOps = 0
+
+        # Calculate excluded token mask
+        excludeMask = self._empty
+        if exclude is not None:
+            for x in exclude:
+                if isinstance(x, module.Token):
+                    xm = self._subtree(x.i)
+                elif isinstance(x, list):
+                    if len(x) > 0:
+                        if isinstance(x[0], module.Token):
+                            xm = self._index_mask([y.i for y in x])
+                        else:
+                            raise TypeError
+                    else:
+                        continue
+                else:
+                    raise TypeError
+                excludeMask = excludeMask | xm
+                nsetOps += 1
+        notExclude = ~excludeMask
+
+        # Calculate subject mask, the subject token is always included
+        subjMask = self._subtree(subject.i) & notExclude
+        subjMask[subject.i - start] = True
+        nsetOps += 1
+
+        # Calculate object masks, a nested object is removed from its ancestor
+        if objects is None:
+            objects = []
+        elif isinstance(objects, collections.Iterable):
+            objects = list(objects)
+        elif isinstance(objects, module.Token):
+            objects = [objects]
+        else:
+            raise TypeError
+        objMasks = []
+        for o in objects:
+            if not isinstance(o, module.Token):
+                raise TypeError
+            objMasks.append(self._subtree(o.i))
+        if len(objects) > 1:
+            for j, o in enumerate(objects):
+                for k, p in enumerate(objects):
+                    if p.i == o.i:
+                        continue
+                    if self._subtree(o.i)[p.i - start]:
+                        objMasks[j] = objMasks[j] & ~objMasks[k]
+                        nsetOps += 1
+                    elif self._subtree(p.i)[o.i - start]:
+                        objMasks[k] = objMasks[k] & ~objMasks[j]
+                        nsetOps += 1
+        for j, o in enumerate(objects):
+            mask = objMasks[j] & notExclude
+            nsetOps += 1
+            # Remove dep mark starting a span
+            first = np.argmax(mask)
+            if mask[first] and doc[start + first].dep == module.dep.MARK:
+                mask[first] = False
+            mask[o.i - start] = True
+            objMasks[j] = mask
+
+        # Process merges formatted as: [ [focusIdx1, idx1, ...], [focusIdx2, idxN, ...]]
+        objRoots = [o.i for o in objects]
+        if merge is not None and len(merge) > 0:
+            for m in merge:
+                # The object masks are not shared so the focus is updated in
+                # place and stays valid as merged objects are removed
+                focus = objMasks[m[0]]
+                m = m[1:]
+                m.sort()
+                for i in reversed(m):
+                    focus |= objMasks[i]
+                    nsetOps += 1
+                    objMasks.pop(i)
+                    objRoots.pop(i)
+
+        verbSpan = SubtreeSpan(verb, shallow=True)
+        if verb.i > 0 and doc[verb.i].dep == module.dep.AUXPASS:
+            verbSpan._indexes = [verb.i-1, verb.i]
+        objSpans = [self._to_span(mask, i) for mask, i in zip(objMasks, objRoots)]
+        return self._to_span(subjMask, subject.i), verbSpan, objSpans, nsetOps
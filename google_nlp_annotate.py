@@ -11,6 +11,7 @@ from optparse import OptionParser
 from googleapiclient import discovery
 from googleapiclient.errors import HttpError
 from oauth2client.client import GoogleCredentials
+from clausefinder.googlenlp import compact
 
 def get_service():
     '''Build a client to the Google Cloud Natural Language API.'''
@@ -50,6 +51,12 @@ if __name__ == '__main__':
     parser = OptionParser(usage)
     parser.add_option('-o', '--output', type='string', dest='outfile', help='Set output file. Default is stdout.')
     parser.add_option('-c', '--compact', action='store_true', dest='compact', help='compact json output.')
+    parser.add_option('-p', '--project', action='store_true', dest='project', help='only keep the nlp fields used by the clause finder.')
+    parser.add_option('-e', '--encode', action='store_true', dest='encode', help='store nlp annotations in compact encoded form.')
+    parser.add_option('-r', '--reuse', action='store_true', dest='reuse', help='reuse existing nlp annotations in the input file.')
+    parser.add_option('-s', '--spacy', action='store_true', dest='spacy', help='annotate offline with spaCy instead of the Google API.')
+    parser.add_option('-b', '--batch-size', type='int', dest='batchsize', default=1000, help='spaCy batch size, default is 1000.')
+    parser.add_option('-j', '--jobs', type='int', dest='jobs', default=1, help='spaCy worker processes, default is 1.')
     options, args = parser.parse_args()
     if args is None or len(args) == 0:
         die('no file to process')
@@ -57,11 +64,29 @@ if __name__ == '__main__':
     with open(args[0], 'rt') as fd:
         wordprobs = json.load(fd)
 
-    service = get_service()
+    if options.spacy:
+        # Local annotation path, spaCy parses the whole file in batches
+        from clausefinder.spacynlp import convert
+        todo = filter(lambda x: not options.reuse or 'nlp' not in x, wordprobs)
+        for prob in convert.annotate_problems(todo, batch_size=options.batchsize, processes=options.jobs):
+            pass
+
+    service = None
     for prob in wordprobs:
-        body = get_request_body(prob['sQuestion'])
-        request = service.documents().annotateText(body=body)
-        response = request.execute(num_retries=3)
+        if (options.reuse or options.spacy) and 'nlp' in prob:
+            response = prob['nlp']
+            if compact.is_compact(response):
+                response = compact.decode(response)
+        else:
+            if service is None:
+                service = get_service()
+            body = get_request_body(prob['sQuestion'])
+            request = service.documents().annotateText(body=body)
+            response = request.execute(num_retries=3)
+        if options.encode:
+            response = compact.encode(response)
+        elif options.project:
+            response = compact.project(response)
         prob['nlp'] = response
 
     if options.outfile is None: